@@ -1,15 +1,13 @@
 from __future__ import annotations
+import json
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse
 from starlette.requests import Request
 from starlette.middleware.base import BaseHTTPMiddleware
 import uuid
-import numpy as np
-from ..pointcloud.segmentation import segment_trees
-from ..pointcloud.features import cluster_features
 
 
 app = FastAPI(title="OpenWorld TSHM Dashboard")
@@ -64,17 +62,18 @@ def health():
 
 @app.post("/api/trees")
 def api_trees():
+    # Imported per request so the app starts without numpy/sklearn
+    import numpy as np
+
+    from ..pointcloud.features import cluster_features
+    from ..pointcloud.segmentation import segment_trees
+    from ..synthetic import cluster_points
+
     # Synthetic small demo dataset
     rng = np.random.default_rng(42)
     centers = rng.uniform(0, 100, size=(10, 2))
-    points = []
-    for i, c in enumerate(centers):
-        for _ in range(50):
-            x = c[0] + rng.normal(0, 1)
-            y = c[1] + rng.normal(0, 1)
-            z = 20 + 5 * rng.random() + i * 0.2
-            points.append([x, y, z])
-    pts = np.array(points)
+    xy, idx = cluster_points(rng, centers, per_cluster=50)
+    pts = np.column_stack([xy, 20 + 5 * rng.random(len(xy)) + idx * 0.2])
     labels = segment_trees(pts, eps=2.0, min_samples=5)
     feats = cluster_features(pts, labels)
     # Map minimal GeoJSON-ish structure
@@ -87,6 +86,59 @@ def api_trees():
         })
     return JSONResponse({"type": "FeatureCollection", "features": features})
 
+
+def _trees_db() -> str | None:
+    db = os.getenv("OW_TSHM_TREES_DB", "forest.db")
+    return db if os.path.exists(db) else None
+
+
+@app.get("/api/trees/bbox")
+def api_trees_bbox(
+    min_x: float, min_y: float, max_x: float, max_y: float, limit: int = 10_000, ndjson: bool = False
+):
+    # Served from the R*Tree of a bulk-exported database (export-sqlite --bulk/--source)
+    from ..gis.export import query_bbox
+    from ..gis.layers import iter_geojson
+
+    db = _trees_db()
+    if db is None:
+        return JSONResponse({"detail": "Tree database not found"}, status_code=404)
+    df = query_bbox(db, (min_x, min_y, max_x, max_y), limit=max(1, min(limit, 100_000)))
+    # Encoded chunk by chunk instead of building the whole FeatureCollection
+    media = "application/x-ndjson" if ndjson else "application/geo+json"
+    return StreamingResponse(iter_geojson(df, chunk_size=5_000, ndjson=ndjson), media_type=media)
+
+
+@app.get("/api/summary")
+def api_summary(stand: str | None = None):
+    # Read from the pre-aggregated summary tables; never scans the tree table
+    from ..gis.summary import has_summaries, read_summary
+
+    db = _trees_db()
+    if db is None or not has_summaries(db):
+        return JSONResponse({"detail": "No summary tables; export with export-sqlite --bulk"}, status_code=404)
+    return read_summary(db, stand=stand)
+
+
+@app.get("/api/summary/grid")
+def api_summary_grid(
+    stand: str | None = None,
+    min_x: float | None = None,
+    min_y: float | None = None,
+    max_x: float | None = None,
+    max_y: float | None = None,
+):
+    from ..gis.summary import has_summaries, read_grid
+
+    db = _trees_db()
+    if db is None or not has_summaries(db):
+        return JSONResponse({"detail": "No summary tables; export with export-sqlite --bulk"}, status_code=404)
+    box = None
+    if min_x is not None and min_y is not None and max_x is not None and max_y is not None:
+        box = (min_x, min_y, max_x, max_y)
+    df = read_grid(db, stand=stand, bbox=box)
+    return JSONResponse({"cells": json.loads(df.to_json(orient="records"))})
+
 try:
     from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST  # type: ignore
     import time
@@ -1,9 +1,18 @@
 from __future__ import annotations
+import math
+import os
+import sqlite3
+from collections.abc import Iterable, Iterator
 import pandas as pd
 try:
     import sqlite_utils  # type: ignore
 except Exception:  # pragma: no cover
     sqlite_utils = None  # type: ignore
+try:
+    import pyarrow.parquet as pq  # type: ignore
+except ImportError:  # pragma: no cover
+    pq = None  # type: ignore
+from .summary import GRID_CELL_M, apply_partials, create_summary_tables, existing_partials, partials
 
 
 def export_trees_sqlite(df: pd.DataFrame, db_path: str = "forest.db", table: str = "trees") -> None:
@@ -16,3 +25,216 @@ def export_trees_sqlite(df: pd.DataFrame, db_path: str = "forest.db", table: str
     db[table].insert_all(df.to_dict(orient="records"), pk="label", replace=True)
 
 
+# Pragmas for the duration of a bulk load. The database is only written by the
+# loader, so a crash mid-load means re-running the export, not corruption of
+# data anyone else depends on; durability is restored before returning.
+BULK_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-262144",
+)
+
+
+def _sql_type(dtype) -> str:
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _iter_source(source: pd.DataFrame | str | Iterable[pd.DataFrame], batch_size: int) -> Iterator[pd.DataFrame]:
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), batch_size):
+            yield source.iloc[start : start + batch_size]
+    elif isinstance(source, str):
+        if source.lower().endswith(".parquet"):
+            if pq is None:
+                raise RuntimeError("pyarrow not available for Parquet input")
+            for batch in pq.ParquetFile(source).iter_batches(batch_size=batch_size):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(source, chunksize=batch_size)
+    else:
+        yield from source
+
+
+def _rows(chunk: pd.DataFrame) -> Iterator[tuple]:
+    # Column-wise conversion to Python scalars; far cheaper than to_dict(orient="records")
+    cols = []
+    for name in chunk.columns:
+        col = chunk[name]
+        if col.dtype == object or isinstance(col.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(col.dtype):
+            values = col.astype(object).where(col.notna(), None).tolist()
+        else:
+            values = col.tolist()
+            if pd.api.types.is_float_dtype(col.dtype):
+                values = [None if math.isnan(v) else v for v in values]
+        cols.append(values)
+    return zip(*cols)
+
+
+def _rtree_insert_sql(conn: sqlite3.Connection, table: str, columns: list[str], where: str = "") -> str:
+    # Crown bbox from the footprint area (radius of the equal-area circle); a
+    # tree without a footprint is indexed by its centroid alone
+    if "footprint" in columns:
+        r = "COALESCE(sqrt(MAX(footprint, 0) / pi()), 0)"
+    else:
+        r = "0"
+    try:
+        conn.execute("SELECT sqrt(4), pi()").fetchone()
+    except sqlite3.OperationalError:
+        # SQLite built without math functions
+        conn.create_function("sqrt", 1, math.sqrt, deterministic=True)
+        conn.create_function("pi", 0, lambda: math.pi, deterministic=True)
+    return (
+        f"INSERT INTO {_quote(table + '_rtree')} SELECT rowid, centroid_x - {r}, centroid_x + {r}, "
+        f"centroid_y - {r}, centroid_y + {r} FROM {_quote(table)} "
+        f"WHERE centroid_x IS NOT NULL AND centroid_y IS NOT NULL{where}"
+    )
+
+
+def _build_rtree(conn: sqlite3.Connection, table: str, columns: list[str]) -> str | None:
+    if "centroid_x" not in columns or "centroid_y" not in columns:
+        return None
+    rtree = f"{table}_rtree"
+    conn.execute(f"CREATE VIRTUAL TABLE {_quote(rtree)} USING rtree(id, min_x, max_x, min_y, max_y)")
+    conn.execute(_rtree_insert_sql(conn, table, columns))
+    return rtree
+
+
+def _has_table(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone() is not None
+
+
+def _unindex_batch(conn: sqlite3.Connection, table: str, types: dict[str, str], chunk: pd.DataFrame) -> str:
+    """
+    Before a batch is written: drop the R*Tree entries of the rows it replaces
+    and return a subquery selecting the rowids it writes, to index afterwards.
+    """
+    if "label" not in chunk.columns:
+        # Plain INSERT appends past the largest rowid
+        top = conn.execute(f"SELECT COALESCE(max(rowid), 0) FROM {_quote(table)}").fetchone()[0]
+        return f"SELECT rowid FROM {_quote(table)} WHERE rowid > {int(top)}"
+    # Same type as the label column, so the join compares labels the way the table stores them
+    conn.execute("DROP TABLE IF EXISTS temp._rtree_labels")
+    conn.execute(f"CREATE TEMP TABLE _rtree_labels (label {types['label']} PRIMARY KEY)")
+    conn.executemany("INSERT OR IGNORE INTO _rtree_labels VALUES (?)", ((v,) for v in chunk["label"].tolist()))
+    rows = f"SELECT t.rowid FROM {_quote(table)} t JOIN _rtree_labels USING (label)"
+    conn.execute(f"DELETE FROM {_quote(table + '_rtree')} WHERE id IN ({rows})")
+    return rows
+
+
+def bulk_export_trees_sqlite(
+    source: pd.DataFrame | str | Iterable[pd.DataFrame],
+    db_path: str = "forest.db",
+    table: str = "trees",
+    batch_size: int = 200_000,
+    rtree: bool = True,
+    summaries: bool = True,
+    stand: str = "default",
+    cell_size: float = GRID_CELL_M,
+) -> int:
+    """
+    Stream a tree table (DataFrame, .parquet/.csv path or iterable of chunks)
+    into SQLite with one transaction per batch_size rows, replacing rows with
+    the same label. With rtree=True a `<table>_rtree` R*Tree over the crown
+    bboxes (centroid +/- crown radius) is kept; its id is the rowid of the tree
+    row, which is the label when labels are integers. It is built over the
+    whole table after the first load and afterwards updated in each batch's
+    transaction for the rows that batch writes.
+
+    With summaries=True the per-stand and per-grid-cell summary tables (see
+    gis.summary) are updated in the same transaction as each batch, so they
+    always match the tree table. Rows without a `stand` column belong to stand.
+    Returns the number of rows written.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        for pragma in BULK_PRAGMAS:
+            conn.execute(pragma)
+        written = 0
+        columns: list[str] | None = None
+        insert = ""
+        # Table columns and their types once the table exists; an existing
+        # R*Tree is maintained per batch, a new one built after the load
+        types: dict[str, str] = {}
+        index = False
+        for chunk in _iter_source(source, batch_size):
+            if summaries:
+                if "stand" not in chunk.columns:
+                    chunk = chunk.assign(stand=stand)
+                if "label" in chunk.columns:
+                    # Within a batch the last row of a label wins, as it would with INSERT OR REPLACE
+                    chunk = chunk.drop_duplicates("label", keep="last")
+            if columns is None:
+                columns = list(chunk.columns)
+                defs = []
+                for name in columns:
+                    kind = _sql_type(chunk[name].dtype)
+                    if name == "label":
+                        # An INTEGER PRIMARY KEY is the rowid itself: no separate index to maintain
+                        defs.append(f"{_quote(name)} {kind} PRIMARY KEY")
+                    else:
+                        defs.append(f"{_quote(name)} {kind}")
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(table)} ({', '.join(defs)})")
+                placeholders = ", ".join("?" for _ in columns)
+                verb = "INSERT OR REPLACE" if "label" in columns else "INSERT"
+                insert = f"{verb} INTO {_quote(table)} ({', '.join(map(_quote, columns))}) VALUES ({placeholders})"
+                if summaries:
+                    create_summary_tables(conn, table, cell_size)
+                types = {r[1]: r[2] for r in conn.execute(f"PRAGMA table_info({_quote(table)})")}
+                index = rtree and _has_table(conn, f"{table}_rtree")
+            conn.execute("BEGIN")
+            if index:
+                written_rows = _unindex_batch(conn, table, types, chunk)
+            if summaries and "label" in columns:
+                # Take replaced trees out of the summaries before their rows are overwritten
+                old = existing_partials(conn, chunk["label"].tolist(), table, cell_size)
+                if old:
+                    apply_partials(conn, old, table)
+            conn.executemany(insert, _rows(chunk[columns]))
+            if index:
+                conn.execute(_rtree_insert_sql(conn, table, list(types), f" AND rowid IN ({written_rows})"))
+            if summaries:
+                apply_partials(conn, partials(chunk, cell_size), table)
+            conn.execute("COMMIT")
+            written += len(chunk)
+        if columns is not None and rtree and not index:
+            conn.execute("BEGIN")
+            _build_rtree(conn, table, list(types))
+            conn.execute("COMMIT")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return written
+    finally:
+        conn.close()
+
+
+def query_bbox(
+    db_path: str,
+    bbox: tuple[float, float, float, float],
+    table: str = "trees",
+    limit: int | None = None,
+) -> pd.DataFrame:
+    """Trees whose crown bbox intersects bbox = (min_x, min_y, max_x, max_y), via the R*Tree."""
+    min_x, min_y, max_x, max_y = bbox
+    sql = (
+        f"SELECT t.* FROM {_quote(table + '_rtree')} r JOIN {_quote(table)} t ON t.rowid = r.id "
+        "WHERE r.max_x >= ? AND r.min_x <= ? AND r.max_y >= ? AND r.min_y <= ?"
+    )
+    args: list = [min_x, max_x, min_y, max_y]
+    if limit is not None:
+        sql += " LIMIT ?"
+        args.append(int(limit))
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return pd.read_sql_query(sql, conn, params=args)
+    finally:
+        conn.close()
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.dataset as pads  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except ImportError:  # pragma: no cover
+    pa = None  # type: ignore
+    pads = None  # type: ignore
+    pq = None  # type: ignore
+try:  # pragma: no cover - optional
+    import pyproj  # type: ignore
+except ImportError:  # pragma: no cover
+    pyproj = None  # type: ignore
+from .export import _iter_source
+from .layers import trees_geodataframe
+
+GEOPARQUET_VERSION = "1.1.0"
+TILE_INDEX = "_tiles.json"
+# Little-endian WKB Point: byte order, geometry type, x, y
+_WKB_POINT = np.dtype([("order", "u1"), ("type", "<u4"), ("x", "<f8"), ("y", "<f8")])
+
+
+def wkb_points(x: np.ndarray, y: np.ndarray):
+    """WKB Point geometries as an Arrow binary array, built from the coordinate arrays in one pass."""
+    n = len(x)
+    buf = np.empty(n, dtype=_WKB_POINT)
+    buf["order"] = 1
+    buf["type"] = 1
+    buf["x"] = x
+    buf["y"] = y
+    offsets = np.arange(0, (n + 1) * _WKB_POINT.itemsize, _WKB_POINT.itemsize, dtype=np.int32)
+    return pa.Array.from_buffers(pa.binary(), n, [None, pa.py_buffer(offsets), pa.py_buffer(buf.tobytes())])
+
+
+def morton_key(x: np.ndarray, y: np.ndarray, x0: float, y0: float, size: float, bits: int = 16) -> np.ndarray:
+    """Z-order key of points within the square [x0, x0+size) x [y0, y0+size)."""
+    scale = (1 << bits) - 1
+
+    def spread(v: np.ndarray) -> np.ndarray:
+        v = v & np.uint64(0xFFFF)
+        v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF)
+        v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F)
+        v = (v | (v << np.uint64(2))) & np.uint64(0x33333333)
+        return (v | (v << np.uint64(1))) & np.uint64(0x55555555)
+
+    xi = (np.clip((x - x0) / size, 0, 1) * scale).astype(np.uint64)
+    yi = (np.clip((y - y0) / size, 0, 1) * scale).astype(np.uint64)
+    return spread(xi) | (spread(yi) << np.uint64(1))
+
+
+def _crs_json(crs: str) -> dict[str, Any]:
+    if pyproj is not None:  # pragma: no cover - optional
+        return pyproj.CRS.from_user_input(crs).to_json_dict()
+    authority, _, code = crs.partition(":")
+    return {"id": {"authority": authority, "code": int(code) if code.isdigit() else code}}
+
+
+def _geo_metadata(crs: str) -> bytes:
+    return json.dumps({
+        "version": GEOPARQUET_VERSION,
+        "primary_column": "geometry",
+        "columns": {
+            "geometry": {
+                "encoding": "WKB",
+                "geometry_types": ["Point"],
+                "crs": _crs_json(crs),
+                "covering": {"bbox": {k: ["bbox", k] for k in ("xmin", "ymin", "xmax", "ymax")}},
+            }
+        },
+    }).encode()
+
+
+class _TileWriter:
+    # Parquet part files of one tile; buffered rows are Z-ordered before
+    # writing, so each row group covers a compact part of the tile and its
+    # statistics prune well for bbox reads. A new part is started when the
+    # writer was closed to stay under the open file limit.
+    def __init__(self, tile_dir: str, origin: tuple[float, float], tile_size: float) -> None:
+        self.tile_dir = tile_dir
+        self.paths: list[str] = []
+        self.origin = origin
+        self.tile_size = tile_size
+        self.pending: list[pd.DataFrame] = []
+        self.rows = 0
+        self.buffered = 0
+        self.bounds = [np.inf, np.inf, -np.inf, -np.inf]
+        self._writer: Any = None
+
+    def add(self, df: pd.DataFrame) -> None:
+        self.pending.append(df)
+        self.buffered += len(df)
+        x, y = df["centroid_x"].to_numpy(), df["centroid_y"].to_numpy()
+        self.bounds = [
+            min(self.bounds[0], float(x.min())), min(self.bounds[1], float(y.min())),
+            max(self.bounds[2], float(x.max())), max(self.bounds[3], float(y.max())),
+        ]
+
+    def flush(self, schema, row_group_size: int) -> None:
+        if not self.pending:
+            return
+        df = pd.concat(self.pending, ignore_index=True)
+        self.pending, self.buffered = [], 0
+        x = df["centroid_x"].to_numpy(dtype=float)
+        y = df["centroid_y"].to_numpy(dtype=float)
+        order = np.argsort(morton_key(x, y, *self.origin, self.tile_size), kind="stable")
+        df, x, y = df.iloc[order], x[order], y[order]
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.append_column("geometry", wkb_points(x, y))
+        table = table.append_column("bbox", pa.StructArray.from_arrays(
+            [pa.array(x), pa.array(y), pa.array(x), pa.array(y)], names=["xmin", "ymin", "xmax", "ymax"]
+        ))
+        table = table.cast(schema)
+        if self._writer is None:
+            os.makedirs(self.tile_dir, exist_ok=True)
+            self.paths.append(os.path.join(self.tile_dir, f"part-{len(self.paths)}.parquet"))
+            self._writer = pq.ParquetWriter(self.paths[-1], schema, compression="zstd", write_statistics=True)
+        self._writer.write_table(table, row_group_size=row_group_size)
+        self.rows += len(df)
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def write_geoparquet(
+    source: pd.DataFrame | str | Iterable[pd.DataFrame],
+    out_dir: str,
+    tile_size: float = 1000.0,
+    row_group_size: int = 10_000,
+    crs: str = "EPSG:3857",
+    batch_size: int = 200_000,
+    buffer_row_groups: int = 8,
+    max_open_files: int = 64,
+    max_buffered_rows: int = 1_000_000,
+) -> dict[str, Any]:
+    """
+    Write a tree table (DataFrame, .parquet/.csv path or iterable of chunks)
+    as GeoParquet partitioned into square tiles of tile_size:
+    `<out_dir>/tile_x=<i>/tile_y=<j>/part-<n>.parquet`. Point geometries come
+    from centroid_x/centroid_y as WKB plus a GeoParquet 1.1 bbox covering
+    column. Rows are buffered per tile (buffer_row_groups row groups) and
+    Z-ordered before writing. `<out_dir>/_tiles.json` lists every tile with
+    its bounds, row count and part files. Returns that index.
+
+    At most max_open_files tile files are open at once (the least recently
+    written one is closed, and its tile continues in a new part file), and
+    at most max_buffered_rows rows are buffered over all tiles (the largest
+    buffers are written first), so memory and file descriptors stay bounded
+    however many tiles the table spans.
+
+    The dataset is written to a temporary directory next to out_dir and
+    moved into place when complete. An existing out_dir is replaced only if
+    it is empty or holds an earlier export (a `_tiles.json`); anything else
+    raises FileExistsError.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow not available for GeoParquet output")
+    out_dir = os.path.normpath(out_dir)
+    if os.path.exists(out_dir) and not (
+        os.path.isdir(out_dir) and (not os.listdir(out_dir) or os.path.exists(os.path.join(out_dir, TILE_INDEX)))
+    ):
+        raise FileExistsError(f"{out_dir} exists and is not a GeoParquet export ({TILE_INDEX} missing); not replacing it")
+    tmp = f"{out_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    try:
+        index = _write_tiles(
+            source, tmp, tile_size, row_group_size, crs, batch_size, buffer_row_groups, max_open_files, max_buffered_rows
+        )
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    # A directory can't be renamed over a non-empty one: move the old export aside first
+    old = f"{out_dir}.old-{os.getpid()}"
+    if os.path.exists(out_dir):
+        os.replace(out_dir, old)
+    os.replace(tmp, out_dir)
+    shutil.rmtree(old, ignore_errors=True)
+    return index
+
+
+def _write_tiles(
+    source: pd.DataFrame | str | Iterable[pd.DataFrame],
+    out_dir: str,
+    tile_size: float,
+    row_group_size: int,
+    crs: str,
+    batch_size: int,
+    buffer_row_groups: int,
+    max_open_files: int,
+    max_buffered_rows: int,
+) -> dict[str, Any]:
+    # write_geoparquet into out_dir as is; the caller owns the directory
+    writers: dict[tuple[int, int], _TileWriter] = {}
+    # Tiles with an open file, least recently written first
+    open_files: OrderedDict[tuple[int, int], _TileWriter] = OrderedDict()
+    schema = None
+    dropped = 0
+
+    def flush(key: tuple[int, int]) -> None:
+        w = writers[key]
+        if not w.pending:
+            return
+        if not w.is_open and len(open_files) >= max_open_files:
+            open_files.popitem(last=False)[1].close()
+        w.flush(schema, row_group_size)
+        open_files[key] = w
+        open_files.move_to_end(key)
+
+    try:
+        for chunk in _iter_source(source, batch_size):
+            missing = [c for c in ("centroid_x", "centroid_y") if c not in chunk.columns]
+            if missing:
+                raise ValueError(f"Tree table is missing columns: {missing}")
+            ok = chunk["centroid_x"].notna().to_numpy() & chunk["centroid_y"].notna().to_numpy()
+            dropped += int((~ok).sum())
+            chunk = chunk[ok]
+            if schema is None:
+                base = pa.Schema.from_pandas(chunk, preserve_index=False)
+                schema = (
+                    base.append(pa.field("geometry", pa.binary()))
+                    .append(pa.field("bbox", pa.struct([(k, pa.float64()) for k in ("xmin", "ymin", "xmax", "ymax")])))
+                    .with_metadata({b"geo": _geo_metadata(crs)})
+                )
+            tx = np.floor(chunk["centroid_x"].to_numpy(dtype=float) / tile_size).astype(np.int64)
+            ty = np.floor(chunk["centroid_y"].to_numpy(dtype=float) / tile_size).astype(np.int64)
+            for (i, j), idx in pd.Series(np.arange(len(chunk))).groupby([tx, ty]).groups.items():
+                key = (int(i), int(j))
+                if key not in writers:
+                    tile_dir = os.path.join(out_dir, f"tile_x={key[0]}", f"tile_y={key[1]}")
+                    writers[key] = _TileWriter(tile_dir, (key[0] * tile_size, key[1] * tile_size), tile_size)
+                w = writers[key]
+                w.add(chunk.iloc[np.asarray(idx)])
+                if w.buffered >= row_group_size * buffer_row_groups:
+                    flush(key)
+            buffered = sum(w.buffered for w in writers.values())
+            if buffered > max_buffered_rows:
+                for key in sorted(writers, key=lambda k: writers[k].buffered, reverse=True):
+                    buffered -= writers[key].buffered
+                    flush(key)
+                    if buffered <= max_buffered_rows:
+                        break
+        for key in writers:
+            flush(key)
+    finally:
+        for w in writers.values():
+            w.close()
+    index = {
+        "version": GEOPARQUET_VERSION,
+        "tile_size": tile_size,
+        "crs": crs,
+        "rows": sum(w.rows for w in writers.values()),
+        "dropped_without_centroid": dropped,
+        "tiles": [
+            {
+                "tile_x": i, "tile_y": j, "paths": [os.path.relpath(p, out_dir) for p in w.paths],
+                "rows": w.rows, "bbox": w.bounds,
+            }
+            for (i, j), w in sorted(writers.items())
+        ],
+    }
+    with open(os.path.join(out_dir, TILE_INDEX), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    return index
+
+
+def read_geoparquet(
+    path: str,
+    bbox: tuple[float, float, float, float] | None = None,
+    columns: list[str] | None = None,
+):
+    """
+    Trees of a write_geoparquet dataset whose centroid lies in bbox =
+    (min_x, min_y, max_x, max_y), as trees_geodataframe (GeoDataFrame built from
+    the WKB column when geopandas is installed). Only tiles intersecting bbox
+    are opened, and row groups whose statistics miss bbox are skipped.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow not available for GeoParquet input")
+    with open(os.path.join(path, TILE_INDEX), "r", encoding="utf-8") as f:
+        index = json.load(f)
+    tiles = index["tiles"]
+    flt = None
+    if bbox is not None:
+        min_x, min_y, max_x, max_y = bbox
+        tiles = [
+            t for t in tiles
+            if t["bbox"][2] >= min_x and t["bbox"][0] <= max_x and t["bbox"][3] >= min_y and t["bbox"][1] <= max_y
+        ]
+        x, y = pads.field("centroid_x"), pads.field("centroid_y")
+        flt = (x >= min_x) & (x <= max_x) & (y >= min_y) & (y <= max_y)
+    crs = index.get("crs", "EPSG:3857")
+    if not index["tiles"]:
+        return trees_geodataframe(pd.DataFrame(), crs=crs)
+    files = [os.path.join(path, p) for t in tiles for p in t["paths"]]
+    if not files:
+        # Nothing intersects: read no rows, but keep the columns
+        files, flt = [os.path.join(path, index["tiles"][0]["paths"][0])], pads.scalar(False)
+    dataset = pads.dataset(files, format="parquet")
+    if columns is None:
+        columns = [c for c in dataset.schema.names if c != "bbox"]
+    elif "geometry" not in columns:
+        columns = [*columns, "geometry"]
+    return trees_geodataframe(dataset.to_table(columns=columns, filter=flt).to_pandas(), crs=crs)
@@ -1,36 +1,140 @@
 from __future__ import annotations
 import json
+import os
+from collections.abc import Iterable, Iterator
+from typing import IO
 import pandas as pd
 
 try:  # pragma: no cover - optional heavy deps
     import geopandas as gpd  # type: ignore
-    from shapely.geometry import Point  # type: ignore
 except Exception:  # pragma: no cover
     gpd = None  # type: ignore
-    Point = None  # type: ignore
+try:  # pragma: no cover - optional fast encoder
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
 
 
-def trees_geodataframe(records: list[dict]):
-    if gpd is None or Point is None:
+# Columns never written as GeoJSON properties
+_NON_PROPERTIES = ("geometry", "bbox")
+
+
+def trees_geodataframe(records: list[dict] | pd.DataFrame, crs: str = "EPSG:3857"):
+    """
+    Trees as a GeoDataFrame of centroid points. records may be a DataFrame; a
+    WKB `geometry` column (e.g. from read_geoparquet) is decoded in one
+    vectorized call, otherwise points come from centroid_x/centroid_y arrays.
+    """
+    df = records if isinstance(records, pd.DataFrame) else pd.DataFrame(records)
+    wkb = None
+    if "geometry" in df.columns:
+        # drop() returns a new frame; the caller's records keep their column
+        wkb = df["geometry"]
+        df = df.drop(columns="geometry")
+    if gpd is None:
         # Lightweight fallback: return pandas DataFrame when heavy deps missing
-        return pd.DataFrame(records)
-    df = pd.DataFrame(records)
-    geometry = [Point(xy) for xy in zip(df["centroid_x"], df["centroid_y"]) ]
-    gdf = gpd.GeoDataFrame(df, geometry=geometry, crs="EPSG:3857")
-    return gdf
+        return df
+    if wkb is not None:
+        return gpd.GeoDataFrame(df, geometry=gpd.GeoSeries.from_wkb(wkb.to_numpy(), crs=crs), crs=crs)
+    geometry = gpd.points_from_xy(df["centroid_x"].to_numpy(), df["centroid_y"].to_numpy(), crs=crs)
+    return gpd.GeoDataFrame(df, geometry=geometry, crs=crs)
+
+
+def _point_xy(df: pd.DataFrame) -> tuple[list, list]:
+    geom = getattr(df, "geometry", None) if gpd is not None and isinstance(df, gpd.GeoDataFrame) else None
+    if geom is not None:
+        if not (geom.geom_type == "Point").all():
+            raise ValueError("Streaming GeoJSON supports Point geometries only")
+        return geom.x.tolist(), geom.y.tolist()
+    return df["centroid_x"].astype(float).tolist(), df["centroid_y"].astype(float).tolist()
+
+
+def _column_values(col: pd.Series) -> list:
+    # Python scalars for the encoder; NaN/NA become null (GeoJSON is strict JSON)
+    values = col.astype(object).where(col.notna(), None).tolist() if col.hasnans else col.tolist()
+    if pd.api.types.is_datetime64_any_dtype(col.dtype):
+        values = [None if v is None else v.isoformat() for v in values]
+    return values
+
+
+def _features(df: pd.DataFrame) -> list[dict]:
+    # One dict per feature, assembled from whole columns (no per-row pandas access)
+    xs, ys = _point_xy(df)
+    props = [c for c in df.columns if c not in _NON_PROPERTIES]
+    columns = [_column_values(df[c]) for c in props]
+    rows = zip(*columns) if columns else ((),) * len(xs)
+    return [
+        {"type": "Feature", "geometry": {"type": "Point", "coordinates": [x, y]}, "properties": dict(zip(props, row))}
+        for x, y, row in zip(xs, ys, rows)
+    ]
+
+
+def _dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(",", ":"), default=str).encode()
 
 
 def to_geojson(gdf_or_df) -> dict:
-    if gpd is None or not hasattr(gdf_or_df, "to_json"):
-        # Manual minimal GeoJSON for pandas DataFrame
-        features: list[dict] = []
-        for _, r in gdf_or_df.iterrows():
-            features.append({
-                "type": "Feature",
-                "geometry": {"type": "Point", "coordinates": [float(r["centroid_x"]), float(r["centroid_y"])]},
-                "properties": {k: (None if k in {"centroid_x", "centroid_y"} else r[k]) for k in gdf_or_df.columns},
-            })
-        return {"type": "FeatureCollection", "features": features}
-    return json.loads(gdf_or_df.to_json())
+    if (
+        gpd is not None
+        and isinstance(gdf_or_df, gpd.GeoDataFrame)
+        and not (gdf_or_df.geometry.geom_type == "Point").all()
+    ):
+        return json.loads(gdf_or_df.to_json())
+    return {"type": "FeatureCollection", "features": _features(gdf_or_df)}
+
+
+def iter_geojson(
+    source: pd.DataFrame | str | Iterable[pd.DataFrame],
+    chunk_size: int = 50_000,
+    ndjson: bool = False,
+) -> Iterator[bytes]:
+    """
+    Encoded GeoJSON of a tree table (DataFrame/GeoDataFrame, .parquet/.csv
+    path or iterable of chunks), one bytes block per chunk_size features:
+    a FeatureCollection, or one Feature per line with ndjson=True. Memory use
+    is bounded by the chunk, so the blocks can go straight to a file or an
+    HTTP response. Uses orjson when installed.
+    """
+    from .export import _iter_source
+
+    if not ndjson:
+        yield b'{"type":"FeatureCollection","features":['
+    first = True
+    for chunk in _iter_source(source, chunk_size):
+        if len(chunk) == 0:
+            continue
+        features = _features(chunk)
+        if ndjson:
+            yield b"\n".join(_dumps(f) for f in features) + b"\n"
+        else:
+            # Encode the chunk as one array and drop its brackets
+            body = _dumps(features)[1:-1]
+            yield body if first else b"," + body
+        first = False
+    if not ndjson:
+        yield b"]}"
 
 
+def write_geojson(
+    source: pd.DataFrame | str | Iterable[pd.DataFrame],
+    out: str | IO[bytes],
+    chunk_size: int = 50_000,
+    ndjson: bool | None = None,
+) -> int:
+    """
+    Stream iter_geojson into a path or binary file object; ndjson defaults to
+    True for .ndjson/.geojsonl/.jsonl paths. Returns the bytes written.
+    """
+    if ndjson is None:
+        ndjson = isinstance(out, str) and out.lower().endswith((".ndjson", ".geojsonl", ".jsonl"))
+    if isinstance(out, str):
+        os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+        with open(out, "wb") as f:
+            return write_geojson(source, f, chunk_size, ndjson)
+    written = 0
+    for block in iter_geojson(source, chunk_size, ndjson):
+        out.write(block)
+        written += len(block)
+    return written
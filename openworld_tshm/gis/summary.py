@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import sqlite3
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+# Fixed bin width, so histograms of batches (and of stands) add up exactly
+HEIGHT_BIN_M = 2.0
+GRID_CELL_M = 100.0
+HEALTH_COLUMNS = ("health_idx", "health_index")
+
+# Summary tables per tree table: key columns, additive value columns
+_TABLES: dict[str, tuple[tuple[str, ...], tuple[str, ...]]] = {
+    "stand_summary": (("stand",), ("n", "height_sum", "height_n", "health_sum", "health_n")),
+    "stand_species": (("stand", "species"), ("n",)),
+    "stand_height_hist": (("stand", "bin"), ("n",)),
+    "grid_summary": (("stand", "ix", "iy"), ("n", "height_sum", "height_n", "health_sum", "health_n")),
+}
+_TYPES = {"stand": "TEXT", "species": "TEXT", "bin": "INTEGER", "ix": "INTEGER", "iy": "INTEGER", "n": "INTEGER",
+          "height_n": "INTEGER", "health_n": "INTEGER"}
+
+
+def _q(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _health_column(columns) -> str | None:
+    return next((c for c in HEALTH_COLUMNS if c in columns), None)
+
+
+def partials(trees: pd.DataFrame, cell_size: float = GRID_CELL_M, sign: int = 1) -> dict[str, pd.DataFrame]:
+    """
+    Additive aggregates of a batch of trees for every summary table (sign=-1
+    for rows being removed). Trees need a `stand` column; height, health,
+    species and centroids are used when present.
+    """
+    n = len(trees)
+    stand = trees["stand"].astype(str).to_numpy()
+    height = trees["height"].to_numpy(dtype=float) if "height" in trees else np.full(n, np.nan)
+    hcol = _health_column(trees.columns)
+    health = trees[hcol].to_numpy(dtype=float) if hcol else np.full(n, np.nan)
+    base = pd.DataFrame({
+        "stand": stand,
+        "n": 1,
+        "height_sum": np.nan_to_num(height),
+        "height_n": (~np.isnan(height)).astype(np.int64),
+        "health_sum": np.nan_to_num(health),
+        "health_n": (~np.isnan(health)).astype(np.int64),
+    })
+    values = ["n", "height_sum", "height_n", "health_sum", "health_n"]
+    out = {"stand_summary": base.groupby("stand", as_index=False)[values].sum()}
+    if "species" in trees:
+        sp = pd.DataFrame({"stand": stand, "species": trees["species"].to_numpy(), "n": 1}).dropna()
+        sp["species"] = sp["species"].astype(str)
+        out["stand_species"] = sp.groupby(["stand", "species"], as_index=False)["n"].sum()
+    ok = ~np.isnan(height)
+    hist = pd.DataFrame({"stand": stand[ok], "bin": np.floor(height[ok] / HEIGHT_BIN_M).astype(np.int64), "n": 1})
+    out["stand_height_hist"] = hist.groupby(["stand", "bin"], as_index=False)["n"].sum()
+    if "centroid_x" in trees and "centroid_y" in trees:
+        x = trees["centroid_x"].to_numpy(dtype=float)
+        y = trees["centroid_y"].to_numpy(dtype=float)
+        ok = ~(np.isnan(x) | np.isnan(y))
+        grid = base[ok].assign(
+            ix=np.floor(x[ok] / cell_size).astype(np.int64), iy=np.floor(y[ok] / cell_size).astype(np.int64)
+        )
+        out["grid_summary"] = grid.groupby(["stand", "ix", "iy"], as_index=False)[values].sum()
+    if sign != 1:
+        for name, df in out.items():
+            for col in _TABLES[name][1]:
+                df[col] = df[col] * sign
+    return out
+
+
+def create_summary_tables(conn: sqlite3.Connection, table: str = "trees", cell_size: float = GRID_CELL_M) -> None:
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {_q(table + '_summary_meta')} (key TEXT PRIMARY KEY, value REAL)")
+    meta = dict(conn.execute(f"SELECT key, value FROM {_q(table + '_summary_meta')}").fetchall())
+    if meta and (meta.get("grid_cell_m") != cell_size or meta.get("height_bin_m") != HEIGHT_BIN_M):
+        raise ValueError(
+            f"Summary tables of {table!r} use grid_cell_m={meta.get('grid_cell_m')}, "
+            f"height_bin_m={meta.get('height_bin_m')}; rebuild them with rebuild_summaries()"
+        )
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {_q(table + '_summary_meta')} VALUES (?, ?)",
+        [("grid_cell_m", cell_size), ("height_bin_m", HEIGHT_BIN_M)],
+    )
+    for name, (keys, values) in _TABLES.items():
+        cols = ", ".join(f"{c} {_TYPES.get(c, 'REAL')}" for c in keys + values)
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {_q(table + '_' + name)} ({cols}, PRIMARY KEY ({', '.join(keys)}))"
+        )
+    conn.execute(
+        f"CREATE VIEW IF NOT EXISTS {_q(table + '_stand_overview')} AS SELECT stand, n AS num_trees, "
+        "height_sum / NULLIF(height_n, 0) AS avg_height, health_sum / NULLIF(health_n, 0) AS health_index_avg "
+        f"FROM {_q(table + '_stand_summary')}"
+    )
+    cell = f"(SELECT value FROM {_q(table + '_summary_meta')} WHERE key = 'grid_cell_m')"
+    conn.execute(
+        f"CREATE VIEW IF NOT EXISTS {_q(table + '_grid_overview')} AS SELECT stand, ix, iy, "
+        f"ix * {cell} AS min_x, iy * {cell} AS min_y, (ix + 1) * {cell} AS max_x, (iy + 1) * {cell} AS max_y, "
+        "n AS num_trees, height_sum / NULLIF(height_n, 0) AS avg_height, "
+        f"health_sum / NULLIF(health_n, 0) AS health_index_avg FROM {_q(table + '_grid_summary')}"
+    )
+
+
+def apply_partials(conn: sqlite3.Connection, parts: dict[str, pd.DataFrame], table: str = "trees") -> None:
+    """Add aggregates into the summary tables (upsert); groups that drop to zero trees are removed."""
+    for name, df in parts.items():
+        if df.empty:
+            continue
+        keys, values = _TABLES[name]
+        cols = keys + values
+        target = _q(table + "_" + name)
+        conn.executemany(
+            f"INSERT INTO {target} ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)}) "
+            f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET "
+            + ", ".join(f"{v} = {v} + excluded.{v}" for v in values),
+            df[list(cols)].itertuples(index=False, name=None),
+        )
+        if (df["n"] < 0).any():
+            conn.execute(f"DELETE FROM {target} WHERE n <= 0")
+
+
+def existing_partials(
+    conn: sqlite3.Connection, labels: list[Any], table: str = "trees", cell_size: float = GRID_CELL_M
+) -> dict[str, pd.DataFrame] | None:
+    """Negated aggregates of the stored trees that rows with these labels are about to replace."""
+    types = {r[1]: r[2] for r in conn.execute(f"PRAGMA table_info({_q(table)})")}
+    columns = list(types)
+    if "stand" not in columns or not labels:
+        return None
+    # Appending past the largest stored label (the usual case) replaces nothing
+    top = conn.execute(f"SELECT max(label) FROM {_q(table)}").fetchone()[0]
+    if top is None or (isinstance(top, int) and all(isinstance(v, int) for v in labels) and min(labels) > top):
+        return None
+    # Same type as the label column, so the join compares labels the way the table stores them
+    conn.execute("DROP TABLE IF EXISTS temp._replace_labels")
+    conn.execute(f"CREATE TEMP TABLE _replace_labels (label {types['label']} PRIMARY KEY)")
+    conn.executemany("INSERT OR IGNORE INTO _replace_labels VALUES (?)", ((v,) for v in labels))
+    wanted = [c for c in ("stand", "height", "species", "centroid_x", "centroid_y", *HEALTH_COLUMNS) if c in columns]
+    old = pd.read_sql_query(
+        f"SELECT {', '.join('t.' + _q(c) for c in wanted)} FROM {_q(table)} t JOIN _replace_labels USING (label)", conn
+    )
+    if old.empty:
+        return None
+    return partials(old, cell_size, sign=-1)
+
+
+def rebuild_summaries(
+    db_path: str, table: str = "trees", cell_size: float = GRID_CELL_M, batch_size: int = 200_000
+) -> None:
+    """Recompute the summary tables from the tree table, e.g. for another grid cell size."""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("BEGIN")
+        for name in ("stand_overview", "grid_overview"):
+            conn.execute(f"DROP VIEW IF EXISTS {_q(table + '_' + name)}")
+        for name in (*_TABLES, "summary_meta"):
+            conn.execute(f"DROP TABLE IF EXISTS {_q(table + '_' + name)}")
+        create_summary_tables(conn, table, cell_size)
+        columns = [r[1] for r in conn.execute(f"PRAGMA table_info({_q(table)})")]
+        stand = _q("stand") if "stand" in columns else "'default' AS stand"
+        wanted = [_q(c) for c in ("height", "species", "centroid_x", "centroid_y", *HEALTH_COLUMNS) if c in columns]
+        sql = f"SELECT {', '.join([stand, *wanted])} FROM {_q(table)}"
+        for chunk in pd.read_sql_query(sql, conn, chunksize=batch_size):
+            apply_partials(conn, partials(chunk, cell_size), table)
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+def _metrics(stand: pd.DataFrame, species: pd.DataFrame, hist: pd.DataFrame) -> dict[str, Any]:
+    n = int(stand["n"].sum()) if len(stand) else 0
+    height_n = float(stand["height_n"].sum()) if len(stand) else 0.0
+    health_n = float(stand["health_n"].sum()) if len(stand) else 0.0
+    sp = species.groupby("species")["n"].sum() if len(species) else pd.Series(dtype=float)
+    total = float(sp.sum())
+    bins = hist.groupby("bin")["n"].sum().sort_index() if len(hist) else pd.Series(dtype=float)
+    return {
+        "num_trees": n,
+        "avg_height": float(stand["height_sum"].sum()) / height_n if height_n else 0.0,
+        "species_breakdown": {str(k): float(v) / total for k, v in sp.items()} if total else {},
+        "health_index_avg": float(stand["health_sum"].sum()) / health_n if health_n else 0.0,
+        "height_histogram": {
+            f"{b * HEIGHT_BIN_M:g}-{(b + 1) * HEIGHT_BIN_M:g}": int(v) for b, v in bins.items()
+        },
+    }
+
+
+def summary_from_frame(trees: pd.DataFrame) -> dict[str, Any]:
+    """Report metrics of an in-memory tree table, computed like the stored summaries."""
+    if "stand" not in trees:
+        trees = trees.assign(stand="default")
+    parts = partials(trees)
+    empty = pd.DataFrame(columns=["stand", "species", "bin", "n"])
+    return _metrics(parts["stand_summary"], parts.get("stand_species", empty), parts.get("stand_height_hist", empty))
+
+
+def has_summaries(db_path: str, table: str = "trees") -> bool:
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        row = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table + "_stand_summary",)
+        ).fetchone()
+        return row is not None
+    finally:
+        conn.close()
+
+
+def read_summary(db_path: str, stand: str | None = None, table: str = "trees") -> dict[str, Any]:
+    """
+    Report metrics (num_trees, avg_height, species_breakdown, health_index_avg,
+    height_histogram) of one stand, or of all stands, read from the summary
+    tables; the cost does not depend on the number of trees.
+    """
+    where, args = ("WHERE stand = ?", (stand,)) if stand is not None else ("", ())
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        frames = [
+            pd.read_sql_query(f"SELECT * FROM {_q(table + '_' + name)} {where}", conn, params=args)
+            for name in ("stand_summary", "stand_species", "stand_height_hist")
+        ]
+    finally:
+        conn.close()
+    return _metrics(*frames)
+
+
+def read_grid(
+    db_path: str,
+    stand: str | None = None,
+    bbox: tuple[float, float, float, float] | None = None,
+    table: str = "trees",
+) -> pd.DataFrame:
+    """Per grid cell counts and means, optionally limited to cells intersecting bbox = (min_x, min_y, max_x, max_y)."""
+    clauses: list[str] = []
+    args: list[Any] = []
+    if stand is not None:
+        clauses.append("stand = ?")
+        args.append(stand)
+    if bbox is not None:
+        clauses.append("max_x >= ? AND min_x <= ? AND max_y >= ? AND min_y <= ?")
+        args += [bbox[0], bbox[2], bbox[1], bbox[3]]
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return pd.read_sql_query(f"SELECT * FROM {_q(table + '_grid_overview')} {where}", conn, params=args)
+    finally:
+        conn.close()
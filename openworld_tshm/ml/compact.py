@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import os
+import pickle
+import time
+from dataclasses import replace
+from typing import Any
+
+import joblib
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+from ..utils.io import write_json
+from .packed import PackedForest, pack_model, save_packed
+from .train import load_config, prepare_matrices
+
+DEPTHS = (None, 16, 12, 10, 8, 6)
+
+
+def node_depths(packed: PackedForest) -> np.ndarray:
+    """Depth of every node below its tree's root (leaves loop to themselves)."""
+    depth = np.full(len(packed.feature), -1, dtype=np.int64)
+    depth[packed.roots] = 0
+    idx = np.arange(len(depth))
+    frontier = np.asarray(packed.roots)
+    d = 0
+    while frontier.size:
+        kids = packed.children[frontier]
+        internal = kids[:, 0] != idx[frontier]
+        frontier = kids[internal].ravel()
+        d += 1
+        depth[frontier] = d
+    return depth
+
+
+def subforest(packed: PackedForest, trees: np.ndarray, max_depth: int | None = None) -> PackedForest:
+    """
+    New packed forest holding only `trees` (indices into packed.roots), each cut
+    at max_depth: nodes at that depth become leaves carrying their own value
+    (the class distribution or mean target of the samples that reached them).
+    Node arrays are re-indexed so dropped nodes take no space.
+    """
+    trees = np.asarray(trees, dtype=np.int64)
+    depth = node_depths(packed)
+    n_nodes = len(depth)
+    tree_of = np.searchsorted(packed.roots, np.arange(n_nodes), side="right") - 1
+    keep = np.isin(tree_of, trees)
+    if max_depth is not None:
+        keep &= depth <= max_depth
+    new_index = np.cumsum(keep) - 1
+    idx = np.flatnonzero(keep)
+    children = packed.children[idx]
+    threshold = np.asarray(packed.threshold[idx]).copy()
+    feature = np.asarray(packed.feature[idx]).copy()
+    missing_right = np.asarray(packed.missing_right[idx]).copy()
+    if max_depth is not None:
+        cut = depth[idx] == max_depth
+        children = np.where(cut[:, None], idx[:, None], children)
+        threshold[cut] = np.inf
+        feature[cut] = 0
+        missing_right[cut] = False
+    return replace(
+        packed,
+        feature=feature,
+        threshold=threshold,
+        children=new_index[children],
+        missing_right=missing_right,
+        value=np.asarray(packed.value[idx]).copy(),
+        roots=new_index[packed.roots[trees]],
+        tree_group=np.asarray(packed.tree_group[trees]).copy(),
+        max_depth=int(depth[keep].max(initial=0)),
+    )
+
+
+def _loss(packed: PackedForest, pred: np.ndarray, y: np.ndarray) -> float:
+    if packed.kind == "classifier":
+        if packed.classes is None:
+            raise ValueError("Packed classifier has no classes")
+        return float(np.mean(packed.classes.take(np.argmax(pred, axis=-1)) != y))
+    return float(np.mean(np.abs(pred - y)))
+
+
+def greedy_select(
+    per_tree: np.ndarray,
+    reference: np.ndarray,
+    packed: PackedForest,
+    y: np.ndarray,
+    target: float,
+    min_trees: int = 1,
+) -> tuple[list[int], list[float]]:
+    """
+    Ordered pruning by forward selection: repeatedly add the tree that brings
+    the averaged ensemble closest (squared error) to the full forest's output
+    `reference`, until at least min_trees are in and the validation loss
+    against y reaches target. Matching the full forest's probabilities is far
+    less noisy on small validation sets than greedily chasing 0/1 accuracy.
+    per_tree is (trees, rows) for regressors or (trees, rows, classes).
+    Returns the chosen trees in order and the loss after each addition.
+    """
+    n_trees = per_tree.shape[0]
+    total = np.zeros(per_tree.shape[1:], dtype=np.float64)
+    remaining = np.ones(n_trees, dtype=bool)
+    chosen: list[int] = []
+    curve: list[float] = []
+    for k in range(1, n_trees + 1):
+        cand = np.flatnonzero(remaining)
+        trial = (total[None] + per_tree[cand]) / k
+        dist = ((trial - reference[None]) ** 2).reshape(len(cand), -1).mean(axis=1)
+        t = int(cand[int(np.argmin(dist))])
+        chosen.append(t)
+        total += per_tree[t]
+        remaining[t] = False
+        curve.append(_loss(packed, total / k, y))
+        if k >= min_trees and curve[-1] <= target:
+            break
+    return chosen, curve
+
+
+def compact_forest(
+    model: Any,
+    X_val,
+    y_val,
+    tolerance: float = 0.005,
+    depths: tuple[int | None, ...] = DEPTHS,
+    min_trees: int = 10,
+) -> tuple[PackedForest, dict[str, Any]]:
+    """
+    Smallest tree subset and depth limit of a random forest whose validation
+    loss (error rate for classifiers, MAE for regressors) stays within
+    `tolerance` of the full forest. For every depth limit the trees are
+    chosen greedily on (X_val, y_val), never fewer than min_trees; the
+    candidate with the fewest nodes wins. Works on the packed node arrays, so
+    each tree is evaluated once per depth.
+    """
+    packed = pack_model(model)
+    if packed.aggregate != "mean":
+        raise TypeError("Compaction applies to random forests; boosted trees are additive")
+    y = np.asarray(y_val)
+    reference = packed._raw(X_val)
+    full = _loss(packed, reference, y)
+    target = full + tolerance
+    best: tuple[int, int | None, list[int]] | None = None
+    candidates = []
+    for d in depths:
+        if d is not None and d >= packed.max_depth:
+            continue
+        cut = subforest(packed, np.arange(packed.n_trees), d)
+        per_tree = np.moveaxis(np.asarray(cut.value)[cut.apply(X_val)], 1, 0)
+        chosen, curve = greedy_select(per_tree, reference, packed, y, target, min(min_trees, packed.n_trees))
+        if curve[-1] > target:
+            candidates.append({"max_depth": d, "n_trees": None, "loss": curve[-1]})
+            continue
+        n_nodes = len(subforest(cut, np.asarray(chosen)).feature)
+        candidates.append({"max_depth": d, "n_trees": len(chosen), "n_nodes": n_nodes, "loss": curve[-1]})
+        if best is None or n_nodes < best[0]:
+            best = (n_nodes, d, chosen)
+    if best is None:  # pragma: no cover - the unlimited depth always reaches the full loss
+        best = (len(packed.feature), None, list(range(packed.n_trees)))
+    compact = subforest(packed, np.sort(np.asarray(best[2])), best[1])
+    info = {"full_loss": full, "target_loss": target, "max_depth": best[1], "candidates": candidates}
+    return compact, info
+
+
+def _latency_ms(fn, X, repeat: int = 5) -> float:
+    fn(X)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(X)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times) * 1e3)
+
+
+def _dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+def compact_model(
+    model_dir: str,
+    target: str = "species",
+    tolerance: float = 0.005,
+    out: str | None = None,
+    depths: tuple[int | None, ...] = DEPTHS,
+    min_trees: int = 10,
+) -> dict[str, Any]:
+    """
+    Compact `<target>_model.pkl` from `train` and write it as a packed
+    artifact (default `<target>_model.compact.packed`; renaming it to
+    `<target>_model.packed` makes `predict` use it). The held-out rows are
+    rebuilt with the config.json of the training run, so a model directory
+    without one raises FileNotFoundError. Trees are selected on half of the
+    rows train_all held out for testing; the other half measures accuracy
+    (or MAE) before and after, next to artifact size, node count and batch
+    latency. The report is written to `<target>_compaction.json` and returned.
+    """
+    cfg = load_config(model_dir)
+    src = os.path.join(model_dir, f"{target}_model.pkl")
+    model = joblib.load(src)
+    model = getattr(model, "model", model)
+    X, y = prepare_matrices(cfg)[target]
+    # Same split as train_all, so none of these rows were used for fitting
+    stratify = y if target == "species" else None
+    _, X_te, _, y_te = train_test_split(X, y, test_size=0.2, random_state=cfg.seed, stratify=stratify)
+    X_sel, X_eval, y_sel, y_eval = train_test_split(
+        X_te, y_te, test_size=0.5, random_state=cfg.seed, stratify=y_te if target == "species" else None
+    )
+    compact, info = compact_forest(model, X_sel, y_sel, tolerance=tolerance, depths=depths, min_trees=min_trees)
+    out = out or os.path.join(model_dir, f"{target}_model.compact.packed")
+    save_packed(compact, out, source=src)
+    full = pack_model(model)
+    y_eval = np.asarray(y_eval)
+    metric = "accuracy" if full.kind == "classifier" else "mae"
+
+    def score(pred: np.ndarray) -> float:
+        return float(np.mean(pred == y_eval)) if metric == "accuracy" else float(np.mean(np.abs(pred - y_eval)))
+
+    report = {
+        "target": target,
+        "tolerance": tolerance,
+        "metric": metric,
+        "selection": info,
+        "before": {
+            "artifact": src,
+            "n_trees": full.n_trees,
+            "n_nodes": len(full.feature),
+            "max_depth": full.max_depth,
+            "size_bytes": os.path.getsize(src),
+            "pickle_bytes": len(pickle.dumps(model)),
+            "latency_ms": _latency_ms(model.predict, X_eval),
+            metric: score(np.asarray(model.predict(X_eval))),
+        },
+        "after": {
+            "artifact": out,
+            "n_trees": compact.n_trees,
+            "n_nodes": len(compact.feature),
+            "max_depth": compact.max_depth,
+            "size_bytes": _dir_size(out),
+            "latency_ms": _latency_ms(compact.predict, X_eval),
+            metric: score(compact.predict(X_eval)),
+        },
+    }
+    write_json(os.path.join(model_dir, f"{target}_compaction.json"), report)
+    return report
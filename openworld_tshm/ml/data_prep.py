@@ -6,33 +6,36 @@ from sklearn.impute import KNNImputer, SimpleImputer
 from typing import List
 from ..plugin_loader import load_plugins
 from ..schemas import TreeRecord
+from ..synthetic import BASE_HEIGHT, GROWTH_FACTOR, NDVI_OFFSET, CROWN_RATIO, BARK_ROUGHNESS, species_codes
+from .impute import impute_nearest
 
 def synthesize_training_data(n: int = 200, seed: int = 42) -> pd.DataFrame:
     rng = np.random.default_rng(seed)
     species = rng.choice(["pine", "oak", "spruce"], size=n)
+    code = species_codes(species)
     # Increase separability between species with distinct base heights
-    base_height = np.array([{ "pine": 35, "oak": 18, "spruce": 26 }[s] for s in species])
+    base_height = BASE_HEIGHT[code]
     age = rng.integers(5, 60, size=n)
     health_idx = rng.uniform(0.5, 1.0, size=n) - 0.005 * (age - 30).clip(min=0)
 
     # Species-specific growth patterns
-    growth_factor = np.array([{ "pine": 0.4, "oak": 0.25, "spruce": 0.35 }[s] for s in species])
+    growth_factor = GROWTH_FACTOR[code]
     noise = rng.normal(0, 0.8, size=n)
     height = base_height + growth_factor * age * health_idx + noise
 
     # Species-specific NDVI offsets for separability
-    ndvi_offset = np.array([{ "pine": 0.08, "oak": -0.05, "spruce": 0.03 }[s] for s in species])
+    ndvi_offset = NDVI_OFFSET[code]
     ndvi = health_idx + ndvi_offset + rng.normal(0, 0.02, size=n)
 
     # Add crown shape characteristics (pine: conical, oak: rounded, spruce: columnar)
-    crown_ratio = np.array([{ "pine": 2.5, "oak": 1.8, "spruce": 3.0 }[s] for s in species])
+    crown_ratio = CROWN_RATIO[code]
     crown_shape = crown_ratio + rng.normal(0, 0.3, size=n)
 
     footprint = rng.uniform(8, 120, size=n)
     point_count = (footprint * 6 + rng.integers(0, 60, size=n)).astype(int)
 
     # Add bark texture indicator (roughness)
-    bark_roughness = np.array([{ "pine": 0.3, "oak": 0.7, "spruce": 0.4 }[s] for s in species])
+    bark_roughness = BARK_ROUGHNESS[code]
     bark_texture = bark_roughness + rng.normal(0, 0.1, size=n)
 
     label = np.arange(n)
@@ -94,18 +97,35 @@ def load_real_data(source_paths: List[str], plugin_name: str = "auto") -> pd.Dat
     df = pd.concat(data_frames, ignore_index=True)
     return df
 
-def validate_and_impute(df: pd.DataFrame) -> pd.DataFrame:
+def validate_and_impute(
+    df: pd.DataFrame,
+    method: str = "knn",
+    n_neighbors: int = 5,
+    chunk_size: int = 50_000,
+    n_jobs: int = 1,
+) -> pd.DataFrame:
     """
     Validate DataFrame rows against TreeRecord schema and impute missing values.
-    Numerical: KNNImputer, Categorical: most_frequent.
+    Numerical: KNNImputer (method="knn") or KD-tree neighbours over complete rows,
+    processed in chunks (method="kdtree", see impute_nearest). Categorical: most_frequent.
     """
+    if method not in {"knn", "kdtree"}:
+        raise ValueError(f"Unknown imputation method: {method}")
     # Imputation first to handle missing values
     numerical_cols = df.select_dtypes(include=[np.number]).columns.tolist()
     categorical_cols = df.select_dtypes(include=['object']).columns.tolist()
     
     if numerical_cols:
-        imputer_num = KNNImputer(n_neighbors=5)
-        df[numerical_cols] = imputer_num.fit_transform(df[numerical_cols])
+        if method == "kdtree":
+            df[numerical_cols] = impute_nearest(
+                df[numerical_cols].to_numpy(dtype=float),
+                n_neighbors=n_neighbors,
+                chunk_size=chunk_size,
+                n_jobs=n_jobs,
+            )
+        else:
+            imputer_num = KNNImputer(n_neighbors=n_neighbors)
+            df[numerical_cols] = imputer_num.fit_transform(df[numerical_cols])
     
     if categorical_cols:
         imputer_cat = SimpleImputer(strategy='most_frequent')
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# Written next to the models by train_all
+PROFILE_FILE = "feature_profile.json"
+# Quantile levels kept per feature; enough to approximate the reference CDF
+_LEVELS = np.linspace(0.0, 1.0, 101)
+
+
+def feature_profile(X: pd.DataFrame, y: Any, model_type: str, rows: dict[str, int]) -> dict[str, Any]:
+    """
+    Compact reference distribution of the training features (101 quantiles
+    each) plus the class labels, model type and training rows per target.
+    """
+    return {
+        "model_type": model_type,
+        "rows": rows,
+        "classes": sorted(str(c) for c in pd.unique(np.asarray(y))),
+        "features": {c: np.quantile(np.asarray(X[c], dtype=float), _LEVELS).tolist() for c in X.columns},
+    }
+
+
+def drift_report(profile: dict[str, Any], X: pd.DataFrame, y: Any, alpha: float = 0.01) -> dict[str, Any]:
+    """
+    One-sample KS test of each feature of a new batch against the profile's
+    quantile CDF, Bonferroni-corrected over features, plus a check that the
+    batch has exactly the trained classes. The p-values account for batch
+    size, so small batches are not flagged for noise alone.
+    """
+    features = profile["features"]
+    tests: dict[str, Any] = {}
+    for col, q in features.items():
+        q = np.asarray(q)
+        values = np.asarray(X[col], dtype=float)
+        # Flat stretches (discrete features) need strictly increasing knots for interp
+        knots, idx = np.unique(q, return_index=True)
+        cdf = lambda v, knots=knots, levels=_LEVELS[idx]: np.interp(v, knots, levels, left=0.0, right=1.0)
+        res = stats.kstest(values, cdf)
+        tests[col] = {"statistic": float(res.statistic), "pvalue": float(res.pvalue)}
+    drifted = sorted(c for c, t in tests.items() if t["pvalue"] < alpha / max(len(tests), 1))
+    classes = sorted(str(c) for c in pd.unique(np.asarray(y)))
+    classes_changed = classes != profile["classes"]
+    return {
+        "features": tests,
+        "drifted_features": drifted,
+        "classes": classes,
+        "classes_changed": classes_changed,
+        "drifted": bool(drifted) or classes_changed,
+    }
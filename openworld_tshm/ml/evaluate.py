@@ -1,10 +1,213 @@
 from __future__ import annotations
+
+import hashlib
 import json
+import multiprocessing as mp
+import os
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
 from typing import Any
 
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from ..utils.io import ensure_dir, write_json
+from .feature_store import feature_key
+from .train import TrainConfig, data_settings, prepare_matrices, train_all
+
+try:  # pragma: no cover - optional heavy deps
+    from threadpoolctl import threadpool_limits  # type: ignore
+except ImportError:  # pragma: no cover
+    threadpool_limits = None  # type: ignore
+
+
+# Bump when a cell's metrics would change meaning for the same inputs
+EVAL_VERSION = 1
+
+# Settings shared by all cells of the current evaluation; set by _init_worker
+_EVAL: dict[str, Any] | None = None
+
 
 def load_metrics(path: str) -> dict[str, Any]:
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
+def _data_label(sources: list[str]) -> str:
+    real = bool(sources) and all(os.path.exists(p) for p in sources)
+    return "+".join(os.path.basename(p) for p in sources) if real else "synthetic"
+
+
+def matrix_cells(
+    seeds: list[int], model_types: list[str], source_sets: list[list[str]]
+) -> list[dict[str, Any]]:
+    """One cell per seed x model type x source set, in a stable order."""
+    return [
+        {"seed": int(seed), "model_type": mt, "sources": list(src), "data": _data_label(list(src))}
+        for src, mt, seed in product(source_sets, model_types, seeds)
+    ]
+
+
+def _settings(cell: dict[str, Any], impute_method: str) -> tuple[list[str], dict[str, Any]]:
+    # The data the cell's training run builds its matrices from
+    return data_settings(TrainConfig(seed=cell["seed"], data_sources=cell["sources"], impute_method=impute_method))
+
+
+def cell_key(cell: dict[str, Any], impute_method: str = "knn") -> str:
+    """
+    Content address of a cell: its seed and model type plus the feature key of
+    its data (input file hashes, prep settings, feature lists). A cell whose
+    key has a stored result is not run again.
+    """
+    sources, settings = _settings(cell, impute_method)
+    payload = {
+        "version": EVAL_VERSION,
+        "seed": cell["seed"],
+        "model_type": cell["model_type"],
+        "data": feature_key(sources, settings),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def _init_worker(shared: dict[str, Any], n_threads: int) -> None:
+    global _EVAL
+    _EVAL = shared
+    if threadpool_limits is not None:
+        threadpool_limits(limits=n_threads)
+
+
+def run_cell(cell: dict[str, Any], key: str) -> dict[str, float]:
+    """Train one cell (models are not saved) and return its numeric metrics."""
+    if _EVAL is None:
+        raise RuntimeError("Evaluation worker not initialised")
+    cfg = TrainConfig(
+        seed=cell["seed"],
+        out_dir=os.path.join(_EVAL["out_dir"], "cells", key),
+        save_models=False,
+        model_type=cell["model_type"],
+        data_sources=cell["sources"],
+        impute_method=_EVAL["impute_method"],
+        feature_store=_EVAL["feature_store"],
+    )
+    metrics = train_all(cfg)
+    return {
+        k: float(v) for k, v in metrics.items()
+        if isinstance(v, (int, float, np.number)) and not isinstance(v, bool)
+    }
+
+
+def summarize(table: pd.DataFrame, confidence: float = 0.95) -> pd.DataFrame:
+    """
+    Mean, standard deviation and Student-t confidence interval of every metric
+    over seeds, per model type and data set. The interval is NaN for one seed.
+    """
+    grouped = table.groupby(["model_type", "data", "metric"], sort=True)["value"]
+    out = grouped.agg(n="count", mean="mean", std="std").reset_index()
+    sem = out["std"] / np.sqrt(out["n"])
+    half = stats.t.ppf(0.5 + confidence / 2, np.maximum(out["n"] - 1, 1)) * sem
+    half[out["n"] < 2] = np.nan
+    out["ci_low"] = out["mean"] - half
+    out["ci_high"] = out["mean"] + half
+    return out
+
+
+def evaluate_matrix(
+    seeds: list[int],
+    model_types: Sequence[str] = ("basic", "advanced"),
+    source_sets: list[list[str]] | None = None,
+    out_dir: str = "artifacts/eval",
+    n_jobs: int = 1,
+    impute_method: str = "knn",
+    force: bool = False,
+    confidence: float = 0.95,
+) -> dict[str, Any]:
+    """
+    Train every seed x model type x source-set cell and collect the metrics.
+    Feature matrices are built once per distinct data set into a feature store
+    under out_dir and memory-mapped by all cells; cells run in a process pool
+    of n_jobs workers (-1: all cores). Each finished cell is stored under
+    `cells/<key>.json`, so a rerun only trains cells whose inputs changed
+    (unless force). Cells are stored as they finish, so a failing cell does
+    not discard the others; its error is raised once the pool is done.
+    Writes the tidy table (one row per cell and metric) to
+    results.csv and the per-group summary with confidence intervals to
+    summary.csv.
+    """
+    global _EVAL
+    source_sets = [list(s) for s in (source_sets or [TrainConfig().data_sources])]
+    cells = matrix_cells(list(seeds), list(model_types), source_sets)
+    cell_dir = os.path.join(out_dir, "cells")
+    ensure_dir(cell_dir)
+    shared = {
+        "out_dir": out_dir,
+        "impute_method": impute_method,
+        "feature_store": os.path.join(out_dir, "features"),
+    }
+    keys = [cell_key(c, impute_method) for c in cells]
+    done: dict[str, dict[str, float]] = {}
+    pending: dict[str, int] = {}  # identical cells (e.g. two missing sources) run once
+    for i, key in enumerate(keys):
+        path = os.path.join(cell_dir, f"{key}.json")
+        if key in done or key in pending:
+            continue
+        if not force and os.path.exists(path):
+            done[key] = load_metrics(path)["metrics"]
+        else:
+            pending[key] = i
+    todo = list(pending.values())
+    # Build each distinct data set once, before the pool starts, so workers only read the store
+    warmed: set[str] = set()
+    for i in todo:
+        data_key = json.dumps(_settings(cells[i], impute_method), sort_keys=True)
+        if data_key not in warmed:
+            prepare_matrices(TrainConfig(
+                seed=cells[i]["seed"], data_sources=cells[i]["sources"],
+                impute_method=impute_method, feature_store=shared["feature_store"],
+            ))
+            warmed.add(data_key)
+    cores = os.cpu_count() or 1
+    workers = min(n_jobs if n_jobs > 0 else cores, max(len(todo), 1))
+    fresh: dict[int, dict[str, float]] = {}
+
+    def store(i: int, metrics: dict[str, float]) -> None:
+        write_json(os.path.join(cell_dir, f"{keys[i]}.json"), {"cell": cells[i], "metrics": metrics})
+        fresh[i] = done[keys[i]] = metrics
+
+    if workers > 1:
+        ctx = mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=ctx,
+            initializer=_init_worker, initargs=(shared, max(cores // workers, 1)),
+        ) as ex:
+            futures = {ex.submit(run_cell, cells[i], keys[i]): i for i in todo}
+            for f in as_completed(futures):
+                if f.exception() is None:
+                    store(futures[f], f.result())
+        for f in futures:
+            error = f.exception()
+            if error is not None:
+                raise error
+    else:
+        _EVAL = shared
+        try:
+            for i in todo:
+                store(i, run_cell(cells[i], keys[i]))
+        finally:
+            _EVAL = None
+    rows = [
+        {"seed": c["seed"], "model_type": c["model_type"], "data": c["data"], "metric": m, "value": v, "cell": k}
+        for c, k in zip(cells, keys)
+        for m, v in done[k].items()
+    ]
+    table = pd.DataFrame(rows, columns=["seed", "model_type", "data", "metric", "value", "cell"])
+    summary = summarize(table, confidence)
+    table.to_csv(os.path.join(out_dir, "results.csv"), index=False)
+    summary.to_csv(os.path.join(out_dir, "summary.csv"), index=False)
+    return {
+        "table": table,
+        "summary": summary,
+        "ran": len(fresh),
+        "skipped": len(set(keys)) - len(fresh),
+    }
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import os
+import shutil
+import time
+from collections.abc import Iterator
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from ..utils.io import ensure_dir, write_json
+from .features import FEATURES_HEIGHT, FEATURES_SPECIES
+from .models_advanced import XGBoostHeightRegressor, XGBoostSpeciesClassifier
+from .packed import save_packed
+from .predict import iter_table
+
+try:  # pragma: no cover - optional heavy deps
+    import xgboost as xgb  # type: ignore
+except ImportError:  # pragma: no cover
+    xgb = None  # type: ignore
+
+
+FEATURES = {"height": FEATURES_HEIGHT, "species": FEATURES_SPECIES}
+CACHE_DIR = ".xgb_cache"
+
+
+def iter_chunks(sources: list[str], chunk_size: int) -> Iterator[tuple[int, pd.DataFrame]]:
+    """(global row offset, chunk) over all sources, in order, chunk_size rows at a time."""
+    offset = 0
+    for path in sources:
+        for chunk in iter_table(path, chunk_size):
+            yield offset, chunk
+            offset += len(chunk)
+
+
+def holdout_mask(start: int, n: int, seed: int, test_size: float) -> np.ndarray:
+    """
+    True for rows start..start+n-1 that belong to the test split. Each row's
+    side is a splitmix64 hash of its global index and the seed, so the split
+    needs no pass over the data, holds no per-row state and does not depend
+    on the chunk size.
+    """
+    with np.errstate(over="ignore"):
+        z = np.arange(start, start + n, dtype=np.uint64) + np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z ^= z >> np.uint64(31)
+    return (z >> np.uint64(11)).astype(np.float64) / float(1 << 53) < test_size
+
+
+def _split_chunk(
+    start: int, chunk: pd.DataFrame, target: str, seed: int, test_size: float, test: bool
+) -> tuple[np.ndarray, np.ndarray]:
+    missing = [c for c in FEATURES[target] + [target] if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"Source is missing columns: {missing}")
+    keep = holdout_mask(start, len(chunk), seed, test_size) == test
+    keep &= chunk[target].notna().to_numpy()
+    # Missing feature values stay NaN; XGBoost learns a default direction for them
+    X = chunk.loc[keep, FEATURES[target]].to_numpy(dtype=np.float32)
+    return X, chunk.loc[keep, target].to_numpy()
+
+
+if xgb is not None:
+
+    class ChunkIter(xgb.DataIter):
+        """
+        Training rows of one target, one source chunk per batch. XGBoost pulls
+        the batches repeatedly (sketching, then page building) and keeps only
+        its compressed pages in the on-disk cache at cache_prefix.
+        """
+
+        def __init__(
+            self,
+            sources: list[str],
+            target: str,
+            chunk_size: int,
+            seed: int,
+            test_size: float,
+            cache_prefix: str,
+            classes: np.ndarray | None = None,
+        ) -> None:
+            self.sources, self.target, self.chunk_size = sources, target, chunk_size
+            self.seed, self.test_size, self.classes = seed, test_size, classes
+            self.batches = 0
+            self._chunks: Iterator[tuple[int, pd.DataFrame]] | None = None
+            super().__init__(cache_prefix=cache_prefix)
+
+        def next(self, input_data) -> bool:
+            if self._chunks is None:
+                self._chunks = iter_chunks(self.sources, self.chunk_size)
+            for start, chunk in self._chunks:
+                X, y = _split_chunk(start, chunk, self.target, self.seed, self.test_size, test=False)
+                if not len(X):
+                    continue
+                if self.classes is not None:
+                    y = np.searchsorted(self.classes, y.astype(str))
+                input_data(data=X, label=y)
+                self.batches += 1
+                return True
+            return False
+
+        def reset(self) -> None:
+            self._chunks = None
+            self.batches = 0  # counts the batches of one pass
+
+
+def scan_classes(sources: list[str], chunk_size: int) -> np.ndarray:
+    """Sorted species labels over all sources, collected chunk by chunk."""
+    seen: set[str] = set()
+    for _, chunk in iter_chunks(sources, chunk_size):
+        seen.update(chunk["species"].dropna().astype(str).unique())
+    return np.array(sorted(seen))
+
+
+def _booster_params(model: Any) -> dict[str, Any]:
+    params = {k: v for k, v in model.get_xgb_params().items() if v is not None}
+    params["tree_method"] = "hist"  # the only method external memory supports
+    return params
+
+
+def _evaluate(
+    models: dict[str, Any], sources: list[str], chunk_size: int, seed: int, test_size: float
+) -> dict[str, float]:
+    # Held-out rows are streamed too; only running sums are kept
+    abs_err, n_h, correct, n_s = 0.0, 0, 0, 0
+    for start, chunk in iter_chunks(sources, chunk_size):
+        X, y = _split_chunk(start, chunk, "height", seed, test_size, test=True)
+        if len(X):
+            abs_err += float(np.abs(models["height"].predict(X) - y.astype(float)).sum())
+            n_h += len(X)
+        X, y = _split_chunk(start, chunk, "species", seed, test_size, test=True)
+        if len(X):
+            correct += int((models["species"].predict(X) == y.astype(str)).sum())
+            n_s += len(X)
+    return {
+        "height_mae": abs_err / n_h if n_h else float("nan"),
+        "species_acc": correct / n_s if n_s else float("nan"),
+        "height_test_rows": n_h,
+        "species_test_rows": n_s,
+    }
+
+
+def train_external(
+    cfg,
+    sources: list[str] | None = None,
+    chunk_size: int = 100_000,
+    test_size: float = 0.2,
+    max_bin: int = 256,
+) -> dict[str, Any]:
+    """
+    Out-of-core training of the advanced (XGBoost) models on chunked CSV or
+    Parquet sources. Each target is fed through a ChunkIter into an
+    ExtMemQuantileDMatrix, so at most one chunk is held in memory besides
+    XGBoost's compressed pages. The train/test split is a per-row hash
+    (holdout_mask) and the test metrics are accumulated by streaming the
+    held-out rows, so peak memory depends on chunk_size, not on the row count.
+    No imputation runs: missing features are left to XGBoost. Writes the
+    models and metrics.json like train_all.
+    """
+    if xgb is None:
+        raise RuntimeError("xgboost not available for out-of-core training")
+    sources = list(sources if sources is not None else cfg.data_sources)
+    missing = [p for p in sources if not os.path.exists(p)]
+    if missing or not sources:
+        raise FileNotFoundError(f"Out-of-core training needs existing sources: {missing or sources}")
+    ensure_dir(cfg.out_dir)
+    cache = os.path.join(cfg.out_dir, CACHE_DIR)
+    start_time = time.perf_counter()
+    classes = scan_classes(sources, chunk_size)
+    hr = XGBoostHeightRegressor.create(cfg.seed)
+    sc = XGBoostSpeciesClassifier.create(cfg.seed)
+    sc.classes_ = classes
+    batches: dict[str, int] = {}
+    try:
+        for target, wrapper in (("height", hr), ("species", sc)):
+            ensure_dir(cache)
+            it = ChunkIter(
+                sources, target, chunk_size, cfg.seed, test_size,
+                cache_prefix=os.path.join(cache, target),
+                classes=classes if target == "species" else None,
+            )
+            dtrain = xgb.ExtMemQuantileDMatrix(it, max_bin=max_bin)
+            params = _booster_params(wrapper.model)
+            if target == "species":
+                params.update(objective="multi:softprob", num_class=len(classes))
+            booster = xgb.train(params, dtrain, num_boost_round=wrapper.n_estimators)
+            # Hand the booster to the sklearn wrapper so predict/save/pack work as usual
+            wrapper.model.load_model(bytearray(booster.save_raw("ubj")))
+            batches[target] = it.batches
+            del dtrain, booster
+    finally:
+        shutil.rmtree(cache, ignore_errors=True)
+    metrics: dict[str, Any] = _evaluate({"height": hr, "species": sc}, sources, chunk_size, cfg.seed, test_size)
+    metrics.update(
+        model_type="advanced",
+        out_of_core=True,
+        chunk_size=chunk_size,
+        train_batches=batches,
+        train_seconds=time.perf_counter() - start_time,
+        data_sources=sources,
+    )
+    if cfg.save_models:
+        hr_path = os.path.join(cfg.out_dir, "height_model.pkl")
+        sc_path = os.path.join(cfg.out_dir, "species_model.pkl")
+        hr.save(hr_path)
+        sc.save(sc_path)
+        metrics["height_model_path"] = hr_path
+        metrics["species_model_path"] = sc_path
+        if cfg.packed_models:
+            save_packed(hr, os.path.join(cfg.out_dir, "height_model.packed"), source=hr_path)
+            save_packed(sc, os.path.join(cfg.out_dir, "species_model.packed"), source=sc_path)
+    write_json(os.path.join(cfg.out_dir, "metrics.json"), metrics)
+    return metrics
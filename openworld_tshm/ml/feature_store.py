@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import Any, Literal
+
+import numpy as np
+import pandas as pd
+
+from ..utils.hashing import cached_sha256
+from ..utils.io import ensure_dir
+from ..utils.store import EntryStore
+from .features import FEATURES_HEIGHT, FEATURES_SPECIES
+
+# Bump when the on-disk layout or the prep pipeline changes meaning
+STORE_VERSION = 1
+
+
+def feature_key(sources: list[str], settings: dict[str, Any]) -> str:
+    """
+    Content address for a set of training matrices: hashes of the input files,
+    the prep settings (imputation, synthetic fallback) and the feature lists.
+    Any change to one of them yields a new key, so stale entries are never read.
+    """
+    payload = {
+        "version": STORE_VERSION,
+        "sources": [
+            {"name": os.path.basename(p), "sha256": cached_sha256(p) if os.path.exists(p) else None}
+            for p in sources
+        ],
+        "settings": settings,
+        "features": {"height": FEATURES_HEIGHT, "species": FEATURES_SPECIES},
+    }
+    h = hashlib.sha256()
+    h.update(json.dumps(payload, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+class FeatureStore(EntryStore):
+    """
+    Finished X/y matrices per target, stored one `.npy` file per column under
+    `<root>/<key>/<target>/` so they can be opened with mmap_mode="r". Keeps
+    the max_entries most recently used entries.
+    """
+
+    def __init__(self, root: str, max_entries: int = 32) -> None:
+        super().__init__(root, max_entries=max_entries)
+
+    def put(self, key: str, matrices: dict[str, tuple[pd.DataFrame, pd.Series]], info: dict[str, Any] | None = None) -> str:
+        tmp = self.staging(key)
+        targets: dict[str, Any] = {}
+        for target, (X, y) in matrices.items():
+            tdir = os.path.join(tmp, target)
+            ensure_dir(tdir)
+            for i, col in enumerate(X.columns):
+                np.save(os.path.join(tdir, f"x{i}.npy"), np.ascontiguousarray(X[col].to_numpy()))
+            y_arr = y.to_numpy()
+            if y_arr.dtype == object or not np.issubdtype(y_arr.dtype, np.number):
+                y_arr = y_arr.astype(str)
+            np.save(os.path.join(tdir, "y.npy"), y_arr)
+            targets[target] = {"columns": list(X.columns), "y_name": y.name, "rows": len(X)}
+        return self.publish(key, tmp, {"targets": targets, "info": info or {}})
+
+    def get(self, key: str, mmap: bool = True) -> dict[str, tuple[pd.DataFrame, pd.Series]] | None:
+        meta = self.meta(key)
+        if meta is None:
+            return None
+        entry = self._entry(key)
+        mode: Literal["r"] | None = "r" if mmap else None
+        out: dict[str, tuple[pd.DataFrame, pd.Series]] = {}
+        for target, spec in meta["targets"].items():
+            tdir = os.path.join(entry, target)
+            X = pd.DataFrame({
+                col: np.load(os.path.join(tdir, f"x{i}.npy"), mmap_mode=mode)
+                for i, col in enumerate(spec["columns"])
+            })
+            y = pd.Series(np.load(os.path.join(tdir, "y.npy"), mmap_mode=mode), name=spec["y_name"])
+            out[target] = (X, y)
+        return out
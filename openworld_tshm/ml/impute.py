@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+# Per-process donor matrix and KD-tree cache, populated by _init_worker so pool
+# workers receive the complete rows once instead of with every chunk.
+_DONORS: np.ndarray | None = None
+_TREES: dict[tuple[int, ...], cKDTree] = {}
+
+
+def _init_worker(donors: np.ndarray | None) -> None:
+    global _DONORS
+    _DONORS = donors
+    _TREES.clear()
+
+
+def _donors() -> np.ndarray:
+    if _DONORS is None:
+        raise RuntimeError("imputation worker not initialised")
+    return _DONORS
+
+
+def _tree_for(observed: tuple[int, ...]) -> cKDTree:
+    tree = _TREES.get(observed)
+    if tree is None:
+        tree = cKDTree(_donors()[:, list(observed)])
+        _TREES[observed] = tree
+    return tree
+
+
+def _impute_block(observed: tuple[int, ...], query: np.ndarray, n_neighbors: int) -> np.ndarray:
+    donors = _donors()
+    k = min(n_neighbors, donors.shape[0])
+    _, idx = _tree_for(observed).query(query, k=k)
+    # With k=1 the query returns one index per row; keep the (rows, k) shape.
+    # One neighbour lookup per row serves every column missing in that row
+    return donors[idx.reshape(len(query), k)].mean(axis=1)
+
+
+def _resolve_jobs(n_jobs: int) -> int:
+    if n_jobs is None or n_jobs == 0:
+        return 1
+    if n_jobs < 0:
+        return max((os.cpu_count() or 1) + 1 + n_jobs, 1)
+    return n_jobs
+
+
+def impute_nearest(X: np.ndarray, n_neighbors: int = 5, chunk_size: int = 50_000, n_jobs: int = 1) -> np.ndarray:
+    """
+    Nearest-neighbour imputation that scales to millions of rows.
+
+    Only rows with missing values are queried, and only complete rows act as
+    donors. Frequent missingness patterns get a KD-tree over their observed
+    columns; rare patterns share one tree over all columns, queried with their
+    gaps filled by donor means, which bounds the number of trees built. Trees
+    are cached and reused for every chunk and every missing column. Missing
+    entries receive the uniform mean of the k nearest donors, matching
+    KNNImputer's default weighting. Columns that are entirely missing are
+    left untouched.
+    """
+    if n_neighbors < 1:
+        raise ValueError("n_neighbors must be >= 1")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be >= 1")
+    out = np.array(X, dtype=float, copy=True)
+    if out.ndim != 2 or out.size == 0:
+        return out
+    usable = np.flatnonzero(~np.isnan(out).all(axis=0))
+    data = out[:, usable]
+    mask = np.isnan(data)
+    incomplete = np.flatnonzero(mask.any(axis=1))
+    if incomplete.size == 0:
+        return out
+    donors = np.ascontiguousarray(data[~mask.any(axis=1)])
+    if donors.shape[0] == 0:
+        # Nothing to measure distance against: column mean like KNNImputer
+        data[mask] = np.broadcast_to(np.nanmean(data, axis=0), data.shape)[mask]
+        out[:, usable] = data
+        return out
+    donor_means = donors.mean(axis=0)
+
+    patterns, inverse = np.unique(mask[incomplete], axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    groups: list[tuple[tuple[int, ...], np.ndarray]] = []
+    shared: list[np.ndarray] = []
+    for p, pattern in enumerate(patterns):
+        rows = incomplete[inverse == p]
+        observed = tuple(int(c) for c in np.flatnonzero(~pattern))
+        # A dedicated tree pays off once the pattern covers ~1% of the donors
+        if observed and rows.size * 100 >= donors.shape[0]:
+            groups.append((observed, rows))
+        else:
+            shared.append(rows)
+    if shared:
+        groups.append((tuple(range(data.shape[1])), np.sort(np.concatenate(shared))))
+
+    tasks: list[tuple[tuple[int, ...], np.ndarray]] = []
+    for observed, rows in groups:
+        for start in range(0, rows.size, chunk_size):
+            tasks.append((observed, rows[start:start + chunk_size]))
+
+    def _query(observed: tuple[int, ...], rows: np.ndarray) -> np.ndarray:
+        block = data[rows]
+        if len(observed) == data.shape[1]:
+            block = np.where(np.isnan(block), donor_means, block)
+        return block[:, list(observed)]
+
+    workers = min(_resolve_jobs(n_jobs), len(tasks))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(donors,)) as ex:
+            futures = [ex.submit(_impute_block, obs, _query(obs, rows), n_neighbors) for obs, rows in tasks]
+            results = [f.result() for f in futures]
+    else:
+        _init_worker(donors)
+        try:
+            results = [_impute_block(obs, _query(obs, rows), n_neighbors) for obs, rows in tasks]
+        finally:
+            _init_worker(None)
+    for (_, rows), values in zip(tasks, results):
+        block = data[rows]
+        gaps = np.isnan(block)
+        block[gaps] = values[gaps]
+        data[rows] = block
+    out[:, usable] = data
+    return out
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import time
+from dataclasses import replace
+from typing import Any
+
+import joblib
+
+from ..provenance import ProvenanceStore, open_store
+from ..utils.io import write_json
+from .data_prep import load_real_data, validate_and_impute
+from .drift import PROFILE_FILE, drift_report
+from .features import build_feature_matrix
+from .models import HeightRegressor, SpeciesClassifier
+from .packed import is_packed, save_packed
+from .train import TrainConfig, train_all
+
+# Ledger steps whose inputs count as already used by a model directory
+TRAIN_STEPS = ("train", "train_update")
+_WRAPPERS = {"height": HeightRegressor, "species": SpeciesClassifier}
+
+
+def used_inputs(store: ProvenanceStore, model_dir: str) -> dict[str, str]:
+    """sha256 -> path of every input a train/train_update step recorded for model_dir."""
+    target = os.path.abspath(model_dir)
+    used: dict[str, str] = {}
+    for rec in store.records():
+        if rec.get("step") not in TRAIN_STEPS:
+            continue
+        if os.path.abspath(str(rec.get("params", {}).get("out_dir", ""))) != target:
+            continue
+        for path, digest in (rec.get("env") or {}).get("input_hashes", {}).items():
+            used[digest] = path
+    return used
+
+
+def _load_model(model_dir: str, target: str) -> Any:
+    obj = joblib.load(os.path.join(model_dir, f"{target}_model.pkl"))
+    # Basic models are pickled bare estimators, XGBoost wrappers whole
+    return obj if hasattr(obj, "model") else _WRAPPERS[target](obj)
+
+
+def _n_fitted(model: Any) -> int:
+    inner = model.model
+    if hasattr(inner, "get_booster"):
+        return int(inner.get_booster().num_boosted_rounds())
+    return len(inner.estimators_)
+
+
+def update_models(
+    cfg: TrainConfig,
+    sources: list[str],
+    ledger_path: str,
+    drift_alpha: float = 0.01,
+    force_full: bool = False,
+) -> dict[str, Any]:
+    """
+    Bring the models in cfg.out_dir up to date with `sources`. Sources whose
+    hash the ledger already lists for this model directory are skipped. New
+    rows extend the models in place: random forests grow trees on the new rows
+    (warm_start) and XGBoost continues boosting from the saved booster, each
+    in proportion to the share of new rows, so a 1% batch costs about 1% of a
+    full fit. A full retrain over all used and new sources runs instead when
+    the batch drifts from the training profile, its classes differ, no
+    profile or model exists, or force_full is set. Logs a train_update step.
+    """
+    store = open_store(ledger_path)
+    start = time.perf_counter()
+    used = used_inputs(store, cfg.out_dir)
+    hashes = store.hashes.hash_many(sources)
+    new = [p for p in sources if hashes[p] not in used]
+    profile_path = os.path.join(cfg.out_dir, PROFILE_FILE)
+    have_models = os.path.exists(profile_path) and all(
+        os.path.exists(os.path.join(cfg.out_dir, f"{t}_model.pkl")) for t in _WRAPPERS
+    )
+    result: dict[str, Any] = {"new_sources": new, "skipped_sources": [p for p in sources if p not in new]}
+    if not new and not force_full and have_models:
+        return {**result, "mode": "noop", "seconds": time.perf_counter() - start}
+
+    reason = "forced" if force_full else None
+    if reason is None and not have_models:
+        reason = "no_models"
+    if reason is None:
+        with open(profile_path, "r", encoding="utf-8") as f:
+            profile = json.load(f)
+        if profile.get("model_type") != cfg.model_type:
+            reason = "model_type"
+    if reason is None:
+        df = validate_and_impute(load_real_data(new, plugin_name="field_csv"), method=cfg.impute_method)
+        Xh, yh = build_feature_matrix(df, "height")
+        Xs, ys = build_feature_matrix(df, "species")
+        drift = drift_report(profile, Xs, ys, alpha=drift_alpha)
+        result["drift"] = drift
+        if drift["drifted"]:
+            reason = "classes" if drift["classes_changed"] else "drift"
+
+    if reason is not None:
+        # Full retrain over everything this model directory has seen plus the batch
+        previous = [p for p in used.values() if os.path.exists(p)]
+        all_sources = list(dict.fromkeys(previous + sources))
+        # Never replace the models with ones fitted on the synthetic fallback
+        metrics = train_all(replace(cfg, data_sources=all_sources, require_data=True))
+        result.update(mode="full", reason=reason, metrics=metrics)
+        # Only sources that actually made it into the fit count as used
+        inputs = metrics["data_sources"]
+    else:
+        added: dict[str, int] = {}
+        for target, (X, y) in {"height": (Xh, yh), "species": (Xs, ys)}.items():
+            model = _load_model(cfg.out_dir, target)
+            n = max(1, math.ceil(_n_fitted(model) * len(X) / max(profile["rows"][target], 1)))
+            model.update(X, y, n)
+            path = os.path.join(cfg.out_dir, f"{target}_model.pkl")
+            model.save(path)
+            packed = os.path.join(cfg.out_dir, f"{target}_model.packed")
+            if is_packed(packed):
+                save_packed(model, packed, source=path)
+            profile["rows"][target] += len(X)
+            added[target] = n
+        # The quantiles stay those of the last full fit so gradual drift accumulates
+        write_json(profile_path, profile)
+        result.update(mode="incremental", rows=len(Xs), added=added)
+        inputs = new
+    result["seconds"] = time.perf_counter() - start
+    outputs = [os.path.join(cfg.out_dir, f"{t}_model.pkl") for t in _WRAPPERS]
+    store.log(
+        "train_update",
+        {"out_dir": cfg.out_dir, "mode": result["mode"], "reason": result.get("reason"), "model_type": cfg.model_type},
+        inputs,
+        outputs,
+    )
+    return result
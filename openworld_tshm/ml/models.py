@@ -1,9 +1,11 @@
 from __future__ import annotations
+import warnings
 from dataclasses import dataclass
 from typing import Any
 import joblib
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.linear_model import LinearRegression
+from .packed import LazyModel, load_artifact, save_packed
 
 
 @dataclass
@@ -11,14 +13,15 @@ class HeightRegressor:
     model: Any
 
     @classmethod
-    def create(cls, seed: int = 42) -> "HeightRegressor":
+    def create(cls, seed: int = 42, **params: Any) -> "HeightRegressor":
         # Using RandomForest for better performance on complex data
         from sklearn.ensemble import RandomForestRegressor
-        return cls(model=RandomForestRegressor(
-            n_estimators=100,
-            max_depth=10,
-            random_state=seed
-        ))
+        return cls(model=RandomForestRegressor(**{
+            "n_estimators": 100,
+            "max_depth": 10,
+            "random_state": seed,
+            **params,
+        }))
 
     def fit(self, X, y) -> None:
         self.model.fit(X, y)
@@ -26,12 +29,23 @@ class HeightRegressor:
     def predict(self, X):
         return self.model.predict(X)
 
+    def update(self, X, y, n_trees: int) -> None:
+        # warm_start keeps the fitted trees and grows n_trees more on (X, y) only
+        self.model.set_params(warm_start=True, n_estimators=len(self.model.estimators_) + n_trees)
+        self.model.fit(X, y)
+        self.model.set_params(warm_start=False)
+
     def save(self, path: str) -> None:
         joblib.dump(self.model, path)
 
+    def save_packed(self, path: str) -> None:
+        # Uncompressed node arrays, loadable with mmap_mode="r" and shared across processes
+        save_packed(self.model, path)
+
     @classmethod
-    def load(cls, path: str) -> "HeightRegressor":
-        return cls(joblib.load(path))
+    def load(cls, path: str, lazy: bool = False) -> "HeightRegressor":
+        # Accepts a joblib pickle or a packed artifact directory
+        return cls(LazyModel(path) if lazy else load_artifact(path))
 
 
 @dataclass
@@ -39,14 +53,15 @@ class SpeciesClassifier:
     model: Any
 
     @classmethod
-    def create(cls, seed: int = 42) -> "SpeciesClassifier":
+    def create(cls, seed: int = 42, **params: Any) -> "SpeciesClassifier":
         # Larger forest with balanced subsampling for stability across seeds
-        return cls(model=RandomForestClassifier(
-            n_estimators=300,
-            max_depth=None,
-            class_weight="balanced_subsample",
-            random_state=seed,
-        ))
+        return cls(model=RandomForestClassifier(**{
+            "n_estimators": 300,
+            "max_depth": None,
+            "class_weight": "balanced_subsample",
+            "random_state": seed,
+            **params,
+        }))
 
     def fit(self, X, y) -> None:
         self.model.fit(X, y)
@@ -54,11 +69,25 @@ class SpeciesClassifier:
     def predict(self, X):
         return self.model.predict(X)
 
+    def update(self, X, y, n_trees: int) -> None:
+        # warm_start keeps the fitted trees and grows n_trees more on (X, y) only;
+        # balanced_subsample then weights classes per bootstrap of the new rows, as intended
+        self.model.set_params(warm_start=True, n_estimators=len(self.model.estimators_) + n_trees)
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message="class_weight presets", category=UserWarning)
+            self.model.fit(X, y)
+        self.model.set_params(warm_start=False)
+
     def save(self, path: str) -> None:
         joblib.dump(self.model, path)
 
+    def save_packed(self, path: str) -> None:
+        # Uncompressed node arrays, loadable with mmap_mode="r" and shared across processes
+        save_packed(self.model, path)
+
     @classmethod
-    def load(cls, path: str) -> "SpeciesClassifier":
-        return cls(joblib.load(path))
+    def load(cls, path: str, lazy: bool = False) -> "SpeciesClassifier":
+        # Accepts a joblib pickle or a packed artifact directory
+        return cls(LazyModel(path) if lazy else load_artifact(path))
 
 
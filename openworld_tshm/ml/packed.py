@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Literal
+
+import joblib
+import numpy as np
+
+from ..utils.hashing import sha256_file
+from ..utils.io import ensure_dir, write_json
+
+# Bump when the array layout changes
+PACKED_VERSION = 2
+_ARRAYS = ("feature", "threshold", "children", "missing_right", "value", "roots", "tree_group")
+# Rows evaluated per block; bounds the (rows, trees) node matrix for large batches
+_BLOCK_CELLS = 1 << 20
+
+
+@dataclass
+class PackedForest:
+    """
+    Tree ensemble flattened into concatenated node arrays. A row moves from
+    node i to children[i, 1] when x[feature[i]] > threshold[i] and to
+    children[i, 0] otherwise; NaN goes right where missing_right is set.
+    Leaves point to themselves with an infinite threshold, so every tree can be
+    walked in lockstep for max_depth steps. Random forests average leaf values
+    ('mean'); boosted trees add them to base_margin per output ('sum').
+    Arrays may be read-only memmaps shared by every process that opens the
+    same artifact.
+    """
+    kind: str  # 'regressor' or 'classifier'
+    feature: np.ndarray
+    threshold: np.ndarray
+    children: np.ndarray  # (n_nodes, 2) absolute node indices
+    missing_right: np.ndarray
+    value: np.ndarray  # (n_nodes,) or (n_nodes, n_classes) for forest classifiers
+    roots: np.ndarray
+    tree_group: np.ndarray  # output column of each boosted tree
+    max_depth: int
+    aggregate: str = "mean"
+    base_margin: np.ndarray | None = None
+    classes: np.ndarray | None = None
+    feature_names: list[str] | None = None
+
+    @property
+    def n_trees(self) -> int:
+        return int(self.roots.shape[0])
+
+    def _as_matrix(self, X) -> np.ndarray:
+        if self.feature_names is not None and hasattr(X, "columns"):
+            X = X[self.feature_names]
+        # Both sklearn and XGBoost evaluate splits on float32 inputs
+        return np.asarray(X, dtype=np.float32)
+
+    def _apply(self, Xf: np.ndarray) -> np.ndarray:
+        node = np.tile(self.roots, (Xf.shape[0], 1))
+        # Flat 1-D gathers are markedly cheaper than 2-D fancy indexing
+        xflat = np.ascontiguousarray(Xf).ravel()
+        row_offset = (np.arange(Xf.shape[0]) * Xf.shape[1])[:, None]
+        children = self.children.reshape(-1)
+        has_nan = bool(np.isnan(Xf).any())
+        for _ in range(self.max_depth):
+            x = xflat[row_offset + self.feature[node]]
+            step = x > self.threshold[node]
+            if has_nan:
+                step |= np.isnan(x) & self.missing_right[node]
+            node = children[2 * node + step]
+        return node
+
+    def apply(self, X) -> np.ndarray:
+        """Leaf node index per (row, tree), walking all trees at once."""
+        Xf = self._as_matrix(X)
+        block = max(1, _BLOCK_CELLS // max(self.n_trees, 1))
+        if Xf.shape[0] <= block:
+            return self._apply(Xf)
+        return np.concatenate([self._apply(Xf[i:i + block]) for i in range(0, Xf.shape[0], block)])
+
+    def _raw(self, X) -> np.ndarray:
+        leaves = self.apply(X)
+        vals = self.value[leaves]
+        if self.aggregate == "mean":
+            # cumsum adds strictly left to right, like sklearn's per-tree loop
+            return np.cumsum(vals, axis=1)[:, -1] / self.n_trees
+        if self.base_margin is None:
+            raise ValueError("Summed forests need a base_margin")
+        n_out = len(self.base_margin)
+        margin = np.empty((leaves.shape[0], n_out), dtype=np.float32)
+        for k in range(n_out):
+            cols = vals[:, self.tree_group == k].astype(np.float32)
+            base = np.full((leaves.shape[0], 1), self.base_margin[k], dtype=np.float32)
+            margin[:, k] = np.cumsum(np.hstack([base, cols]), axis=1, dtype=np.float32)[:, -1]
+        return margin
+
+    def predict_proba(self, X) -> np.ndarray:
+        if self.kind != "classifier":
+            raise AttributeError("predict_proba is only available for classifiers")
+        raw = self._raw(X)
+        if self.aggregate == "mean":
+            return raw
+        e = np.exp(raw - raw.max(axis=1, keepdims=True))
+        return e / e.sum(axis=1, keepdims=True)
+
+    def predict(self, X) -> np.ndarray:
+        if self.kind == "classifier":
+            if self.classes is None:
+                raise ValueError("Packed classifier has no classes")
+            return self.classes.take(np.argmax(self.predict_proba(X), axis=1))
+        raw = self._raw(X)
+        return raw if self.aggregate == "mean" else raw[:, 0]
+
+
+def _pack_nodes(left, right, feature, threshold, missing_right, offset):
+    n = len(left)
+    idx = np.arange(n, dtype=np.int64)
+    leaf = np.asarray(left) == -1
+    children = np.stack([
+        np.where(leaf, idx, left) + offset,
+        np.where(leaf, idx, right) + offset,
+    ], axis=1).astype(np.int64)
+    return (
+        np.where(leaf, 0, feature).astype(np.int32),
+        np.where(leaf, np.inf, threshold).astype(np.float64),
+        children,
+        np.asarray(missing_right, dtype=bool) & ~leaf,
+    )
+
+
+def _pack_sklearn(model: Any) -> PackedForest:
+    estimators = model.estimators_
+    is_clf = hasattr(model, "classes_")
+    if is_clf and getattr(model, "n_outputs_", 1) != 1:
+        raise TypeError("Multi-output forests are not supported")
+    parts: list[tuple] = []
+    vals, roots = [], []
+    offset, depth = 0, 0
+    for est in estimators:
+        tree = est.tree_
+        state = tree.__getstate__()["nodes"]
+        go_left = state["missing_go_to_left"] if "missing_go_to_left" in state.dtype.names else np.ones(tree.node_count)
+        roots.append(offset)
+        parts.append(_pack_nodes(tree.children_left, tree.children_right, tree.feature, tree.threshold, go_left == 0, offset))
+        v = tree.value[:, 0, :]
+        if is_clf:
+            normalizer = v.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            v = v / normalizer
+        else:
+            v = v[:, 0]
+        vals.append(v.astype(np.float64))
+        offset += tree.node_count
+        depth = max(depth, int(tree.max_depth))
+    names = getattr(model, "feature_names_in_", None)
+    return PackedForest(
+        kind="classifier" if is_clf else "regressor",
+        feature=np.concatenate([p[0] for p in parts]),
+        threshold=np.concatenate([p[1] for p in parts]),
+        children=np.concatenate([p[2] for p in parts]),
+        missing_right=np.concatenate([p[3] for p in parts]),
+        value=np.concatenate(vals),
+        roots=np.asarray(roots, dtype=np.int64),
+        tree_group=np.zeros(len(roots), dtype=np.int32),
+        max_depth=depth,
+        classes=np.asarray(model.classes_) if is_clf else None,
+        feature_names=[str(c) for c in names] if names is not None else None,
+    )
+
+
+def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+    depth = np.zeros(len(left), dtype=np.int64)
+    # XGBoost numbers children after their parents, so one forward pass suffices
+    for i in range(len(left)):
+        if left[i] != -1:
+            depth[left[i]] = depth[right[i]] = depth[i] + 1
+    return int(depth.max()) if len(depth) else 0
+
+
+def _pack_xgboost(model: Any) -> PackedForest:
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    learner = json.loads(bytes(booster.save_raw("json")))["learner"]
+    objective = learner["objective"]["name"]
+    if objective not in {"reg:squarederror", "multi:softprob", "multi:softmax"}:
+        raise TypeError(f"Cannot pack XGBoost objective {objective}")
+    gbm = learner["gradient_booster"]
+    if gbm.get("name", "gbtree") != "gbtree":
+        raise TypeError("Only gbtree boosters can be packed")
+    trees = gbm["model"]["trees"]
+    base = np.atleast_1d(np.asarray(
+        json.loads(learner["learner_model_param"]["base_score"].replace("E", "e")), dtype=np.float32
+    ))
+    n_class = int(learner["learner_model_param"].get("num_class", "0"))
+    if n_class > 1 and base.size == 1:
+        base = np.repeat(base, n_class)
+    parts: list[tuple] = []
+    vals, roots = [], []
+    offset, depth = 0, 0
+    for t in trees:
+        if any(t["split_type"]):
+            raise TypeError("Categorical splits are not supported")
+        left = np.asarray(t["left_children"], dtype=np.int64)
+        right = np.asarray(t["right_children"], dtype=np.int64)
+        cond = np.asarray(t["split_conditions"], dtype=np.float32)
+        # XGBoost goes left when x < cond; on float32 that is x <= the next float below cond
+        thr = np.nextafter(cond, np.float32(-np.inf)).astype(np.float64)
+        roots.append(offset)
+        parts.append(_pack_nodes(left, right, t["split_indices"], thr, np.asarray(t["default_left"]) == 0, offset))
+        vals.append(cond)  # leaf rows of split_conditions hold the leaf values
+        offset += len(left)
+        depth = max(depth, _tree_depth(left, right))
+    names = getattr(model, "feature_names_in_", None)
+    if names is None:
+        names = booster.feature_names
+    is_clf = objective.startswith("multi:")
+    classes = getattr(model, "classes_", None)
+    return PackedForest(
+        kind="classifier" if is_clf else "regressor",
+        feature=np.concatenate([p[0] for p in parts]),
+        threshold=np.concatenate([p[1] for p in parts]),
+        children=np.concatenate([p[2] for p in parts]),
+        missing_right=np.concatenate([p[3] for p in parts]),
+        value=np.concatenate(vals),
+        roots=np.asarray(roots, dtype=np.int64),
+        tree_group=np.asarray(gbm["model"]["tree_info"], dtype=np.int32),
+        max_depth=depth,
+        aggregate="sum",
+        base_margin=base,
+        classes=np.asarray(classes) if classes is not None else (np.arange(n_class) if is_clf else None),
+        feature_names=[str(c) for c in names] if names is not None else None,
+    )
+
+
+def pack_model(model: Any) -> PackedForest:
+    """
+    Export a fitted sklearn random forest or XGBoost gbtree model (sklearn API
+    or Booster, optionally inside one of our wrappers) as a PackedForest.
+    """
+    if isinstance(model, PackedForest):
+        return model
+    classes = None
+    if hasattr(model, "model") and not hasattr(model, "get_booster") and not hasattr(model, "estimators_"):
+        # Wrappers that encode labels themselves keep the real class names
+        classes = getattr(model, "classes_", None)
+        model = model.model
+    estimators = getattr(model, "estimators_", None)
+    if estimators and hasattr(estimators[0], "tree_"):
+        return _pack_sklearn(model)
+    if hasattr(model, "get_booster") or type(model).__name__ == "Booster":
+        packed = _pack_xgboost(model)
+        if classes is not None and packed.kind == "classifier":
+            packed.classes = np.asarray(classes)
+        return packed
+    raise TypeError(f"Cannot pack {type(model).__name__}; expected a fitted sklearn forest or XGBoost model")
+
+
+def save_packed(model: Any, path: str, source: str | None = None) -> str:
+    """
+    Write a model as an uncompressed packed artifact directory (one .npy per
+    array). source is the pickle the model was saved to; its digest is
+    recorded so that packed_for can tell when the artifact has gone stale.
+    """
+    packed = pack_model(model)
+    ensure_dir(path)
+    for name in _ARRAYS:
+        np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(getattr(packed, name)))
+    write_json(os.path.join(path, "meta.json"), {
+        "version": PACKED_VERSION,
+        "kind": packed.kind,
+        "aggregate": packed.aggregate,
+        "n_trees": packed.n_trees,
+        "max_depth": packed.max_depth,
+        "base_margin": packed.base_margin.tolist() if packed.base_margin is not None else None,
+        "classes": packed.classes.tolist() if packed.classes is not None else None,
+        "feature_names": packed.feature_names,
+        "source_sha256": sha256_file(source) if source else None,
+    })
+    return path
+
+
+def load_packed(
+    path: str, mmap_mode: Literal["r+", "r", "w+", "c"] | None = "r"
+) -> PackedForest:
+    with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("version") != PACKED_VERSION:
+        raise ValueError(f"Unsupported packed model version: {meta.get('version')}")
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in _ARRAYS}
+    base = meta.get("base_margin")
+    return PackedForest(
+        kind=meta["kind"],
+        max_depth=int(meta["max_depth"]),
+        aggregate=meta.get("aggregate", "mean"),
+        base_margin=np.asarray(base, dtype=np.float32) if base is not None else None,
+        classes=np.asarray(meta["classes"]) if meta.get("classes") is not None else None,
+        feature_names=meta.get("feature_names"),
+        **arrays,
+    )
+
+
+def is_packed(path: str) -> bool:
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, "meta.json"))
+
+
+def packed_for(pkl_path: str) -> str | None:
+    """
+    The packed artifact next to a pickled model (`x.pkl` -> `x.packed`), or
+    None when there is none or it was not built from the current pickle, e.g.
+    after a retrain without packing. Without the pickle it is used as is.
+    """
+    packed = os.path.splitext(pkl_path)[0] + ".packed"
+    if not is_packed(packed):
+        return None
+    if not os.path.exists(pkl_path):
+        return packed
+    with open(os.path.join(packed, "meta.json"), "r", encoding="utf-8") as f:
+        source = json.load(f).get("source_sha256")
+    return packed if source is not None and source == sha256_file(pkl_path) else None
+
+
+def load_artifact(path: str) -> Any:
+    """Load a model artifact: packed directory (memory-mapped) or joblib pickle."""
+    if is_packed(path):
+        return load_packed(path)
+    return joblib.load(path)
+
+
+class LazyModel:
+    """
+    Stand-in that defers loading a model artifact until it is first used, e.g.
+    the first predict call. Pickles as its path only, so pool workers load (or
+    memory-map) the artifact themselves.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._model: Any = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def get(self) -> Any:
+        if self._model is None:
+            self._model = load_artifact(self.path)
+        return self._model
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__") or name in {"path", "_model"}:
+            raise AttributeError(name)
+        return getattr(self.get(), name)
+
+    def __getstate__(self) -> dict:
+        return {"path": self.path}
+
+    def __setstate__(self, state: dict) -> None:
+        self.path = state["path"]
+        self._model = None
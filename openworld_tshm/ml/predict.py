@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import multiprocessing as mp
+import os
+import time
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+import joblib
+import pandas as pd
+
+from .features import FEATURES_HEIGHT, FEATURES_SPECIES
+from .models import HeightRegressor, SpeciesClassifier
+from .packed import load_packed, packed_for
+
+try:  # pragma: no cover - optional heavy deps
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except ImportError:  # pragma: no cover
+    pa = None  # type: ignore
+    pq = None  # type: ignore
+
+
+MODEL_FILES = {"height": ("height_model.pkl", HeightRegressor), "species": ("species_model.pkl", SpeciesClassifier)}
+
+# Models of the current process; set once per worker by _init_worker
+_MODELS: dict[str, Any] | None = None
+
+
+def load_models(model_dir: str) -> dict[str, Any]:
+    """
+    Load the models saved by `train` from model_dir. Packed artifacts
+    (`*.packed`) built from the current pickle are preferred and memory-mapped,
+    so pool workers share one page-cache copy; stale ones are ignored. Basic models are pickled sklearn estimators and
+    get wrapped; XGBoost wrappers are pickled whole.
+    """
+    models: dict[str, Any] = {}
+    for target, (fname, wrapper) in MODEL_FILES.items():
+        path = os.path.join(model_dir, fname)
+        packed = packed_for(path)
+        if packed is not None:
+            models[target] = wrapper(load_packed(packed))
+        elif os.path.exists(path):
+            obj = joblib.load(path)
+            models[target] = obj if hasattr(obj, "model") else wrapper(obj)
+    if not models:
+        raise FileNotFoundError(f"No height_model.pkl or species_model.pkl in {model_dir}")
+    return models
+
+
+def _init_worker(model_dir: str) -> None:
+    global _MODELS
+    if _MODELS is None:
+        _MODELS = load_models(model_dir)
+
+
+def predict_frame(df: pd.DataFrame, models: dict[str, Any] | None = None) -> pd.DataFrame:
+    """Append `height_pred` / `species_pred` columns for the models available."""
+    models = models if models is not None else _MODELS
+    if models is None:
+        raise RuntimeError("No models loaded; pass models or load them with load_models")
+    out = df.copy()
+    if "height" in models:
+        out["height_pred"] = models["height"].predict(_features(out, FEATURES_HEIGHT))
+    if "species" in models:
+        X = out
+        if "height" not in out.columns and "height_pred" in out.columns:
+            # Inventories without measured heights use the predicted ones
+            X = out.assign(height=out["height_pred"])
+        out["species_pred"] = models["species"].predict(_features(X, FEATURES_SPECIES))
+    return out
+
+
+def _features(df: pd.DataFrame, cols: list[str]) -> pd.DataFrame:
+    missing = [c for c in cols if c not in df.columns]
+    if missing:
+        raise ValueError(f"Inventory is missing feature columns: {missing}")
+    return df[cols]
+
+
+def iter_table(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    if path.lower().endswith(".parquet"):
+        if pq is None:
+            raise RuntimeError("pyarrow not available for Parquet input")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+class _TableWriter:
+    def __init__(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.parquet = path.lower().endswith(".parquet")
+        self._writer: Any = None
+        self._first = True
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self.parquet:
+            if pa is None:
+                raise RuntimeError("pyarrow not available for Parquet output")
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+def predict_table(
+    source: str,
+    out_path: str,
+    model_dir: str,
+    chunk_size: int = 100_000,
+    n_jobs: int = 1,
+) -> dict[str, Any]:
+    """
+    Stream a tree inventory (.csv or .parquet) through the trained models chunk
+    by chunk and write it back with prediction columns. Models are loaded once
+    per process; with n_jobs > 1 each worker loads them in its initializer.
+    Workers come from a forkserver (spawn where that is unavailable), so they
+    inherit no BLAS/OpenMP pools or threads; packed artifacts are memory-mapped,
+    so the workers still share one page-cache copy. Returns throughput statistics.
+    """
+    global _MODELS
+    start = time.perf_counter()
+    _MODELS = load_models(model_dir)
+    targets = sorted(_MODELS)
+    writer = _TableWriter(out_path)
+    rows = 0
+    try:
+        if n_jobs == 1:
+            for chunk in iter_table(source, chunk_size):
+                writer.write(predict_frame(chunk))
+                rows += len(chunk)
+        else:
+            workers = n_jobs if n_jobs > 0 else (os.cpu_count() or 1)
+            ctx = mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(model_dir,)) as ex:
+                # Bounded window of in-flight chunks keeps memory flat and output ordered
+                pending: deque = deque()
+                for chunk in iter_table(source, chunk_size):
+                    pending.append(ex.submit(predict_frame, chunk))
+                    if len(pending) >= 2 * workers:
+                        done = pending.popleft().result()
+                        writer.write(done)
+                        rows += len(done)
+                while pending:
+                    done = pending.popleft().result()
+                    writer.write(done)
+                    rows += len(done)
+    finally:
+        writer.close()
+        _MODELS = None
+    seconds = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "seconds": seconds,
+        "trees_per_sec": rows / seconds if seconds > 0 else float("inf"),
+        "targets": targets,
+    }
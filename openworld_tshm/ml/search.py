@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import math
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.metrics import accuracy_score, mean_absolute_error
+from sklearn.model_selection import KFold, StratifiedKFold, train_test_split
+
+try:  # pragma: no cover - optional heavy deps
+    from xgboost import XGBClassifier, XGBRegressor  # type: ignore
+except ImportError:  # pragma: no cover
+    XGBClassifier = None  # type: ignore
+    XGBRegressor = None  # type: ignore
+
+
+# Candidate grids per (model_type, target); the tree count is the search budget
+SPACES: dict[tuple[str, str], dict[str, list[Any]]] = {
+    ("basic", "height"): {
+        "max_depth": [6, 10, 14, None],
+        "min_samples_leaf": [1, 2, 4],
+        "max_features": [1.0, 0.5, "sqrt"],
+    },
+    ("basic", "species"): {
+        "max_depth": [8, 12, None],
+        "min_samples_leaf": [1, 2, 4],
+        "max_features": ["sqrt", 0.5, 1.0],
+    },
+    ("advanced", "height"): {
+        "max_depth": [3, 4, 6, 8],
+        "learning_rate": [0.03, 0.05, 0.1, 0.2],
+        "subsample": [0.7, 0.85, 1.0],
+        "colsample_bytree": [0.7, 0.85, 1.0],
+        "min_child_weight": [1, 3, 5],
+    },
+}
+SPACES[("advanced", "species")] = SPACES[("advanced", "height")]
+
+# Largest tree count tried; boosted models may stop earlier
+MAX_TREES = {"basic": 300, "advanced": 1000}
+EARLY_STOPPING_ROUNDS = 20
+# Share of each training fold held back to pick the early-stopping round
+EARLY_STOPPING_FRACTION = 0.2
+
+# Matrices and CV folds of the current process; set once per worker by _init_worker
+_SHARED: dict[str, Any] | None = None
+
+
+def sample_candidates(space: dict[str, list[Any]], n: int, seed: int) -> list[dict[str, Any]]:
+    """Up to n distinct configurations drawn from the grid with a seeded generator."""
+    total = math.prod(len(v) for v in space.values())
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(total, size=min(n, total), replace=False)
+    out = []
+    for flat in picks:
+        cfg = {}
+        for name, values in space.items():
+            flat, i = divmod(int(flat), len(values))
+            cfg[name] = values[i]
+        out.append(cfg)
+    return out
+
+
+def shared_folds(X, y, target: str, n_splits: int = 5, seed: int = 42) -> list[tuple[np.ndarray, np.ndarray]]:
+    """CV train/validation index pairs, computed once and reused by every candidate."""
+    if target == "species":
+        splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed)
+        return [(tr, va) for tr, va in splitter.split(X, y)]
+    splitter = KFold(n_splits=n_splits, shuffle=True, random_state=seed)
+    return [(tr, va) for tr, va in splitter.split(X)]
+
+
+def early_stopping_split(tr: np.ndarray, y, target: str, seed: int = 42) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Split training fold indices tr into (fit, stop): boosted models early-stop
+    on `stop`, so the validation fold they are scored on stays unseen.
+    """
+    stratify = np.asarray(y)[tr] if target == "species" else None
+    try:
+        fit, stop = train_test_split(tr, test_size=EARLY_STOPPING_FRACTION, random_state=seed, stratify=stratify)
+    except ValueError:  # a class too rare to stratify
+        fit, stop = train_test_split(tr, test_size=EARLY_STOPPING_FRACTION, random_state=seed)
+    return np.sort(fit), np.sort(stop)
+
+
+def _estimator(model_type: str, target: str, params: dict[str, Any], n_trees: int, seed: int) -> Any:
+    if model_type == "advanced":
+        if XGBRegressor is None:
+            raise RuntimeError("xgboost not available for advanced search")
+        cls = XGBClassifier if target == "species" else XGBRegressor
+        # One thread per worker; the pool provides the parallelism
+        return cls(
+            n_estimators=n_trees, random_state=seed, n_jobs=1,
+            early_stopping_rounds=EARLY_STOPPING_ROUNDS, **params,
+        )
+    if target == "species":
+        return RandomForestClassifier(
+            n_estimators=n_trees, class_weight="balanced_subsample", random_state=seed, **params
+        )
+    return RandomForestRegressor(n_estimators=n_trees, random_state=seed, **params)
+
+
+def _init_worker(shared: dict[str, Any] | None) -> None:
+    global _SHARED
+    _SHARED = shared
+
+
+def evaluate_candidate(target: str, params: dict[str, Any], n_trees: int) -> dict[str, Any]:
+    """
+    Mean CV loss of one configuration at a tree budget over the shared folds:
+    MAE for height, 1 - accuracy for species. Boosted models stop early on
+    a split of each training fold (early_stopping_split), not on the fold
+    they are scored on, and report the rounds they kept.
+    """
+    if _SHARED is None:
+        raise RuntimeError("Search worker not initialised")
+    shared = _SHARED[target]
+    X, y, folds = shared["X"], shared["y"], shared["folds"]
+    model_type, seed = _SHARED["model_type"], _SHARED["seed"]
+    losses, rounds = [], []
+    for k, (tr, va) in enumerate(folds):
+        est = _estimator(model_type, target, params, n_trees, seed)
+        if model_type == "advanced":
+            fit, stop = shared["stops"][k]
+            est.fit(X[fit], y[fit], eval_set=[(X[stop], y[stop])], verbose=False)
+            rounds.append(int(est.best_iteration) + 1)
+        else:
+            est.fit(X[tr], y[tr])
+            rounds.append(n_trees)
+        pred = est.predict(X[va])
+        if target == "species":
+            losses.append(1.0 - float(accuracy_score(y[va], pred)))
+        else:
+            losses.append(float(mean_absolute_error(y[va], pred)))
+    return {
+        "loss": float(np.mean(losses)),
+        "loss_std": float(np.std(losses)),
+        "n_estimators": round(float(np.mean(rounds))),
+    }
+
+
+def _budgets(n_candidates: int, max_trees: int, eta: int) -> list[int]:
+    # rungs = floor(log_eta(n_candidates)) in integers; math.log(243, 3) is 4.999...
+    rungs, size = 0, eta
+    while size <= n_candidates:
+        rungs, size = rungs + 1, size * eta
+    return [max(max_trees // eta ** (rungs - k), 1) for k in range(rungs + 1)]
+
+
+def successive_halving(
+    matrices: dict[str, tuple[Any, Any]],
+    model_type: str = "basic",
+    n_candidates: int = 27,
+    eta: int = 3,
+    n_splits: int = 5,
+    seed: int = 42,
+    n_jobs: int = 1,
+) -> dict[str, Any]:
+    """
+    Successive-halving search per target. Every rung evaluates the surviving
+    candidates on the shared folds with eta times more trees than the last and
+    keeps the best 1/eta, so most compute goes to promising configurations.
+    All (target, candidate) evaluations of a rung run concurrently in one
+    process pool. Returns the best parameters per target and a leaderboard
+    with one row per evaluation.
+    """
+    targets = list(matrices)
+    shared: dict[str, Any] = {"model_type": model_type, "seed": seed}
+    alive: dict[str, list[int]] = {}
+    candidates: dict[str, list[dict[str, Any]]] = {}
+    for t in targets:
+        X, y = matrices[t]
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y)
+        if model_type == "advanced" and t == "species":
+            y = np.unique(y, return_inverse=True)[1]
+        folds = shared_folds(X, y, t, n_splits, seed)
+        shared[t] = {"X": X, "y": y, "folds": folds}
+        if model_type == "advanced":
+            shared[t]["stops"] = [early_stopping_split(tr, y, t, seed) for tr, _ in folds]
+        candidates[t] = sample_candidates(SPACES[(model_type, t)], n_candidates, seed)
+        alive[t] = list(range(len(candidates[t])))
+    budgets = _budgets(n_candidates, MAX_TREES[model_type], eta)
+    leaderboard: list[dict[str, Any]] = []
+    workers = n_jobs if n_jobs > 0 else (os.cpu_count() or 1)
+    ex = None
+    if workers > 1:
+        # Not fork: train_all calls this with the RunTracker thread running
+        ctx = mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+        ex = ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(shared,))
+    else:
+        _init_worker(shared)
+    try:
+        for rung, budget in enumerate(budgets):
+            jobs = [(t, i) for t in targets for i in alive[t]]
+            if ex is not None:
+                futures = [ex.submit(evaluate_candidate, t, candidates[t][i], budget) for t, i in jobs]
+                results = [f.result() for f in futures]
+            else:
+                results = [evaluate_candidate(t, candidates[t][i], budget) for t, i in jobs]
+            scored: dict[str, list[tuple[float, int]]] = {t: [] for t in targets}
+            for (t, i), res in zip(jobs, results):
+                leaderboard.append({
+                    "target": t, "rung": rung, "budget": budget, "candidate": i,
+                    "params": candidates[t][i], **res,
+                })
+                scored[t].append((res["loss"], i))
+            for t in targets:
+                alive[t] = [i for _, i in sorted(scored[t])[: max(len(alive[t]) // eta, 1)]]
+    finally:
+        if ex is not None:
+            ex.shutdown()
+        else:
+            _init_worker(None)
+    best: dict[str, Any] = {}
+    last = len(budgets) - 1
+    for t in targets:
+        row = min(
+            (r for r in leaderboard if r["target"] == t and r["rung"] == last),
+            key=lambda r: (r["loss"], r["candidate"]),
+        )
+        best[t] = {**row["params"], "n_estimators": row["n_estimators"], "cv_loss": row["loss"]}
+    leaderboard.sort(key=lambda r: (r["target"], -r["rung"], r["loss"], r["candidate"]))
+    return {"best": best, "leaderboard": leaderboard, "budgets": budgets, "model_type": model_type}
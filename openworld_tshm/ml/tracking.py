@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Any
+
+from ..utils.io import write_json
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+
+# log_batch limits of the MLflow tracking API
+MAX_METRICS_PER_BATCH = 1000
+MAX_PARAMS_PER_BATCH = 100
+MAX_PARAM_LENGTH = 6000
+
+# Seconds between checks that the worker is still alive while flush() waits
+_POLL_INTERVAL = 0.1
+
+# Trackers still open in this process; flushed by flush_all() at exit
+_OPEN: set[RunTracker] = set()
+_OPEN_LOCK = threading.Lock()
+
+
+def _backend_errors() -> tuple[type[Exception], ...]:
+    # Failures that fall back to the JSON record instead of failing the run;
+    # mlflow is only imported once tracking is on and something failed
+    try:
+        from mlflow.exceptions import MlflowException
+    except ImportError:
+        return (ImportError, OSError, ValueError)
+    return (ImportError, OSError, ValueError, MlflowException)
+
+
+class RunTracker:
+    """
+    Buffered experiment tracking for one run. log_* calls only append to a
+    queue; a daemon thread drains it every flush_interval seconds and sends
+    params and metrics with MlflowClient.log_batch, artifacts with
+    log_artifact. Nothing in the training loop waits on the tracking backend.
+
+    Without an experiment the tracker is disabled and every call is a no-op.
+    When mlflow is missing or the backend fails, the run is written to a
+    local JSON record (fallback_path) instead, including everything logged
+    before the failure, and so is a run whose worker thread died. Open
+    trackers are flushed and closed at interpreter exit.
+    """
+
+    def __init__(
+        self,
+        experiment: str | None,
+        run_name: str | None = None,
+        fallback_path: str | None = None,
+        flush_interval: float = 1.0,
+        client: Any = None,
+    ) -> None:
+        self.enabled = bool(experiment)
+        self.experiment = experiment
+        self.run_name = run_name
+        self.fallback_path = fallback_path
+        self.flush_interval = flush_interval
+        self.run_id: str | None = None
+        self.error: str | None = None
+        # Full copy of what was logged, for the JSON record
+        self.record: dict[str, Any] = {"params": {}, "metrics": [], "artifacts": []}
+        self._client = client
+        self._queue: queue.Queue = queue.Queue()
+        # Orders _closed against queue puts, so nothing is queued behind "close"
+        self._lock = threading.Lock()
+        self._closed = False
+        # Set once the run was ended and its record written, by the worker or _abandon
+        self._finished = False
+        self._thread: threading.Thread | None = None
+        if not self.enabled:
+            return
+        self._thread = threading.Thread(target=self._worker, name="ow-tshm-tracking", daemon=True)
+        self._thread.start()
+        with _OPEN_LOCK:
+            _OPEN.add(self)
+
+    # -- logging API (non-blocking) ------------------------------------------------
+
+    def log_params(self, params: dict[str, Any]) -> None:
+        for key, value in params.items():
+            self._put("param", key, str(value)[:MAX_PARAM_LENGTH])
+
+    def log_metric(self, key: str, value: float, step: int | None = None) -> None:
+        self._put("metric", key, (float(value), int(time.time() * 1000), step or 0))
+
+    def log_metrics(self, metrics: dict[str, Any], step: int | None = None) -> None:
+        for key, value in metrics.items():
+            # Non-numeric entries (paths, model type) belong in params or artifacts
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.log_metric(key, value, step)
+
+    def log_artifact(self, path: str) -> None:
+        self._put("artifact", path, None)
+
+    def _put(self, kind: str, key: str, value: Any) -> None:
+        with self._lock:
+            if self.enabled and not self._closed:
+                self._queue.put((kind, key, value))
+
+    # -- lifecycle -----------------------------------------------------------------
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Block until everything logged so far has been sent (or recorded). If
+        the worker thread has died, the rest of the queue is written to the
+        JSON record here instead of waiting for it.
+        """
+        if not self.enabled or self._thread is None:
+            return True
+        # The worker sets the marker's event once the items queued before it are sent
+        done = threading.Event()
+        with self._lock:
+            queued = not self._closed and self._thread.is_alive()
+            if queued:
+                self._queue.put(("flush", done, None))
+        end = None if timeout is None else time.monotonic() + timeout
+        while self._thread.is_alive():
+            if queued and done.is_set():
+                return True
+            left = _POLL_INTERVAL if end is None else min(end - time.monotonic(), _POLL_INTERVAL)
+            if left <= 0:
+                return False
+            # Without a marker, close() queued the last send; wait for the worker to finish it
+            if queued:
+                done.wait(left)
+            else:
+                self._thread.join(left)
+        if queued and done.is_set():
+            return True
+        self._abandon("FAILED")
+        return True
+
+    def close(self, wait: bool = True, status: str = "FINISHED") -> None:
+        """Flush, end the run and stop the worker; with wait=False return at once."""
+        with self._lock:
+            if not self.enabled or self._closed:
+                return
+            self._closed = True
+            self._queue.put(("close", status, None))
+        if wait and self._thread is not None:
+            self._thread.join()
+            self._abandon("FAILED")
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close(status="FAILED" if exc_type else "FINISHED")
+
+    # -- worker --------------------------------------------------------------------
+
+    def _worker(self) -> None:
+        pending: list[tuple[str, str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0.0))
+            except queue.Empty:
+                item = None
+            if item is not None and item[0] not in ("flush", "close"):
+                pending.append(item)
+                continue
+            if pending:
+                self._send(pending)
+                pending = []
+            deadline = time.monotonic() + self.flush_interval
+            if item is not None and item[0] == "close":
+                self._finish(item[1])
+                self._finished = True
+                with _OPEN_LOCK:
+                    _OPEN.discard(self)
+                return
+            if item is not None:
+                item[1].set()
+
+    def _abandon(self, status: str) -> None:
+        # Called once the worker has stopped: if it died before ending the run,
+        # record whatever it left queued and write the JSON record from here
+        with self._lock:
+            if self._finished:
+                return
+            self._closed = self._finished = True
+        items: list[tuple[str, str, Any]] = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] == "flush":
+                item[1].set()
+            elif item[0] != "close":
+                items.append(item)
+        if self.error is None:
+            self.error = "RuntimeError: tracking worker stopped"
+        self._send(items)  # with error set this only extends the record
+        self._finish(status)
+        with _OPEN_LOCK:
+            _OPEN.discard(self)
+
+    def _connect(self) -> None:
+        if self.run_id is not None:
+            return
+        if self._client is None:
+            from mlflow.tracking import MlflowClient  # heavy; only when tracking is on
+
+            self._client = MlflowClient()
+        exp = self._client.get_experiment_by_name(self.experiment)
+        exp_id = exp.experiment_id if exp is not None else self._client.create_experiment(self.experiment)
+        self.run_id = self._client.create_run(exp_id, run_name=self.run_name).info.run_id
+
+    def _send(self, items: list[tuple[str, str, Any]]) -> None:
+        params = {k: v for kind, k, v in items if kind == "param" and k not in self.record["params"]}
+        metrics = [(k, *v) for kind, k, v in items if kind == "metric"]
+        artifacts = [k for kind, k, _ in items if kind == "artifact"]
+        self.record["params"].update(params)
+        self.record["metrics"].extend({"key": k, "value": v, "timestamp": t, "step": s} for k, v, t, s in metrics)
+        self.record["artifacts"].extend(artifacts)
+        if self.error is not None:
+            return
+        try:
+            from mlflow.entities import Metric, Param
+
+            self._connect()
+            plist = [Param(k, v) for k, v in params.items()]
+            mlist = [Metric(k, v, t, s) for k, v, t, s in metrics]
+            for i in range(0, len(plist), MAX_PARAMS_PER_BATCH):
+                self._client.log_batch(self.run_id, params=plist[i:i + MAX_PARAMS_PER_BATCH])
+            for i in range(0, len(mlist), MAX_METRICS_PER_BATCH):
+                self._client.log_batch(self.run_id, metrics=mlist[i:i + MAX_METRICS_PER_BATCH])
+            for path in artifacts:
+                if os.path.exists(path):
+                    self._client.log_artifact(self.run_id, path)
+        except _backend_errors() as e:  # backend down, mlflow missing, ...
+            self.error = f"{type(e).__name__}: {e}"
+
+    def _finish(self, status: str) -> None:
+        if self.error is None and self.run_id is not None:
+            try:
+                self._client.set_terminated(self.run_id, status=status)
+            except _backend_errors() as e:
+                self.error = f"{type(e).__name__}: {e}"
+        if self.error is not None and self.fallback_path:
+            write_json(self.fallback_path, {
+                "experiment": self.experiment,
+                "run_name": self.run_name,
+                "mlflow_run_id": self.run_id,
+                "status": status,
+                "error": self.error,
+                **self.record,
+            })
+
+
+def flush_all() -> None:
+    """Close every open tracker, waiting for its last batch."""
+    with _OPEN_LOCK:
+        trackers = list(_OPEN)
+    for t in trackers:
+        t.close(wait=True)
+
+
+atexit.register(flush_all)
+
+
+def load_run_record(path: str) -> dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -1,18 +1,32 @@
 from __future__ import annotations
+import json
+import multiprocessing as mp
 import os
-from dataclasses import asdict, dataclass
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field, fields, replace
 from typing import Any
 import numpy as np
 import matplotlib.pyplot as plt
-import mlflow
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_absolute_error, accuracy_score
+from sklearn.base import is_classifier
+from sklearn.model_selection import check_cv, train_test_split
+from sklearn.metrics import get_scorer, mean_absolute_error, accuracy_score
 from .data_prep import synthesize_training_data, load_real_data, validate_and_impute
 from .features import build_feature_matrix
+from .feature_store import FeatureStore, feature_key
 from .models import HeightRegressor, SpeciesClassifier
 from .models_advanced import XGBoostHeightRegressor, XGBoostSpeciesClassifier
+from .packed import save_packed
+from .drift import PROFILE_FILE, feature_profile
+from .external import train_external
+from .search import successive_halving
+from .tracking import RunTracker
 from ..utils.io import ensure_dir, write_json
 
+try:  # pragma: no cover - optional heavy deps
+    from threadpoolctl import threadpool_limits  # type: ignore
+except ImportError:  # pragma: no cover
+    threadpool_limits = None  # type: ignore
+
 @dataclass
 class TrainConfig:
     seed: int = 42
@@ -20,58 +34,268 @@ class TrainConfig:
     save_models: bool = True
     model_type: str = "basic"  # 'basic' or 'advanced'
     mlflow_experiment: str = None
+    data_sources: list[str] = field(default_factory=lambda: ["test_forest.db.csv"])
+    impute_method: str = "knn"  # 'knn' or 'kdtree'
+    feature_store: str | None = None  # directory of the feature store; None disables caching
+    packed_models: bool = False  # also write memory-mappable packed artifacts
+    conformal_alpha: float = 0.1  # miscoverage level of the advanced species prediction sets
+    search: bool = False  # successive-halving hyperparameter search before the final fit
+    search_candidates: int = 27
+    search_jobs: int = 1  # worker processes for the search (-1: all cores)
+    parallel: bool = False  # fit both targets and their CV concurrently in worker processes
+    out_of_core: bool = False  # stream data_sources into external-memory XGBoost (advanced only)
+    chunk_size: int = 100_000  # rows per batch for out_of_core
+    require_data: bool = False  # raise instead of training on synthetic data when data_sources fail
+
+
+# Rows of the synthetic data set used when data_sources are missing
+SYNTHETIC_ROWS = 500
+
+
+def data_settings(cfg: TrainConfig) -> tuple[list[str], dict[str, Any]]:
+    """
+    Sources and prep settings the feature matrices of cfg are built from: the
+    data sources and imputation method when all sources exist, otherwise no
+    sources and the synthetic data set for cfg.seed.
+    """
+    if cfg.data_sources and all(os.path.exists(p) for p in cfg.data_sources):
+        return list(cfg.data_sources), {"impute_method": cfg.impute_method}
+    return [], {"synthetic": SYNTHETIC_ROWS, "seed": cfg.seed}
+
+
+def load_config(model_dir: str) -> TrainConfig:
+    """
+    TrainConfig the models in model_dir were trained with, read from the
+    config.json train_all writes next to them. Raises FileNotFoundError when
+    model_dir holds no config.json.
+    """
+    path = os.path.join(model_dir, "config.json")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No training config in {model_dir}; retrain with train to write config.json")
+    with open(path, encoding="utf-8") as f:
+        saved = json.load(f)
+    names = {fld.name for fld in fields(TrainConfig)}
+    return replace(TrainConfig(**{k: v for k, v in saved.items() if k in names}), out_dir=model_dir)
+
+
+def prepare_matrices(cfg: TrainConfig) -> dict[str, tuple[Any, Any]]:
+    """
+    Feature matrices per target. Uses real data when all sources are present,
+    otherwise synthetic data for cfg.seed. With cfg.feature_store set, finished
+    matrices are reused when inputs, imputation settings and features match.
+    """
+    return _prepare(cfg)[0]
+
+
+def _prepare(cfg: TrainConfig) -> tuple[dict[str, tuple[Any, Any]], list[str]]:
+    # Also returns the data sources the matrices were built from ([] for synthetic)
+    sources, settings = data_settings(cfg)
+    use_real = bool(sources)
+    if cfg.require_data and not use_real:
+        missing = [p for p in cfg.data_sources if not os.path.exists(p)] or ["(none given)"]
+        raise FileNotFoundError(f"Data sources not found: {', '.join(missing)}")
+    store = FeatureStore(cfg.feature_store) if cfg.feature_store else None
+    key = feature_key(sources, settings) if store else ""
+    if store is not None:
+        cached = store.get(key)
+        if cached is not None:
+            return cached, sources
+    # Use real data if possible, fallback to synthetic
+    df = None
+    if use_real:
+        try:
+            df = load_real_data(sources, plugin_name="field_csv")
+            df = validate_and_impute(df, method=cfg.impute_method)
+        except (OSError, ValueError, KeyError):
+            if cfg.require_data:
+                raise
+            df = None
+    # Real sources present but unusable: do not file synthetic data under their key
+    df_real = df is not None
+    cacheable = df_real or not use_real
+    if df is None:
+        df = synthesize_training_data(SYNTHETIC_ROWS, seed=cfg.seed)
+    matrices = {
+        "height": build_feature_matrix(df, target="height"),
+        "species": build_feature_matrix(df, target="species"),
+    }
+    if store is not None and cacheable:
+        store.put(key, matrices, info={"sources": sources, **settings})
+    return matrices, sources if df_real else []
+
+# Training job of the current process: (cfg, splits, params); set by _init_worker in workers
+_JOB: tuple[TrainConfig, dict[str, Any], dict[str, dict[str, Any]]] | None = None
+
+
+def _fit_height(cfg: TrainConfig, split: tuple, params: dict[str, Any]) -> dict[str, Any]:
+    X_tr, X_te, y_tr, y_te, _, _ = split
+    if cfg.model_type == "advanced":
+        hr = XGBoostHeightRegressor.create(seed=cfg.seed, **params)
+    else:
+        hr = HeightRegressor.create(seed=cfg.seed, **params)
+    hr.fit(X_tr, y_tr)
+    out = {"model": hr, "mae": float(mean_absolute_error(y_te, hr.predict(X_te)))}
+    if cfg.model_type == "advanced":
+        out["uncertainty"] = hr.uncertainty(X_te)
+    return out
+
+
+def _fit_species(cfg: TrainConfig, split: tuple, params: dict[str, Any]) -> dict[str, Any]:
+    X_tr, X_te, y_tr, y_te, _, _ = split
+    if cfg.model_type != "advanced":
+        sc = SpeciesClassifier.create(seed=cfg.seed, **params)
+        sc.fit(X_tr, y_tr)
+        return {"model": sc, "acc": float(accuracy_score(y_te, sc.predict(X_te)))}
+    xsc = XGBoostSpeciesClassifier.create(seed=cfg.seed, **params)
+    # Fit on the whole training split; conformal scores come from out-of-fold predictions
+    xsc.fit(X_tr, y_tr)
+    xsc.calibrate_cv(X_tr, y_tr, alpha=cfg.conformal_alpha)
+    report = xsc.uncertainty_report(X_te)
+    if xsc.classes_ is None:
+        raise RuntimeError("Species classifier has no classes after fit")
+    codes = np.searchsorted(xsc.classes_, np.asarray(y_te))
+    return {
+        "model": xsc,
+        "acc": float(accuracy_score(y_te, xsc.predict(X_te))),
+        "report": report,
+        "coverage": float(np.mean(report["prediction_set"][np.arange(len(codes)), codes])),
+    }
+
+
+# Folds of the advanced models' CV, one pool task each
+CV_FOLDS = 5
+
+
+def _cv_fold(cfg: TrainConfig, target: str, split: tuple, params: dict[str, Any], fold: int) -> float:
+    # Same splits and scorer as the models' cross_validate (cross_val_score with cv=CV_FOLDS)
+    _, _, _, _, X, y = split
+    if target == "height":
+        model = XGBoostHeightRegressor.create(seed=cfg.seed, **params).model
+        scoring = "neg_mean_absolute_error"
+    else:
+        model = XGBoostSpeciesClassifier.create(seed=cfg.seed, **params).model
+        y = np.unique(np.asarray(y), return_inverse=True)[1]
+        scoring = "accuracy"
+    X, y = np.asarray(X), np.asarray(y)
+    tr, te = list(check_cv(CV_FOLDS, y, classifier=is_classifier(model)).split(X, y))[fold]
+    model.fit(X[tr], y[tr])
+    return float(get_scorer(scoring)(model, X[te], y[te]))
+
+
+def _run_task(target: str, kind: str, fold: int = 0) -> Any:
+    if _JOB is None:
+        raise RuntimeError("Training worker not initialised")
+    cfg, splits, params = _JOB
+    if kind == "cv":
+        return _cv_fold(cfg, target, splits[target], params[target], fold)
+    fit = _fit_height if target == "height" else _fit_species
+    return fit(cfg, splits[target], params[target])
+
+
+def _init_worker(job: tuple, n_threads: int) -> None:
+    global _JOB
+    _JOB = job
+    # Share the cores between workers so XGBoost's n_jobs=-1 and BLAS do not oversubscribe
+    if threadpool_limits is not None:
+        threadpool_limits(limits=n_threads)
+
+
+def _run_tasks(tasks: list[tuple], job: tuple, parallel: bool = False) -> dict[tuple, Any]:
+    """
+    Run the (target, kind[, fold]) fit and CV fold tasks of one training job,
+    in this process or concurrently in worker processes. Each task seeds its
+    own models, and the thread limits leave results unchanged, so both paths
+    return the same values. Workers come from a forkserver (spawn where that
+    is unavailable): the caller already runs threads such as the RunTracker
+    sender, which a forked child could inherit mid-lock.
+    """
+    global _JOB
+    if not parallel:
+        _JOB = job
+        try:
+            return {t: _run_task(*t) for t in tasks}
+        finally:
+            _JOB = None
+    cores = os.cpu_count() or 1
+    workers = max(min(len(tasks), cores), 1)
+    ctx = mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(job, max(cores // workers, 1))
+    ) as ex:
+        futures = {t: ex.submit(_run_task, *t) for t in tasks}
+        return {t: f.result() for t, f in futures.items()}
+
 
 def train_all(cfg: TrainConfig) -> dict[str, Any]:
-    if cfg.mlflow_experiment:
-        mlflow.set_experiment(cfg.mlflow_experiment)
-        with mlflow.start_run(run_name=f"run_{cfg.seed}"):
-            mlflow.log_params(asdict(cfg))
-    
+    """
+    Train the height and species models. With cfg.mlflow_experiment set, params,
+    metrics and artifacts go to a RunTracker that ships them in batches from a
+    background thread (or to out_dir/mlflow_run.json when MLflow is unreachable);
+    the run is flushed and closed before this returns.
+    """
+    fallback = os.path.join(cfg.out_dir, "mlflow_run.json")
+    with RunTracker(cfg.mlflow_experiment, run_name=f"run_{cfg.seed}", fallback_path=fallback) as tracker:
+        return _train_all(cfg, tracker)
+
+
+def _train_all(cfg: TrainConfig, tracker: RunTracker) -> dict[str, Any]:
+    tracker.log_params(asdict(cfg))
+    if cfg.out_of_core:
+        if cfg.model_type != "advanced":
+            raise ValueError("Out-of-core training requires model_type='advanced'")
+        metrics = train_external(cfg, chunk_size=cfg.chunk_size)
+        tracker.log_metrics(metrics)
+        tracker.log_artifact(os.path.join(cfg.out_dir, "metrics.json"))
+        return metrics
     rng = np.random.default_rng(cfg.seed)
     _ = rng.random()  # ensure deterministic path exercised
-    # Use real data if possible, fallback to synthetic
-    try:
-        df = load_real_data(["test_forest.db.csv"], plugin_name="field_csv")
-        df = validate_and_impute(df)
-    except:
-        df = synthesize_training_data(500, seed=cfg.seed)
-    # Height model
-    Xh, yh = build_feature_matrix(df, target="height")
+    matrices, sources = _prepare(cfg)
+    Xh, yh = matrices["height"]
     Xh_tr, Xh_te, yh_tr, yh_te = train_test_split(Xh, yh, test_size=0.2, random_state=cfg.seed)
-    if cfg.model_type == "advanced":
-        hr = XGBoostHeightRegressor.create(seed=cfg.seed)
-        hr.fit(Xh_tr, yh_tr)
-        yh_pred = hr.predict(Xh_te)
-        mae = float(mean_absolute_error(yh_te, yh_pred))
-        cv_mae = hr.cross_validate(Xh, yh)
-        uncertainty_h = hr.uncertainty(Xh_te)
-        metrics_h = {"height_mae": mae, "height_cv_mae": cv_mae, "height_uncertainty_mean": float(np.mean(uncertainty_h))}
-        if cfg.mlflow_experiment:
-            mlflow.log_metric("height_mae", mae)
-            mlflow.log_metric("height_cv_mae", cv_mae)
-            mlflow.log_metric("height_uncertainty_mean", np.mean(uncertainty_h))
-            mlflow.log_artifact(os.path.join(cfg.out_dir, "uncertainty_height.png"))
-    else:
-        hr = HeightRegressor.create(seed=cfg.seed)
-        hr.fit(Xh_tr, yh_tr)
-        yh_pred = hr.predict(Xh_te)
-        mae = float(mean_absolute_error(yh_te, yh_pred))
-        metrics_h = {"height_mae": mae}
-        if cfg.mlflow_experiment:
-            mlflow.log_metric("height_mae", mae)
-    # Species model
-    Xs, ys = build_feature_matrix(df, target="species")
+    Xs, ys = matrices["species"]
     Xs_tr, Xs_te, ys_tr, ys_te = train_test_split(
         Xs, ys, test_size=0.2, random_state=cfg.seed, stratify=ys
     )
+    params: dict[str, dict[str, Any]] = {"height": {}, "species": {}}
+    search_metrics: dict[str, Any] = {}
+    if cfg.search:
+        # Tune on the training splits only; the held-out test rows stay untouched
+        result = successive_halving(
+            {"height": (Xh_tr, yh_tr), "species": (Xs_tr, ys_tr)},
+            model_type=cfg.model_type,
+            n_candidates=cfg.search_candidates,
+            seed=cfg.seed,
+            n_jobs=cfg.search_jobs,
+        )
+        ensure_dir(cfg.out_dir)
+        leaderboard_path = os.path.join(cfg.out_dir, "leaderboard.json")
+        write_json(leaderboard_path, result)
+        for target, best in result["best"].items():
+            params[target] = {k: v for k, v in best.items() if k != "cv_loss"}
+        search_metrics = {
+            "height_search_cv_mae": result["best"]["height"]["cv_loss"],
+            "species_search_cv_acc": 1.0 - result["best"]["species"]["cv_loss"],
+            "leaderboard_path": leaderboard_path,
+        }
+        tracker.log_artifact(leaderboard_path)
+    splits = {
+        "height": (Xh_tr, Xh_te, yh_tr, yh_te, Xh, yh),
+        "species": (Xs_tr, Xs_te, ys_tr, ys_te, Xs, ys),
+    }
+    tasks: list[tuple] = [("height", "fit"), ("species", "fit")]
+    if cfg.model_type == "advanced":
+        tasks += [(target, "cv", fold) for target in ("height", "species") for fold in range(CV_FOLDS)]
+    results = _run_tasks(tasks, (cfg, splits, params), parallel=cfg.parallel)
+    hr, sc = results[("height", "fit")]["model"], results[("species", "fit")]["model"]
+    mae, acc = results[("height", "fit")]["mae"], results[("species", "fit")]["acc"]
     if cfg.model_type == "advanced":
-        sc = XGBoostSpeciesClassifier.create(seed=cfg.seed)
-        sc.fit(Xs_tr, ys_tr)
-        ys_pred = sc.predict(Xs_te)
-        acc = float(accuracy_score(ys_te, ys_pred))
-        cv_acc = sc.cross_validate(Xs, ys)
-        uncertainty_s = sc.uncertainty(Xs_te)
+        cv_mae = -float(np.mean([results[("height", "cv", fold)] for fold in range(CV_FOLDS)]))
+        cv_acc = float(np.mean([results[("species", "cv", fold)] for fold in range(CV_FOLDS)]))
+        uncertainty_h = results[("height", "fit")]["uncertainty"]
+        report = results[("species", "fit")]["report"]
+        uncertainty_s = report["entropy"]
         # Plot uncertainties after both models trained
+        ensure_dir(cfg.out_dir)
         plt.figure()
         plt.hist(uncertainty_h, bins=20)
         plt.title("Height Prediction Uncertainty")
@@ -82,26 +306,27 @@ def train_all(cfg: TrainConfig) -> dict[str, Any]:
         plt.title("Species Prediction Uncertainty")
         plt.savefig(os.path.join(cfg.out_dir, "uncertainty_species.png"))
         plt.close()
-        metrics_s = {"species_acc": acc, "species_cv_acc": cv_acc, "species_uncertainty_mean": float(np.mean(uncertainty_s))}
-        if cfg.mlflow_experiment:
-            mlflow.log_metric("species_acc", acc)
-            mlflow.log_metric("species_cv_acc", cv_acc)
-            mlflow.log_metric("species_uncertainty_mean", np.mean(uncertainty_s))
-            mlflow.log_artifact(os.path.join(cfg.out_dir, "uncertainty_species.png"))
+        metrics_h = {"height_mae": mae, "height_cv_mae": cv_mae, "height_uncertainty_mean": float(np.mean(uncertainty_h))}
+        metrics_s = {
+            "species_acc": acc,
+            "species_cv_acc": cv_acc,
+            "species_uncertainty_mean": float(np.mean(uncertainty_s)),
+            "species_margin_mean": float(np.mean(report["margin"])),
+            "species_conformal_qhat": sc.qhat(),
+            "species_conformal_coverage": results[("species", "fit")]["coverage"],
+            "species_set_size_mean": float(np.mean(report["set_size"])),
+        }
+        tracker.log_artifact(os.path.join(cfg.out_dir, "uncertainty_height.png"))
+        tracker.log_artifact(os.path.join(cfg.out_dir, "uncertainty_species.png"))
     else:
-        sc = SpeciesClassifier.create(seed=cfg.seed)
-        sc.fit(Xs_tr, ys_tr)
-        ys_pred = sc.predict(Xs_te)
-        acc = float(accuracy_score(ys_te, ys_pred))
+        metrics_h = {"height_mae": mae}
         metrics_s = {"species_acc": acc}
-        if cfg.mlflow_experiment:
-            mlflow.log_metric("species_acc", acc)
-    
+
     ensure_dir(cfg.out_dir)
-    metrics = {**metrics_h, **metrics_s}
+    metrics = {**metrics_h, **metrics_s, **search_metrics}
     metrics["model_type"] = cfg.model_type
-    if cfg.mlflow_experiment:
-        mlflow.log_metrics(metrics)
+    metrics["data_sources"] = sources
+    tracker.log_metrics(metrics)
     if cfg.save_models:
         hr_path = os.path.join(cfg.out_dir, "height_model.pkl")
         sc_path = os.path.join(cfg.out_dir, "species_model.pkl")
@@ -109,9 +334,16 @@ def train_all(cfg: TrainConfig) -> dict[str, Any]:
         sc.save(sc_path)
         metrics["height_model_path"] = hr_path
         metrics["species_model_path"] = sc_path
-        if cfg.mlflow_experiment:
-            mlflow.log_artifact(hr_path)
-            mlflow.log_artifact(sc_path)
+        # Reference distribution for the drift check of incremental updates
+        write_json(
+            os.path.join(cfg.out_dir, PROFILE_FILE),
+            feature_profile(Xs_tr, ys_tr, cfg.model_type, {"height": len(Xh_tr), "species": len(Xs_tr)}),
+        )
+        if cfg.packed_models:
+            save_packed(hr, os.path.join(cfg.out_dir, "height_model.packed"), source=hr_path)
+            save_packed(sc, os.path.join(cfg.out_dir, "species_model.packed"), source=sc_path)
+        tracker.log_artifact(hr_path)
+        tracker.log_artifact(sc_path)
     write_json(os.path.join(cfg.out_dir, "metrics.json"), metrics)
     config_full = asdict(cfg)
     try:
@@ -124,7 +356,6 @@ def train_all(cfg: TrainConfig) -> dict[str, Any]:
     except Exception:
         pass
     write_json(os.path.join(cfg.out_dir, "config.json"), config_full)
-    if cfg.mlflow_experiment:
-        mlflow.log_artifact(os.path.join(cfg.out_dir, "metrics.json"))
-        mlflow.log_artifact(os.path.join(cfg.out_dir, "config.json"))
+    tracker.log_artifact(os.path.join(cfg.out_dir, "metrics.json"))
+    tracker.log_artifact(os.path.join(cfg.out_dir, "config.json"))
     return metrics
\ No newline at end of file
@@ -1,9 +1,17 @@
 from __future__ import annotations
-import json, os, time, hashlib, getpass, socket, subprocess
+import atexit, json, os, time, hashlib, getpass, socket, subprocess, threading, weakref
 from dataclasses import dataclass, asdict
-from typing import Any
+from typing import TYPE_CHECKING, Any
 import sys, platform
-from .utils.hashing import sha256_file
+from .utils.hashing import hash_cache_for
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+try:  # pragma: no cover - POSIX only
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
 
 
 @dataclass
@@ -16,31 +24,121 @@ class ProvenanceRecord:
     inputs: list[str]
     outputs: list[str]
     code_version: str | None
-    digest: str
+    # Set when the record is written: the digest covers prev_digest, the digest
+    # of the record before this one in the ledger, which chains the digests
+    digest: str | None = None
+    prev_digest: str | None = None
 
 
-class ProvenanceStore:
-    def __init__(self, ledger_path: str) -> None:
-        os.makedirs(os.path.dirname(ledger_path), exist_ok=True)
-        self.ledger_path = ledger_path
+# Per-process constants of every record; looked up once instead of per log()
+_PROCESS_INFO: dict[str, Any] | None = None
+# Stores with queued records, flushed at interpreter exit
+_STORES: weakref.WeakSet[ProvenanceStore] = weakref.WeakSet()
 
-    def _code_version(self) -> str | None:
+
+# Record fields covered by the digest (plus prev_digest on chained records)
+DIGEST_FIELDS = ("timestamp", "actor", "host", "step", "params", "inputs", "outputs", "code_version")
+
+
+def record_digest(rec: dict[str, Any]) -> str:
+    """Digest of a ledger record as log() computed it, chained when it has prev_digest."""
+    payload = {k: rec.get(k) for k in DIGEST_FIELDS}
+    if "prev_digest" in rec:
+        payload["prev_digest"] = rec["prev_digest"]
+    h = hashlib.sha256()
+    h.update(json.dumps(payload, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def _check_record(rec: dict[str, Any], head: str | None, chained: bool) -> str | None:
+    # Why rec does not extend a chain ending at head, or None if it does
+    if "prev_digest" not in rec:
+        if chained:
+            return "unchained record after chained records"
+    elif rec["prev_digest"] != head:
+        return "chain broken: previous record removed, reordered or altered"
+    if record_digest(rec) != rec.get("digest"):
+        return "digest mismatch: record altered"
+    return None
+
+
+def _process_info() -> dict[str, Any]:
+    global _PROCESS_INFO
+    if _PROCESS_INFO is None:
         try:
             out = subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL)  # pragma: no cover
-            return out.decode().strip()  # pragma: no cover
+            version = out.decode().strip()  # pragma: no cover
         except Exception:
+            version = None
+        _PROCESS_INFO = {
+            "actor": getpass.getuser(),
+            "host": socket.gethostname(),
+            "code_version": version,
+            "python": sys.version.split(" ")[0],
+            "platform": platform.platform(),
+        }
+    return _PROCESS_INFO
+
+
+class ProvenanceStore:
+    """
+    Append-only JSONL ledger. With the default batch_size=1 every log() is
+    written and fsynced before it returns. A larger batch_size queues records
+    in memory and writes them with one write and one fsync once batch_size
+    records are pending or flush_interval seconds have passed since the last
+    flush. log(..., sync=True) flushes the queue together with the record, and
+    pending records are flushed by records(), close() and at interpreter exit.
+    Records are chained when written, with the ledger locked, so several
+    stores or processes can append to one ledger.
+    """
+
+    def __init__(self, ledger_path: str, batch_size: int = 1, flush_interval: float = 1.0) -> None:
+        os.makedirs(os.path.dirname(ledger_path) or ".", exist_ok=True)
+        self.ledger_path = ledger_path
+        self.batch_size = max(int(batch_size), 1)
+        self.flush_interval = flush_interval
+        self._pending: list[tuple[ProvenanceRecord, dict[str, Any]]] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+        # Digests of unchanged inputs/outputs are reused instead of re-reading the files
+        self.hashes = hash_cache_for(ledger_path)
+        _STORES.add(self)
+
+    def _last_digest(self) -> str | None:
+        # Digest of the last record on disk: read backwards from the end of the file
+        if not os.path.exists(self.ledger_path):
             return None
+        with open(self.ledger_path, "rb") as f:
+            end = f.seek(0, os.SEEK_END)
+            block, tail = 4096, b""
+            while end > 0:
+                start = max(end - block, 0)
+                f.seek(start)
+                tail = f.read(end - start) + tail
+                end = start
+                lines = [ln for ln in tail.split(b"\n") if ln.strip()]
+                if len(lines) > 1 or (lines and end == 0):
+                    return json.loads(lines[-1]).get("digest")
+        return None
+
+    def _code_version(self) -> str | None:
+        return _process_info()["code_version"]
 
     def _digest(self, payload: dict[str, Any]) -> str:
         h = hashlib.sha256()
         h.update(json.dumps(payload, sort_keys=True, default=str).encode())
         return h.hexdigest()
 
-    def log(self, step: str, params: dict[str, Any], inputs: list[str], outputs: list[str]) -> ProvenanceRecord:
+    def log(
+        self, step: str, params: dict[str, Any], inputs: list[str], outputs: list[str], sync: bool = False
+    ) -> ProvenanceRecord:
+        """Record one step; with sync=True it (and anything queued) is on disk on return."""
+        info = _process_info()
         record_base = {
             "timestamp": time.time(),
-            "actor": getpass.getuser(),
-            "host": socket.gethostname(),
+            "actor": info["actor"],
+            "host": info["host"],
             "step": step,
             "params": params,
             "inputs": inputs,
@@ -49,27 +147,464 @@ class ProvenanceStore:
         }
         # Attach hashes for existing files
         try:
-            input_hashes = {p: sha256_file(p) for p in inputs if os.path.exists(p)}
-            output_hashes = {p: sha256_file(p) for p in outputs if os.path.exists(p)}
+            hashes = self.hashes.hash_many(list(inputs) + list(outputs))
+            input_hashes = {p: hashes[p] for p in inputs if p in hashes}
+            output_hashes = {p: hashes[p] for p in outputs if p in hashes}
         except Exception:
             input_hashes, output_hashes = {}, {}
         env = {
-            "python": sys.version.split(" ")[0],
-            "platform": platform.platform(),
+            "python": info["python"],
+            "platform": info["platform"],
             "input_hashes": input_hashes,
             "output_hashes": output_hashes,
         }
-        digest = self._digest(record_base)
-        rec = ProvenanceRecord(**record_base, digest=digest)
-        rec_dict = asdict(rec)
-        rec_dict["env"] = env
-        # Atomic-ish append and fsync for durability
+        rec = ProvenanceRecord(**record_base)
+        with self._lock:
+            self._pending.append((rec, env))
+            due = (
+                sync
+                or len(self._pending) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+            if due:
+                self._flush_locked()
+            elif self._timer is None:
+                # Bound how long a queued record can wait when logging goes quiet
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        return rec
+
+    def _flush_locked(self) -> None:
+        if self._timer is not None:
+            if self._timer is not threading.current_thread():
+                self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        self._write(self._pending)
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+    def _chain(self, pending: list[tuple[ProvenanceRecord, dict[str, Any]]], head: str | None) -> list[dict[str, Any]]:
+        # Each digest also covers the previous one, so removed records break the
+        # chain. Called with the ledger locked and head read from it, so stores
+        # and processes sharing a ledger extend the same chain
+        batch = []
+        for rec, env in pending:
+            rec.prev_digest = head
+            rec.digest = head = record_digest(asdict(rec))
+            batch.append({**asdict(rec), "env": env})
+        return batch
+
+    def _write(self, pending: list[tuple[ProvenanceRecord, dict[str, Any]]]) -> None:
+        # One append and one fsync for the whole batch, under an exclusive lock
+        # on the ledger (released when the file is closed)
         with open(self.ledger_path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(rec_dict) + "\n")
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            batch = self._chain(pending, self._last_digest())
+            f.write("".join(json.dumps(r) + "\n" for r in batch))
             try:
                 f.flush()
                 os.fsync(f.fileno())
             except Exception:
                 pass
-        return rec
 
+    def flush(self) -> None:
+        """Write and fsync all queued records."""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        self.flush()
+        _STORES.discard(self)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def checkpoint_path(self) -> str:
+        return self.ledger_path + ".checkpoint.json"
+
+    def _load_checkpoint(self, path: str) -> dict[str, Any] | None:
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_checkpoint(self, path: str, cp: dict[str, Any]) -> None:
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({**cp, "verified_at": time.time()}, f, indent=2)
+        os.replace(tmp, path)
+
+    def verify(self, checkpoint: str | None = None, full: bool = False) -> dict[str, Any]:
+        """
+        Check the hash chain: every record's digest must match its content and
+        name the previous record's digest. Verification resumes from the
+        checkpoint (default `<ledger>.checkpoint.json`) after confirming that
+        the last verified record is still in place, so only records added
+        since the last check are re-hashed; full=True starts from the top.
+        The checkpoint advances to the last record that verified.
+        Returns ok, the number of records checked, the total and any error.
+        """
+        self.flush()
+        cp_path = checkpoint or self.checkpoint_path()
+        cp = None if full else self._load_checkpoint(cp_path)
+        state: dict[str, Any] = {"records": 0, "offset": 0, "last_offset": None, "digest": None, "chained": False}
+        if cp is not None:
+            if not self._checkpoint_holds(cp):
+                return {"ok": False, "checked": 0, "total": None, "resumed": True,
+                        "error": {"index": cp["records"] - 1, "reason": "checkpointed record altered or removed"}}
+            state = {k: cp[k] for k in state}
+        error = None
+        checked = 0
+        if os.path.exists(self.ledger_path):
+            with open(self.ledger_path, "rb") as f:
+                f.seek(state["offset"])
+                pos = state["offset"]
+                for raw in f:
+                    start, pos = pos, pos + len(raw)
+                    if not raw.strip():
+                        continue
+                    rec = json.loads(raw)
+                    reason = _check_record(rec, state["digest"], state["chained"])
+                    if reason is not None:
+                        error = {"index": state["records"], "offset": start, "reason": reason}
+                        break
+                    checked += 1
+                    state.update(
+                        records=state["records"] + 1, offset=pos, last_offset=start,
+                        digest=rec["digest"], chained=state["chained"] or "prev_digest" in rec,
+                    )
+        self._save_checkpoint(cp_path, {"ledger": os.path.abspath(self.ledger_path), **state})
+        return {"ok": error is None, "checked": checked, "total": state["records"], "resumed": cp is not None, "error": error}
+
+    def _checkpoint_holds(self, cp: dict[str, Any]) -> bool:
+        if cp.get("last_offset") is None:
+            return True
+        if not os.path.exists(self.ledger_path) or os.path.getsize(self.ledger_path) < cp["offset"]:
+            return False
+        with open(self.ledger_path, "rb") as f:
+            f.seek(cp["last_offset"])
+            raw = f.read(cp["offset"] - cp["last_offset"])
+        try:
+            return json.loads(raw).get("digest") == cp["digest"]
+        except ValueError:
+            return False
+
+    def records(self, step: str | None = None) -> list[dict[str, Any]]:
+        """Ledger entries in append order, optionally only those of one step."""
+        self.flush()
+        if not os.path.exists(self.ledger_path):
+            return []
+        out = []
+        with open(self.ledger_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                rec = json.loads(line)
+                if step is None or rec.get("step") == step:
+                    out.append(rec)
+        return out
+
+
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    actor TEXT,
+    host TEXT,
+    step TEXT NOT NULL,
+    params TEXT,
+    code_version TEXT,
+    digest TEXT,
+    env TEXT,
+    prev_digest TEXT,
+    chained INTEGER NOT NULL DEFAULT 0  -- 1 when the digest covers prev_digest
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    record_id INTEGER NOT NULL REFERENCES records(id),
+    role TEXT NOT NULL,          -- 'input' or 'output'
+    pos INTEGER NOT NULL,        -- order within the record's inputs/outputs
+    path TEXT NOT NULL,
+    sha256 TEXT
+);
+CREATE INDEX IF NOT EXISTS records_step ON records(step, timestamp);
+CREATE INDEX IF NOT EXISTS records_timestamp ON records(timestamp);
+CREATE INDEX IF NOT EXISTS artifacts_path ON artifacts(path, role);
+CREATE INDEX IF NOT EXISTS artifacts_sha256 ON artifacts(sha256, role);
+CREATE INDEX IF NOT EXISTS artifacts_record ON artifacts(record_id);
+"""
+
+_RECORD_COLUMNS = "id, timestamp, actor, host, step, params, code_version, digest, env, prev_digest, chained"
+
+# Bound on the number of host parameters per IN (...) query
+_IN_CHUNK = 500
+
+
+class SQLiteProvenanceStore(ProvenanceStore):
+    """
+    Ledger in a SQLite database: one row per record plus one row per input
+    and output (path, sha256), indexed by step, timestamp, path and hash, so
+    lineage questions are index lookups instead of ledger scans. Batching and
+    sync behave as in ProvenanceStore; a batch is one transaction.
+    """
+
+    def __init__(self, ledger_path: str, batch_size: int = 1, flush_interval: float = 1.0) -> None:
+        import sqlite3
+
+        os.makedirs(os.path.dirname(ledger_path) or ".", exist_ok=True)
+        # Shared with the flush timer thread; every use holds self._lock
+        self._conn = sqlite3.connect(ledger_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(records)")}
+        for name, decl in (("prev_digest", "TEXT"), ("chained", "INTEGER NOT NULL DEFAULT 0")):
+            if name not in columns:  # ledgers created before hash chaining
+                self._conn.execute(f"ALTER TABLE records ADD COLUMN {name} {decl}")
+        super().__init__(ledger_path, batch_size=batch_size, flush_interval=flush_interval)
+
+    def _last_digest(self) -> str | None:
+        row = self._conn.execute("SELECT digest FROM records ORDER BY id DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def _write(self, pending: list[tuple[ProvenanceRecord, dict[str, Any]]]) -> None:
+        # BEGIN IMMEDIATE takes the write lock before the chain tail is read
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            for rec in self._chain(pending, self._last_digest()):
+                self._insert(rec)
+        except BaseException:
+            self._conn.rollback()
+            raise
+        self._conn.commit()
+
+    def _insert(self, rec: dict[str, Any]) -> None:
+        env = dict(rec.get("env") or {})
+        hashes = {"input": env.pop("input_hashes", {}) or {}, "output": env.pop("output_hashes", {}) or {}}
+        cur = self._conn.execute(
+            "INSERT INTO records (timestamp, actor, host, step, params, code_version, digest, env, prev_digest, chained) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                rec.get("timestamp"), rec.get("actor"), rec.get("host"), rec.get("step"),
+                json.dumps(rec.get("params"), default=str), rec.get("code_version"), rec.get("digest"),
+                json.dumps(env, default=str), rec.get("prev_digest"), int("prev_digest" in rec),
+            ),
+        )
+        rows = [
+            (cur.lastrowid, role, i, str(path), hashes[role].get(path))
+            for role in ("input", "output")
+            for i, path in enumerate(rec.get(f"{role}s") or [])
+        ]
+        self._conn.executemany("INSERT INTO artifacts (record_id, role, pos, path, sha256) VALUES (?, ?, ?, ?, ?)", rows)
+
+    def import_jsonl(self, jsonl_path: str) -> int:
+        """Copy every record of a JSONL ledger into this store in one transaction; returns the count."""
+        self.flush()
+        n = 0
+        with self._lock, self._conn, open(jsonl_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    self._insert(json.loads(line))
+                    n += 1
+        return n
+
+    def _rows_to_records(self, rows: list[tuple]) -> list[dict[str, Any]]:
+        if not rows:
+            return []
+        ids = [r[0] for r in rows]
+        arts: dict[int, dict[str, list[tuple[str, str | None]]]] = {i: {"input": [], "output": []} for i in ids}
+        for k in range(0, len(ids), _IN_CHUNK):
+            part = ids[k:k + _IN_CHUNK]
+            q = (
+                "SELECT record_id, role, path, sha256 FROM artifacts "
+                f"WHERE record_id IN ({','.join('?' * len(part))}) ORDER BY record_id, role, pos"
+            )
+            for rid, role, path, sha in self._conn.execute(q, part):
+                arts[rid][role].append((path, sha))
+        out = []
+        for rid, ts, actor, host, step, params, code_version, digest, env, prev_digest, chained in rows:
+            env = json.loads(env) if env else {}
+            env["input_hashes"] = {p: h for p, h in arts[rid]["input"] if h}
+            env["output_hashes"] = {p: h for p, h in arts[rid]["output"] if h}
+            rec = {
+                "id": rid, "timestamp": ts, "actor": actor, "host": host, "step": step,
+                "params": json.loads(params) if params else {},
+                "inputs": [p for p, _ in arts[rid]["input"]],
+                "outputs": [p for p, _ in arts[rid]["output"]],
+                "code_version": code_version, "digest": digest,
+            }
+            if chained:
+                rec["prev_digest"] = prev_digest
+            rec["env"] = env
+            out.append(rec)
+        return out
+
+    def _select(self, where: str = "", args: tuple = ()) -> list[dict[str, Any]]:
+        q = f"SELECT {_RECORD_COLUMNS} FROM records"
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(f"{q} {where} ORDER BY id", args).fetchall()
+            return self._rows_to_records(rows)
+
+    def records(self, step: str | None = None) -> list[dict[str, Any]]:
+        if step is None:
+            return self._select()
+        return self._select("WHERE step = ?", (step,))
+
+    def records_between(self, start: float, end: float, step: str | None = None) -> list[dict[str, Any]]:
+        """Records with start <= timestamp < end (optionally of one step)."""
+        if step is None:
+            return self._select("WHERE timestamp >= ? AND timestamp < ?", (start, end))
+        return self._select("WHERE step = ? AND timestamp >= ? AND timestamp < ?", (step, start, end))
+
+    def _record_ids(self, role: str, key: str, values: list[str]) -> dict[int, list[str]]:
+        # record id -> the matching values, for artifacts of `role` whose `key` column is in values
+        found: dict[int, list[str]] = {}
+        for k in range(0, len(values), _IN_CHUNK):
+            part = values[k:k + _IN_CHUNK]
+            q = f"SELECT record_id, {key} FROM artifacts WHERE role = ? AND {key} IN ({','.join('?' * len(part))})"
+            for rid, v in self._conn.execute(q, (role, *part)):
+                found.setdefault(rid, []).append(v)
+        return found
+
+    def _matching(self, role: str, artifact: str) -> list[int]:
+        # A 64-character hex string is taken as a content hash, anything else as a path
+        key = "sha256" if len(artifact) == 64 and all(c in "0123456789abcdef" for c in artifact) else "path"
+        return sorted(self._record_ids(role, key, [artifact]))
+
+    def produced_by(self, artifact: str) -> list[dict[str, Any]]:
+        """Records that wrote `artifact` (a path or a sha256)."""
+        with self._lock:
+            self._flush_locked()
+            ids = self._matching("output", artifact)
+        return self._by_ids(ids)
+
+    def used_by(self, artifact: str) -> list[dict[str, Any]]:
+        """Records that read `artifact` (a path or a sha256)."""
+        with self._lock:
+            self._flush_locked()
+            ids = self._matching("input", artifact)
+        return self._by_ids(ids)
+
+    def _by_ids(self, ids: list[int]) -> list[dict[str, Any]]:
+        out: list[dict[str, Any]] = []
+        for k in range(0, len(ids), _IN_CHUNK):
+            part = ids[k:k + _IN_CHUNK]
+            out += self._select(f"WHERE id IN ({','.join('?' * len(part))})", tuple(part))
+        return out
+
+    def lineage(self, artifact: str, direction: str = "upstream", max_depth: int = 50) -> dict[str, Any]:
+        """
+        Lineage graph of `artifact` (a path or a sha256). Upstream follows the
+        records that produced it to their inputs and on to whatever produced
+        those; downstream follows the records that consumed it to their outputs.
+        Artifacts are linked by content hash when one was recorded, by path
+        otherwise. Returns the records reached (each with its depth) and the
+        edges as (from, to) pairs of "artifact" paths and "record:<id>" nodes.
+        """
+        if direction not in ("upstream", "downstream"):
+            raise ValueError("direction must be 'upstream' or 'downstream'")
+        near, far = ("output", "input") if direction == "upstream" else ("input", "output")
+        seen: dict[int, int] = {}
+        edges: set[tuple[str, str]] = set()
+        with self._lock:
+            self._flush_locked()
+            frontier = {rid: 1 for rid in self._matching(near, artifact)}
+            for rid in frontier:
+                node = (f"record:{rid}", artifact) if direction == "upstream" else (artifact, f"record:{rid}")
+                edges.add(node)
+            depth = 1
+            while frontier and depth <= max_depth:
+                seen.update({rid: depth for rid in frontier if rid not in seen})
+                ids = list(frontier)
+                # The far side of this level's records, e.g. the inputs of the producers
+                nodes: list[tuple[int, str, str | None]] = []
+                for k in range(0, len(ids), _IN_CHUNK):
+                    part = ids[k:k + _IN_CHUNK]
+                    q = (
+                        "SELECT record_id, path, sha256 FROM artifacts "
+                        f"WHERE role = ? AND record_id IN ({','.join('?' * len(part))})"
+                    )
+                    nodes += self._conn.execute(q, (far, *part)).fetchall()
+                by_sha = sorted({sha for _, _, sha in nodes if sha})
+                by_path = sorted({path for _, path, sha in nodes if not sha})
+                next_ids = self._record_ids(near, "sha256", by_sha)
+                for rid, paths in self._record_ids(near, "path", by_path).items():
+                    next_ids.setdefault(rid, []).extend(paths)
+                sha_path = {sha: path for _, path, sha in nodes if sha}
+                for rid, path, _ in nodes:
+                    edges.add((path, f"record:{rid}") if direction == "upstream" else (f"record:{rid}", path))
+                for rid, values in next_ids.items():
+                    for v in values:
+                        path = sha_path.get(v, v)
+                        edges.add((f"record:{rid}", path) if direction == "upstream" else (path, f"record:{rid}"))
+                frontier = {rid: depth + 1 for rid in next_ids if rid not in seen}
+                depth += 1
+        records = self._by_ids(sorted(seen))
+        for rec in records:
+            rec["depth"] = seen[rec["id"]]
+        return {"artifact": artifact, "direction": direction, "records": records, "edges": sorted(edges)}
+
+    def verify(self, checkpoint: str | None = None, full: bool = False) -> dict[str, Any]:
+        """As ProvenanceStore.verify; the checkpoint holds the last verified record id."""
+        cp_path = checkpoint or self.checkpoint_path()
+        cp = None if full else self._load_checkpoint(cp_path)
+        state: dict[str, Any] = {"records": 0, "last_id": 0, "digest": None, "chained": False}
+        error = None
+        checked = 0
+        with self._lock:
+            self._flush_locked()
+            if cp is not None:
+                row = self._conn.execute("SELECT digest FROM records WHERE id = ?", (cp["last_id"],)).fetchone()
+                if cp["last_id"] and (row is None or row[0] != cp["digest"]):
+                    return {"ok": False, "checked": 0, "total": None, "resumed": True,
+                            "error": {"index": cp["records"] - 1, "id": cp["last_id"],
+                                      "reason": "checkpointed record altered or removed"}}
+                state = {k: cp[k] for k in state}
+            while error is None:
+                rows = self._conn.execute(
+                    f"SELECT {_RECORD_COLUMNS} FROM records WHERE id > ? ORDER BY id LIMIT 1000", (state["last_id"],)
+                ).fetchall()
+                if not rows:
+                    break
+                for rec in self._rows_to_records(rows):
+                    reason = _check_record(rec, state["digest"], state["chained"])
+                    if reason is not None:
+                        error = {"index": state["records"], "id": rec["id"], "reason": reason}
+                        break
+                    checked += 1
+                    state.update(
+                        records=state["records"] + 1, last_id=rec["id"], digest=rec["digest"],
+                        chained=state["chained"] or "prev_digest" in rec,
+                    )
+        self._save_checkpoint(cp_path, {"ledger": os.path.abspath(self.ledger_path), **state})
+        return {"ok": error is None, "checked": checked, "total": state["records"], "resumed": cp is not None, "error": error}
+
+    def close(self) -> None:
+        super().close()
+        with self._lock:
+            self._conn.close()
+
+
+def open_store(ledger_path: str, **kwargs: Any) -> ProvenanceStore:
+    """ProvenanceStore for ledger_path: SQLite for .db/.sqlite/.sqlite3 files, JSONL otherwise."""
+    if ledger_path.lower().endswith(SQLITE_SUFFIXES):
+        return SQLiteProvenanceStore(ledger_path, **kwargs)
+    return ProvenanceStore(ledger_path, **kwargs)
+
+
+def flush_all() -> None:
+    """Flush every store that still has queued records."""
+    for store in list(_STORES):
+        store.flush()
+
+
+atexit.register(flush_all)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import Any, Callable, Literal
+
+import numpy as np
+
+from . import __version__
+from .provenance import ProvenanceStore, _process_info
+from .utils.hashing import HashCache, hash_cache_for
+from .utils.io import write_json
+from .utils.store import EntryStore
+
+# Bump when the on-disk layout changes meaning
+STEP_CACHE_VERSION = 1
+
+
+def _array_digest(a: np.ndarray) -> str:
+    a = np.ascontiguousarray(a)
+    h = hashlib.sha256()
+    h.update(json.dumps([a.dtype.str, a.shape]).encode())
+    h.update(a.data.cast("B"))
+    return h.hexdigest()
+
+
+def step_key(
+    step: str,
+    params: dict[str, Any],
+    inputs: list[str] | None = None,
+    arrays: dict[str, np.ndarray] | None = None,
+    hashes: HashCache | None = None,
+) -> str:
+    """
+    Content address of one step run: the step name and parameters, the content
+    hashes of its input files (through the hash cache) and of in-memory input
+    arrays, and the code version (git commit and package version). A change to
+    any of them yields a new key.
+    """
+    inputs = list(inputs or [])
+    digests = hashes.hash_many(inputs) if hashes is not None else {}
+    missing = [p for p in inputs if p not in digests]
+    if missing and hashes is not None:
+        raise FileNotFoundError(f"Step inputs not found: {missing}")
+    payload = {
+        "version": STEP_CACHE_VERSION,
+        "step": step,
+        "params": params,
+        "inputs": [digests.get(p) for p in inputs],
+        "arrays": {k: _array_digest(v) for k, v in sorted((arrays or {}).items())},
+        "code": [_process_info()["code_version"], __version__],
+    }
+    h = hashlib.sha256()
+    h.update(json.dumps(payload, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+class StepCache(EntryStore):
+    """
+    Results of pure processing steps under `<root>/<key>/`: each numpy array in
+    its own `.npy` file (returned memory-mapped) and everything else in
+    values.json. Entries are evicted least recently used first once the store
+    exceeds max_bytes.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 1 << 30) -> None:
+        super().__init__(root, max_bytes=max_bytes)
+
+    def get(self, key: str, mmap: bool = True) -> dict[str, Any] | None:
+        meta = self.meta(key)
+        if meta is None:
+            return None
+        entry = self._entry(key)
+        with open(os.path.join(entry, "values.json"), "r", encoding="utf-8") as f:
+            out: dict[str, Any] = json.load(f)
+        mode: Literal["r"] | None = "r" if mmap else None
+        for name in meta["arrays"]:
+            out[name] = np.load(os.path.join(entry, f"{name}.npy"), mmap_mode=mode)
+        return out
+
+    def put(self, key: str, result: dict[str, Any], info: dict[str, Any] | None = None) -> str:
+        tmp = self.staging(key)
+        arrays = {k: v for k, v in result.items() if isinstance(v, np.ndarray)}
+        for name, arr in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(arr))
+        write_json(os.path.join(tmp, "values.json"), {k: v for k, v in result.items() if k not in arrays})
+        return self.publish(key, tmp, {"arrays": sorted(arrays), "info": info or {}})
+
+    def memoize(
+        self,
+        step: str,
+        fn: Callable[[], dict[str, Any]],
+        params: dict[str, Any],
+        inputs: list[str] | None = None,
+        arrays: dict[str, np.ndarray] | None = None,
+        store: ProvenanceStore | None = None,
+    ) -> tuple[dict[str, Any], bool]:
+        """
+        Result of fn() for this step, params and inputs, computed once. fn
+        returns a dict of numpy arrays and JSON-serializable values. Returns
+        (result, hit); a hit is logged to store as a `cache_hit` record naming
+        the step and key, with the cache entry as output.
+        """
+        if store is not None:
+            hashes = store.hashes
+        else:
+            from .config import get_settings
+
+            hashes = hash_cache_for(get_settings().provenance_ledger)
+        key = step_key(step, params, inputs, arrays, hashes)
+        cached = self.get(key)
+        if cached is not None:
+            if store is not None:
+                store.log("cache_hit", {"step": step, "key": key, **params}, list(inputs or []), [self._entry(key)])
+            return cached, True
+        result = fn()
+        self.put(key, result, info={"step": step, "params": params})
+        return result, False
+
+
+def default_step_cache() -> StepCache:
+    """Step cache under OW_TSHM_STEP_CACHE (default `<artifacts dir>/step_cache`)."""
+    from .config import get_settings
+
+    s = get_settings()
+    root = os.environ.get("OW_TSHM_STEP_CACHE") or os.path.join(
+        os.environ.get("OW_TSHM_ARTIFACTS_DIR", s.artifacts_dir), "step_cache"
+    )
+    return StepCache(root, max_bytes=int(os.environ.get("OW_TSHM_STEP_CACHE_MAX_BYTES", str(1 << 30))))
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import os
+from collections.abc import Iterator
+
+import numpy as np
+import pandas as pd
+
+try:  # pragma: no cover - optional heavy deps
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except ImportError:  # pragma: no cover
+    pa = None  # type: ignore
+    pq = None  # type: ignore
+
+try:  # pragma: no cover - optional heavy deps
+    import laspy  # type: ignore
+except ImportError:  # pragma: no cover
+    laspy = None  # type: ignore
+
+
+SPECIES = ("pine", "oak", "spruce")
+# Per-species traits indexed in SPECIES order (pine: conical, oak: rounded, spruce: columnar)
+BASE_HEIGHT = np.array([35.0, 18.0, 26.0])
+GROWTH_FACTOR = np.array([0.4, 0.25, 0.35])
+NDVI_OFFSET = np.array([0.08, -0.05, 0.03])
+CROWN_RATIO = np.array([2.5, 1.8, 3.0])
+BARK_ROUGHNESS = np.array([0.3, 0.7, 0.4])
+
+# Points generated at once by iter_stand (~48 MB of float64 xyz)
+MAX_BATCH_POINTS = 2_000_000
+
+
+def species_codes(species: np.ndarray) -> np.ndarray:
+    """Map species names to indices into the trait arrays (vectorized)."""
+    return pd.Index(SPECIES).get_indexer(np.asarray(species))
+
+
+def chunk_rng(seed: int, chunk: int) -> np.random.Generator:
+    """Independent generator per chunk so any chunk can be regenerated on its own."""
+    return np.random.default_rng([seed, chunk])
+
+
+def stand_extent(n_trees: int, trees_per_ha: float = 400.0) -> float:
+    """Side length (m) of a square stand holding n_trees at the given density."""
+    return float(np.sqrt(max(n_trees, 1) / trees_per_ha * 10_000.0))
+
+
+def terrain_z(x: np.ndarray, y: np.ndarray, seed: int = 42) -> np.ndarray:
+    """Smooth rolling terrain: gentle slope plus a few seeded sinusoids."""
+    rng = np.random.default_rng([seed, 0x7E44])
+    slope = rng.uniform(-0.05, 0.05, size=2)
+    z = 100.0 + slope[0] * x + slope[1] * y
+    for wavelength, amp in ((400.0, 6.0), (150.0, 2.0), (60.0, 0.5)):
+        phase = rng.uniform(0, 2 * np.pi, size=2)
+        z = z + amp * np.sin(2 * np.pi * x / wavelength + phase[0]) * np.cos(2 * np.pi * y / wavelength + phase[1])
+    return z
+
+
+def tree_table(
+    n: int,
+    rng: np.random.Generator,
+    extent: float,
+    species_mix: tuple[float, float, float] = (1 / 3, 1 / 3, 1 / 3),
+    label_offset: int = 0,
+) -> pd.DataFrame:
+    """
+    Vectorized tree attributes following the same model as synthesize_training_data,
+    with positions spread uniformly over a square stand of side `extent`.
+    """
+    code = rng.choice(len(SPECIES), size=n, p=np.asarray(species_mix) / np.sum(species_mix))
+    age = rng.integers(5, 60, size=n)
+    health_idx = rng.uniform(0.5, 1.0, size=n) - 0.005 * (age - 30).clip(min=0)
+    height = BASE_HEIGHT[code] + GROWTH_FACTOR[code] * age * health_idx + rng.normal(0, 0.8, size=n)
+    ndvi = health_idx + NDVI_OFFSET[code] + rng.normal(0, 0.02, size=n)
+    crown_shape = CROWN_RATIO[code] + rng.normal(0, 0.3, size=n)
+    footprint = rng.uniform(8, 120, size=n)
+    point_count = (footprint * 6 + rng.integers(0, 60, size=n)).astype(int)
+    bark_texture = BARK_ROUGHNESS[code] + rng.normal(0, 0.1, size=n)
+    return pd.DataFrame({
+        "label": np.arange(label_offset, label_offset + n),
+        "species": np.asarray(SPECIES)[code],
+        "age": age,
+        "height": height,
+        "health_idx": health_idx,
+        "ndvi": ndvi,
+        "footprint": footprint,
+        "point_count": point_count,
+        "crown_shape": crown_shape,
+        "bark_texture": bark_texture,
+        "centroid_x": rng.uniform(0, extent, size=n),
+        "centroid_y": rng.uniform(0, extent, size=n),
+    })
+
+
+def crown_points(trees: pd.DataFrame, rng: np.random.Generator, seed: int = 42) -> np.ndarray:
+    """
+    Sample `point_count` returns per tree inside a species-shaped crown sitting on
+    the terrain. Pine crowns are cones, oak crowns ellipsoids and spruce crowns
+    narrow columns; the crown length follows `crown_shape`. Returns (N,3).
+    """
+    counts = trees["point_count"].to_numpy(dtype=np.int64)
+    code = np.repeat(species_codes(trees["species"].to_numpy()), counts)
+    cx = np.repeat(trees["centroid_x"].to_numpy(dtype=float), counts)
+    cy = np.repeat(trees["centroid_y"].to_numpy(dtype=float), counts)
+    h = np.repeat(trees["height"].to_numpy(dtype=float), counts)
+    radius = np.repeat(np.sqrt(trees["footprint"].to_numpy(dtype=float) / np.pi), counts)
+    crown_len = np.minimum(h, 2.0 * radius * np.repeat(trees["crown_shape"].to_numpy(dtype=float), counts))
+    n = counts.sum()
+    # t: relative position from crown top (0) to crown base (1)
+    t = rng.random(n)
+    profile = np.select(
+        [code == 0, code == 1],
+        [t, np.sqrt(np.clip(1 - (2 * t - 1) ** 2, 0, None))],
+        default=np.minimum(1.0, 0.4 + t),
+    )
+    r = radius * profile * np.sqrt(rng.random(n))
+    theta = rng.uniform(0, 2 * np.pi, n)
+    x = cx + r * np.cos(theta)
+    y = cy + r * np.sin(theta)
+    z = terrain_z(cx, cy, seed) + h - t * crown_len
+    return np.column_stack([x, y, z])
+
+
+def ground_points(n: int, rng: np.random.Generator, extent: float, seed: int = 42) -> np.ndarray:
+    x = rng.uniform(0, extent, n)
+    y = rng.uniform(0, extent, n)
+    z = terrain_z(x, y, seed) + rng.normal(0, 0.05, n)
+    return np.column_stack([x, y, z])
+
+
+def cluster_points(
+    rng: np.random.Generator, centers: np.ndarray, per_cluster: int, sigma: float = 1.0
+) -> tuple[np.ndarray, np.ndarray]:
+    """Gaussian XY blobs around each center; returns xy (N,2) and cluster index per point."""
+    idx = np.repeat(np.arange(len(centers)), per_cluster)
+    xy = centers[idx] + rng.normal(0, sigma, size=(idx.size, 2))
+    return xy, idx
+
+
+def _ground_count(n_crown: int, ground_fraction: float) -> int:
+    return int(n_crown * ground_fraction / max(1.0 - ground_fraction, 1e-9))
+
+
+def point_batches(counts: np.ndarray, max_points: int, ground_fraction: float = 0.2) -> Iterator[slice]:
+    """
+    Consecutive tree ranges whose crown plus ground points stay within
+    max_points; a single tree above the bound gets a range of its own.
+    """
+    budget = max(int(max_points * (1.0 - ground_fraction)), 1)
+    cum = np.cumsum(counts)
+    start, base = 0, 0
+    while start < len(counts):
+        end = max(int(np.searchsorted(cum, base + budget, side="right")), start + 1)
+        yield slice(start, end)
+        start, base = end, int(cum[end - 1])
+
+
+def iter_stand(
+    n_trees: int,
+    seed: int = 42,
+    chunk_size: int = 100_000,
+    trees_per_ha: float = 400.0,
+    ground_fraction: float = 0.2,
+    species_mix: tuple[float, float, float] = (1 / 3, 1 / 3, 1 / 3),
+    with_points: bool = True,
+    max_points: int = MAX_BATCH_POINTS,
+) -> Iterator[tuple[pd.DataFrame, np.ndarray | None]]:
+    """
+    Stream a synthetic stand chunk by chunk as (trees, points). Chunk k is
+    generated from chunk_rng(seed, k), so a stand is reproducible from its seed
+    and chunk size, and the first chunks of a larger stand equal a smaller one
+    apart from the stand extent, which scales with n_trees. With points, each
+    chunk is yielded in tree ranges of at most max_points points
+    (point_batches), so memory is bounded by points rather than trees.
+    """
+    extent = stand_extent(n_trees, trees_per_ha)
+    for k, start in enumerate(range(0, n_trees, chunk_size)):
+        rng = chunk_rng(seed, k)
+        trees = tree_table(min(chunk_size, n_trees - start), rng, extent, species_mix, label_offset=start)
+        if not with_points:
+            yield trees, None
+            continue
+        counts = trees["point_count"].to_numpy(dtype=np.int64)
+        for batch in point_batches(counts, max_points, ground_fraction):
+            part = trees.iloc[batch]
+            crowns = crown_points(part, rng, seed)
+            ground = ground_points(_ground_count(len(crowns), ground_fraction), rng, extent, seed)
+            yield part, np.concatenate([crowns, ground])
+
+
+def write_trees(
+    path: str, n_trees: int, seed: int = 42, chunk_size: int = 100_000, **stand_kwargs
+) -> int:
+    """Write the tree table of a synthetic stand to .parquet (pyarrow) or .csv in chunks."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    written = 0
+    writer = None
+    try:
+        for trees, _ in iter_stand(n_trees, seed, chunk_size, with_points=False, **stand_kwargs):
+            if path.lower().endswith(".parquet"):
+                if pa is None:
+                    raise RuntimeError("pyarrow not available for Parquet output")
+                table = pa.Table.from_pandas(trees, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+            else:
+                trees.to_csv(path, mode="a" if written else "w", header=not written, index=False)
+            written += len(trees)
+    finally:
+        if writer is not None:
+            writer.close()
+    return written
+
+
+def write_points(
+    path: str, n_trees: int, seed: int = 42, chunk_size: int = 100_000, **stand_kwargs
+) -> int:
+    """
+    Write the point cloud of a synthetic stand in chunks to .npy (float64 memmap,
+    shape (N,3)), .parquet (x,y,z columns) or .las/.laz (laspy). Returns N.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    lower = path.lower()
+    stand = iter_stand(n_trees, seed, chunk_size, **stand_kwargs)
+    chunks = (pts for _, pts in stand if pts is not None)
+    written = 0
+    if lower.endswith(".npy"):
+        # First pass over the (cheap) tree tables to size the memmap exactly
+        ground_fraction = stand_kwargs.get("ground_fraction", 0.2)
+        max_points = stand_kwargs.get("max_points", MAX_BATCH_POINTS)
+        total = 0
+        for trees, _ in iter_stand(n_trees, seed, chunk_size, with_points=False, **stand_kwargs):
+            counts = trees["point_count"].to_numpy(dtype=np.int64)
+            for batch in point_batches(counts, max_points, ground_fraction):
+                n_crown = int(counts[batch].sum())
+                total += n_crown + _ground_count(n_crown, ground_fraction)
+        out = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=(total, 3))
+        for pts in chunks:
+            out[written:written + len(pts)] = pts
+            written += len(pts)
+        out.flush()
+        del out
+    elif lower.endswith(".parquet"):
+        if pa is None:
+            raise RuntimeError("pyarrow not available for Parquet output")
+        schema = pa.schema([("x", pa.float64()), ("y", pa.float64()), ("z", pa.float64())])
+        with pq.ParquetWriter(path, schema) as writer:
+            for pts in chunks:
+                writer.write_table(pa.Table.from_arrays([pts[:, 0], pts[:, 1], pts[:, 2]], schema=schema))
+                written += len(pts)
+    elif lower.endswith((".las", ".laz")):  # pragma: no cover - requires laspy
+        if laspy is None:
+            raise RuntimeError("laspy not available for LAS output")
+        header = laspy.LasHeader(point_format=3, version="1.2")
+        header.scales = np.array([0.01, 0.01, 0.01])
+        header.offsets = np.array([0.0, 0.0, 0.0])
+        with laspy.open(path, mode="w", header=header) as writer:
+            for pts in chunks:
+                rec = laspy.ScaleAwarePointRecord.zeros(len(pts), header=header)
+                rec.x, rec.y, rec.z = pts[:, 0], pts[:, 1], pts[:, 2]
+                writer.write_points(rec)
+                written += len(pts)
+    else:
+        raise ValueError("Unsupported point cloud format; use .npy, .parquet, .las or .laz")
+    return written
@@ -1,13 +1,157 @@
 from __future__ import annotations
 import hashlib
+import mmap
+import os
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 
+# Files at least this large are hashed from an mmap in one update() call, which
+# releases the GIL for the whole file so pool threads hash in parallel
+MMAP_MIN_BYTES = 1 << 20
+READ_BUFFER_BYTES = 1 << 20
+# Entries whose file changed less than this long before hashing are re-checked:
+# a write within the same mtime tick would otherwise go unnoticed
+RACY_NS = 1_000_000_000
+HASH_CACHE_FILE = "hash_cache.sqlite"
+
+
 def sha256_file(path: str | Path) -> str:
     h = hashlib.sha256()
     with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            h.update(chunk)
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_MIN_BYTES:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                h.update(mm)
+        else:
+            for chunk in iter(lambda: f.read(READ_BUFFER_BYTES), b""):
+                h.update(chunk)
     return h.hexdigest()
 
 
+class HashCache:
+    """
+    sha256 of files keyed by (path, size, mtime_ns, inode), kept in a small
+    SQLite database so unchanged files are never read twice, across steps and
+    runs. Lookups stat the file; any change of size, mtime or inode (e.g. a
+    rewrite via rename) is a miss. Misses are hashed in a thread pool.
+    """
+
+    def __init__(self, path: str, max_workers: int | None = None) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _db(self):
+        import sqlite3
+
+        # Connections must not cross fork(); reopen in a child process
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS hashes (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, "
+                "inode INTEGER, hashed_ns INTEGER, sha256 TEXT NOT NULL)"
+            )
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, path: str, st: os.stat_result | None = None) -> str | None:
+        """Cached digest of path if the file is unchanged since it was hashed."""
+        st = st or os.stat(path)
+        with self._lock:
+            row = self._db().execute(
+                "SELECT size, mtime_ns, inode, hashed_ns, sha256 FROM hashes WHERE path = ?", (os.path.abspath(path),)
+            ).fetchone()
+        if row is None:
+            return None
+        size, mtime_ns, inode, hashed_ns, digest = row
+        if (size, mtime_ns, inode) != (st.st_size, st.st_mtime_ns, st.st_ino):
+            return None
+        if hashed_ns - mtime_ns < RACY_NS:
+            return None
+        return digest
+
+    def put(self, path: str, digest: str, st: os.stat_result | None = None, hashed_ns: int | None = None) -> None:
+        """Record a digest computed elsewhere (e.g. while a step streamed the file)."""
+        self.put_many([(path, digest, st or os.stat(path), hashed_ns or time.time_ns())])
+
+    def put_many(self, entries: list[tuple[str, str, os.stat_result, int]]) -> None:
+        rows = [
+            (os.path.abspath(p), st.st_size, st.st_mtime_ns, st.st_ino, hashed_ns, digest)
+            for p, digest, st, hashed_ns in entries
+        ]
+        with self._lock, self._db() as conn:
+            conn.executemany("INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def sha256(self, path: str) -> str:
+        out = self.hash_many([path])
+        if path not in out:
+            raise FileNotFoundError(path)
+        return out[path]
+
+    def hash_many(self, paths: list[str]) -> dict[str, str]:
+        """Digest of every existing regular file in paths; cache misses are hashed concurrently."""
+        out: dict[str, str] = {}
+        misses: list[tuple[str, os.stat_result]] = []
+        for p in dict.fromkeys(paths):
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                # Directories (e.g. a step cache entry) have no content digest
+                continue
+            digest = self.get(p, st)
+            if digest is None:
+                misses.append((p, st))
+            else:
+                out[p] = digest
+        if not misses:
+            return out
+        started = time.time_ns()
+        if len(misses) > 1 and self.max_workers > 1:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(misses))) as ex:
+                digests = list(ex.map(sha256_file, [p for p, _ in misses]))
+        else:
+            digests = [sha256_file(p) for p, _ in misses]
+        entries = []
+        for (p, st), digest in zip(misses, digests):
+            out[p] = digest
+            # A file that changed while it was hashed must not be cached under its old stat
+            if os.stat(p).st_mtime_ns == st.st_mtime_ns:
+                entries.append((p, digest, st, started))
+        self.put_many(entries)
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+_CACHES: dict[str, HashCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def hash_cache_for(ledger_path: str) -> HashCache:
+    """The process-wide HashCache stored next to a provenance ledger."""
+    path = os.path.abspath(os.path.join(os.path.dirname(ledger_path) or ".", HASH_CACHE_FILE))
+    with _CACHES_LOCK:
+        if path not in _CACHES:
+            _CACHES[path] = HashCache(path)
+        return _CACHES[path]
+
+
+def cached_sha256(path: str | Path) -> str:
+    """sha256_file through the hash cache of the configured provenance ledger."""
+    from ..config import get_settings
+
+    return hash_cache_for(get_settings().provenance_ledger).sha256(str(path))
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import time
+from typing import Any
+
+from .io import ensure_dir, write_json
+
+
+class EntryStore:
+    """
+    Content-addressed directories under `<root>/<key>/`. Subclasses write an
+    entry's files into staging(key) and hand it to publish(), which adds
+    meta.json and moves the directory into place in one rename. An entry
+    exists once its meta.json does; the mtime of meta.json records the last
+    use, and prune() evicts least recently used entries beyond max_entries or
+    max_bytes (None: no limit).
+    """
+
+    def __init__(self, root: str, max_entries: int | None = None, max_bytes: int | None = None) -> None:
+        ensure_dir(root)
+        self.root = root
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def has(self, key: str) -> bool:
+        return os.path.exists(os.path.join(self._entry(key), "meta.json"))
+
+    def staging(self, key: str) -> str:
+        """Empty private directory to write the files of a new entry into."""
+        tmp = f"{self._entry(key)}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        ensure_dir(tmp)
+        return tmp
+
+    def publish(self, key: str, tmp: str, meta: dict[str, Any]) -> str:
+        """Write meta.json into tmp, replace the entry for key with it and prune."""
+        entry = self._entry(key)
+        write_json(os.path.join(tmp, "meta.json"), {"key": key, "created": time.time(), **meta})
+        # Publish atomically so readers never see a half-written entry
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
+        self.prune()
+        return entry
+
+    def meta(self, key: str) -> dict[str, Any] | None:
+        """meta.json of the entry for key, marking it as recently used; None if absent."""
+        path = os.path.join(self._entry(key), "meta.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return meta
+
+    def size_bytes(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def _entries(self) -> list[tuple[float, str, int]]:
+        # (last use, path, size in bytes) of every published entry
+        out = []
+        for d in os.listdir(self.root):
+            entry = os.path.join(self.root, d)
+            meta = os.path.join(entry, "meta.json")
+            if not os.path.exists(meta):
+                continue
+            size = sum(os.path.getsize(os.path.join(top, f)) for top, _, files in os.walk(entry) for f in files)
+            out.append((os.path.getmtime(meta), entry, size))
+        return out
+
+    def prune(self) -> None:
+        if self.max_entries is None and self.max_bytes is None:
+            return
+        entries = sorted(self._entries())
+        count, total = len(entries), sum(size for _, _, size in entries)
+        # Oldest use first; the newest entry stays even if it alone exceeds the budget
+        for _, entry, size in entries[:-1]:
+            if (self.max_entries is None or count <= self.max_entries) and (
+                self.max_bytes is None or total <= self.max_bytes
+            ):
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            count -= 1
+            total -= size
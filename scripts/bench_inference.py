@@ -0,0 +1,45 @@
+"""Per-call latency of sklearn/XGBoost predict vs. the packed evaluator.
+
+Usage: python scripts/bench_inference.py [rows_per_call]
+"""
+from __future__ import annotations
+
+import sys
+import time
+from functools import partial
+
+from openworld_tshm.ml.data_prep import synthesize_training_data
+from openworld_tshm.ml.features import build_feature_matrix
+from openworld_tshm.ml.models import HeightRegressor, SpeciesClassifier
+from openworld_tshm.ml.packed import pack_model
+
+
+def _per_call_us(fn, repeat: int = 200) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main(rows: int = 4) -> None:
+    df = synthesize_training_data(2000, seed=0)
+    Xh, yh = build_feature_matrix(df, "height")
+    Xs, ys = build_feature_matrix(df, "species")
+    hr = HeightRegressor.create()
+    hr.fit(Xh, yh)
+    sc = SpeciesClassifier.create()
+    sc.fit(Xs, ys)
+    for name, model, X in (("height_rf", hr.model, Xh), ("species_rf", sc.model, Xs)):
+        packed = pack_model(model)
+        batch = X.iloc[:rows]
+        arr = batch.to_numpy(dtype="float32")
+        print(
+            f"{name}: trees={packed.n_trees} depth={packed.max_depth} rows={rows} "
+            f"sklearn={_per_call_us(partial(model.predict, batch)):.0f}us "
+            f"packed={_per_call_us(partial(packed.predict, arr)):.0f}us"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 4)
@@ -0,0 +1,77 @@
+"""Insert throughput of the sqlite_utils export vs. the bulk WAL export, bbox and summary query latency.
+
+Usage: python scripts/bench_sqlite_export.py [n_trees]
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from openworld_tshm.gis.export import bulk_export_trees_sqlite, export_trees_sqlite, query_bbox
+from openworld_tshm.gis.summary import read_summary
+from openworld_tshm.synthetic import iter_stand
+
+
+def _per_call_ms(fn, repeat: int = 50) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def main(n: int = 1_000_000) -> None:
+    trees = pd.concat([t for t, _ in iter_stand(n, seed=0, with_points=False)], ignore_index=True)
+    extent = float(trees["centroid_x"].max())
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = os.path.join(tmp, "legacy.db")
+        start = time.perf_counter()
+        export_trees_sqlite(trees, db_path=legacy)
+        t_legacy = time.perf_counter() - start
+        start = time.perf_counter()
+        bulk_export_trees_sqlite(trees, db_path=os.path.join(tmp, "bulk_noindex.db"), rtree=False, summaries=False)
+        t_bulk = time.perf_counter() - start
+        bulk = os.path.join(tmp, "bulk.db")
+        start = time.perf_counter()
+        bulk_export_trees_sqlite(trees, db_path=bulk)
+        t_rtree = time.perf_counter() - start
+        print(
+            f"rows={n} sqlite_utils={t_legacy:.1f}s ({n / t_legacy:,.0f} rows/s) "
+            f"bulk={t_bulk:.1f}s ({n / t_bulk:,.0f} rows/s) bulk+summaries+rtree={t_rtree:.1f}s"
+        )
+        rng = np.random.default_rng(0)
+        boxes = [(x, y, x + 50.0, y + 50.0) for x, y in rng.uniform(0, extent - 50.0, size=(50, 2))]
+        it = iter(boxes * 1000)
+        conn = sqlite3.connect(legacy)
+
+        def scan():
+            x0, y0, x1, y1 = next(it)
+            conn.execute(
+                "SELECT * FROM trees WHERE centroid_x BETWEEN ? AND ? AND centroid_y BETWEEN ? AND ?",
+                (x0, x1, y0, y1),
+            ).fetchall()
+
+        print(
+            f"50x50 m bbox query: table scan={_per_call_ms(scan, 10):.1f}ms "
+            f"rtree={_per_call_ms(lambda: query_bbox(bulk, next(it))):.2f}ms"
+        )
+
+        def aggregate():
+            conn.execute("SELECT count(*), avg(height), avg(health_idx) FROM trees").fetchone()
+            conn.execute("SELECT species, count(*) FROM trees GROUP BY species").fetchall()
+
+        print(
+            f"stand summary: aggregate over trees={_per_call_ms(aggregate, 5):.1f}ms "
+            f"summary tables={_per_call_ms(lambda: read_summary(bulk)):.2f}ms"
+        )
+        conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
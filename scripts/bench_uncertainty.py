@@ -0,0 +1,41 @@
+"""Staged-uncertainty cost for XGBoostHeightRegressor: per-round loop (default) vs. single leaf-index pass.
+
+Usage: python scripts/bench_uncertainty.py [rows]
+"""
+from __future__ import annotations
+
+import sys
+import time
+
+import numpy as np
+
+from openworld_tshm.ml.data_prep import synthesize_training_data
+from openworld_tshm.ml.features import build_feature_matrix
+from openworld_tshm.ml.models_advanced import XGBoostHeightRegressor
+
+
+def main(rows: int = 2000) -> None:
+    df = synthesize_training_data(rows, seed=0)
+    X, y = build_feature_matrix(df, "height")
+    for n_trees in (100, 500, 1000):
+        hr = XGBoostHeightRegressor.create(seed=0)
+        hr.model.set_params(n_estimators=n_trees)
+        hr.fit(X, y)
+        timings = {}
+        for name, kwargs in (
+            ("loop", {}),
+            ("staged", {"method": "staged"}),
+            ("sampled", {"method": "sampled", "n_samples": 50}),
+        ):
+            start = time.perf_counter()
+            result = hr.uncertainty(X, **kwargs)
+            timings[name] = (time.perf_counter() - start, result)
+        same = np.array_equal(timings["loop"][1], timings["staged"][1])
+        print(
+            f"T={n_trees}: loop={timings['loop'][0]:.2f}s staged={timings['staged'][0]:.2f}s "
+            f"sampled={timings['sampled'][0]:.2f}s identical={same}"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -23,3 +23,38 @@ def test_cli_export_sqlite(tmp_path, monkeypatch):
     assert res.exit_code == 0
 
 
+
+
+def test_cli_export_sqlite_bulk_source(tmp_path, monkeypatch):
+    import sqlite3
+    monkeypatch.setenv("OW_TSHM_PROVENANCE_LEDGER", str(tmp_path / "ledger.jsonl"))
+    src = tmp_path / "trees.csv"
+    src.write_text("label,height,footprint,centroid_x,centroid_y\n1,10.0,12.0,5.0,5.0\n2,20.0,30.0,50.0,50.0\n")
+    db = tmp_path / "forest.db"
+    res = runner.invoke(app, ["export-sqlite", str(db), "--source", str(src)])
+    assert res.exit_code == 0, res.output
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT count(*) FROM trees_rtree").fetchone()[0] == 2
+
+
+def test_cli_report_reads_summary_tables(tmp_path, monkeypatch):
+    monkeypatch.setenv("OW_TSHM_PROVENANCE_LEDGER", str(tmp_path / "ledger.jsonl"))
+    src = tmp_path / "trees.csv"
+    src.write_text("label,species,height,health_idx,centroid_x,centroid_y\n1,pine,10.0,0.5,5.0,5.0\n2,oak,30.0,0.9,50.0,50.0\n")
+    db = tmp_path / "forest.db"
+    assert runner.invoke(app, ["export-sqlite", str(db), "--source", str(src), "--stand", "north"]).exit_code == 0
+    out = tmp_path / "r.html"
+    res = runner.invoke(app, ["report", str(out), "fallback", "--db", str(db), "--stand", "north"])
+    assert res.exit_code == 0, res.output
+    html = out.read_text()
+    assert "'num_trees': 2" in html and "'avg_height': 20.0" in html and "'pine': 0.5" in html
+
+
+def test_cli_export_geojson(tmp_path):
+    import json
+    src = tmp_path / "trees.csv"
+    src.write_text("label,height,centroid_x,centroid_y\n1,10.0,5.0,5.0\n2,20.0,50.0,50.0\n")
+    out = tmp_path / "trees.geojson"
+    res = runner.invoke(app, ["export-geojson", str(out), "--source", str(src), "--chunk-size", "1"])
+    assert res.exit_code == 0, res.output
+    assert [f["properties"]["label"] for f in json.loads(out.read_text())["features"]] == [1, 2]
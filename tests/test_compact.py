@@ -0,0 +1,70 @@
+import copy
+import json
+
+import numpy as np
+import pytest
+
+from openworld_tshm.ml.compact import compact_forest, compact_model, node_depths, subforest
+from openworld_tshm.ml.data_prep import synthesize_training_data
+from openworld_tshm.ml.features import build_feature_matrix
+from openworld_tshm.ml.models import SpeciesClassifier
+from openworld_tshm.ml.packed import load_packed, pack_model
+from openworld_tshm.ml.train import TrainConfig, load_config, train_all
+
+
+@pytest.fixture(scope="module")
+def forest():
+    df = synthesize_training_data(900, seed=4)
+    X, y = build_feature_matrix(df, "species")
+    sc = SpeciesClassifier.create(seed=0)
+    sc.model.set_params(n_estimators=60)
+    sc.fit(X[:600], y[:600])
+    return sc.model, X, y
+
+
+def test_subforest_matches_sklearn_subset(forest):
+    model, X, _ = forest
+    packed = pack_model(model)
+    assert np.array_equal(subforest(packed, np.arange(packed.n_trees)).predict_proba(X), packed.predict_proba(X))
+    sub = copy.deepcopy(model)
+    sub.estimators_ = [model.estimators_[i] for i in (2, 5, 9)]
+    assert np.allclose(subforest(packed, np.array([2, 5, 9])).predict_proba(X), sub.predict_proba(X))
+    cut = subforest(packed, np.arange(4), max_depth=3)
+    assert node_depths(cut).max() == cut.max_depth == 3
+    assert cut.n_trees == 4 and len(cut.feature) < len(subforest(packed, np.arange(4)).feature)
+
+
+def test_compact_forest_keeps_accuracy_within_tolerance(forest):
+    model, X, y = forest
+    compact, info = compact_forest(model, X[600:750], y[600:750], tolerance=0.01, min_trees=5)
+    assert 5 <= compact.n_trees < 60
+    assert len(compact.feature) < len(pack_model(model).feature)
+    sel_err = np.mean(compact.predict(X[600:750]) != np.asarray(y[600:750]))
+    assert sel_err <= info["target_loss"] + 1e-12
+
+
+def test_compact_model_writes_artifact_and_report(tmp_path):
+    cfg = TrainConfig(out_dir=str(tmp_path), data_sources=[])
+    train_all(cfg)
+    report = compact_model(str(tmp_path), target="species", tolerance=0.02)
+    assert report["after"]["artifact"] == str(tmp_path / "species_model.compact.packed")
+    assert not (tmp_path / "species_model.packed").exists()
+    assert report["after"]["n_nodes"] < report["before"]["n_nodes"]
+    assert report["after"]["size_bytes"] < report["before"]["size_bytes"]
+    packed = load_packed(report["after"]["artifact"])
+    assert packed.n_trees == report["after"]["n_trees"]
+    saved = json.loads((tmp_path / "species_compaction.json").read_text())
+    assert saved["before"]["accuracy"] == report["before"]["accuracy"]
+
+
+def test_compact_model_requires_training_config(tmp_path):
+    train_all(TrainConfig(out_dir=str(tmp_path), data_sources=[]))
+    (tmp_path / "config.json").unlink()
+    with pytest.raises(FileNotFoundError, match="config.json"):
+        compact_model(str(tmp_path), target="species")
+
+
+def test_load_config_round_trips_training_settings(tmp_path):
+    cfg = TrainConfig(out_dir=str(tmp_path), data_sources=[], seed=7, impute_method="kdtree")
+    train_all(cfg)
+    assert load_config(str(tmp_path)) == cfg
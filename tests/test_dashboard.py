@@ -13,3 +13,39 @@ def test_dashboard_health_and_trees():
     assert len(data["features"]) > 0
 
 
+def test_dashboard_trees_bbox(tmp_path, monkeypatch):
+    import pandas as pd
+
+    from openworld_tshm.gis.export import bulk_export_trees_sqlite
+
+    client = TestClient(app)
+    monkeypatch.setenv("OW_TSHM_TREES_DB", str(tmp_path / "missing.db"))
+    assert client.get("/api/trees/bbox", params={"min_x": 0, "min_y": 0, "max_x": 1, "max_y": 1}).status_code == 404
+    db = tmp_path / "forest.db"
+    df = pd.DataFrame({"label": [1, 2], "height": [10.0, 20.0], "footprint": [10.0, 10.0],
+                       "centroid_x": [5.0, 50.0], "centroid_y": [5.0, 50.0]})
+    bulk_export_trees_sqlite(df, db_path=str(db))
+    monkeypatch.setenv("OW_TSHM_TREES_DB", str(db))
+    r = client.get("/api/trees/bbox", params={"min_x": 0, "min_y": 0, "max_x": 10, "max_y": 10})
+    assert r.status_code == 200
+    feats = r.json()["features"]
+    assert [f["properties"]["label"] for f in feats] == [1]
+    assert feats[0]["geometry"]["coordinates"] == [5.0, 5.0]
+
+
+def test_dashboard_summary_endpoints(tmp_path, monkeypatch):
+    import pandas as pd
+
+    from openworld_tshm.gis.export import bulk_export_trees_sqlite
+
+    client = TestClient(app)
+    db = tmp_path / "forest.db"
+    df = pd.DataFrame({"label": [1, 2, 3], "species": ["pine", "oak", "pine"], "height": [10.0, 20.0, 30.0],
+                       "health_idx": [0.5, 0.7, 0.9], "centroid_x": [5.0, 50.0, 150.0], "centroid_y": [5.0, 50.0, 5.0]})
+    bulk_export_trees_sqlite(df, db_path=str(db), stand="north")
+    monkeypatch.setenv("OW_TSHM_TREES_DB", str(db))
+    summary = client.get("/api/summary", params={"stand": "north"}).json()
+    assert summary["num_trees"] == 3 and summary["avg_height"] == 20.0
+    assert summary["species_breakdown"]["pine"] == 2 / 3
+    cells = client.get("/api/summary/grid", params={"min_x": 0, "min_y": 0, "max_x": 90, "max_y": 90}).json()["cells"]
+    assert [(c["ix"], c["iy"], c["num_trees"]) for c in cells] == [(0, 0, 2)]
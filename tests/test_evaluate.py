@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+from typer.testing import CliRunner
+
+from openworld_tshm.cli import app
+from openworld_tshm.ml.data_prep import synthesize_training_data
+from openworld_tshm.ml.evaluate import evaluate_matrix, summarize
+
+
+def test_summarize_confidence_interval():
+    table = pd.DataFrame({
+        "model_type": ["basic"] * 3 + ["advanced"],
+        "data": ["d"] * 4,
+        "metric": ["mae"] * 4,
+        "value": [1.0, 2.0, 3.0, 5.0],
+    })
+    s = summarize(table).set_index("model_type")
+    assert s.loc["basic", "mean"] == 2.0 and s.loc["basic", "n"] == 3
+    # t(0.975, 2) = 4.303, sem = 1 / sqrt(3)
+    assert abs(s.loc["basic", "ci_high"] - (2.0 + 4.303 / 3 ** 0.5)) < 1e-3
+    assert pd.isna(s.loc["advanced", "ci_low"])
+
+
+def test_evaluate_matrix_skips_unchanged_cells(tmp_path):
+    src = tmp_path / "field.csv"
+    synthesize_training_data(200, seed=1).to_csv(src, index=False)
+    out = str(tmp_path / "eval")
+    sets = [[str(src)], [str(tmp_path / "missing.csv")]]
+    first = evaluate_matrix([1, 2], ["basic"], sets, out_dir=out, n_jobs=2)
+    assert (first["ran"], first["skipped"]) == (4, 0)
+    table = first["table"]
+    assert set(table["data"]) == {"field.csv", "synthetic"}
+    assert len(table[table["metric"] == "height_mae"]) == 4
+    again = evaluate_matrix([1, 2], ["basic"], sets, out_dir=out)
+    assert (again["ran"], again["skipped"]) == (0, 4)
+    pd.testing.assert_frame_equal(again["summary"], first["summary"])
+    # Changing a source invalidates only the cells that read it
+    synthesize_training_data(200, seed=2).to_csv(src, index=False)
+    changed = evaluate_matrix([1, 2], ["basic"], sets, out_dir=out)
+    assert (changed["ran"], changed["skipped"]) == (2, 2)
+
+
+def test_cli_evaluate(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    res = CliRunner().invoke(app, ["evaluate", "--seed", "1", "--model-type", "basic", "--out-dir", "ev"])
+    assert res.exit_code == 0, res.output
+    assert "ran=1" in res.output
+    assert (tmp_path / "ev" / "summary.csv").exists()
+
+
+def test_evaluate_matrix_keeps_finished_cells_when_one_fails(tmp_path):
+    from openworld_tshm.ml.evaluate import cell_key, matrix_cells
+    from openworld_tshm.ml.train import TrainConfig
+
+    out = tmp_path / "eval"
+    cells = matrix_cells([1, 2, 3], ["basic"], [TrainConfig().data_sources])
+    # A file where the second cell's run directory goes makes its training fail
+    blocker = out / "cells" / cell_key(cells[1])
+    blocker.parent.mkdir(parents=True)
+    blocker.write_text("")
+    with pytest.raises(OSError):
+        evaluate_matrix([1, 2, 3], ["basic"], out_dir=str(out), n_jobs=2)
+    blocker.unlink()
+    rerun = evaluate_matrix([1, 2, 3], ["basic"], out_dir=str(out))
+    assert (rerun["ran"], rerun["skipped"]) == (1, 2)
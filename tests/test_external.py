@@ -0,0 +1,48 @@
+import json
+
+import numpy as np
+import pytest
+
+from openworld_tshm.ml.data_prep import synthesize_training_data
+from openworld_tshm.ml.external import holdout_mask, train_external
+from openworld_tshm.ml.features import FEATURES_SPECIES
+from openworld_tshm.ml.predict import load_models
+from openworld_tshm.ml.train import TrainConfig, train_all
+
+
+def test_holdout_mask_is_chunk_independent():
+    whole = holdout_mask(0, 10_000, seed=3, test_size=0.2)
+    parts = np.concatenate([holdout_mask(s, 1000, seed=3, test_size=0.2) for s in range(0, 10_000, 1000)])
+    assert np.array_equal(whole, parts)
+    assert abs(whole.mean() - 0.2) < 0.02
+    assert not np.array_equal(whole, holdout_mask(0, 10_000, seed=4, test_size=0.2))
+
+
+def test_train_external_streams_chunks(tmp_path):
+    sources = []
+    for i in range(2):
+        p = tmp_path / f"part{i}.parquet"
+        df = synthesize_training_data(1500, seed=i)
+        df.loc[df.index[:20], "ndvi"] = np.nan  # left to XGBoost's missing-value handling
+        df.to_parquet(p)
+        sources.append(str(p))
+    out = tmp_path / "run"
+    metrics = train_all(TrainConfig(
+        seed=1, out_dir=str(out), model_type="advanced", data_sources=sources, out_of_core=True, chunk_size=500,
+    ))
+    assert metrics["train_batches"] == {"height": 6, "species": 6}
+    assert metrics["height_test_rows"] + metrics["species_test_rows"] > 0
+    assert metrics["species_acc"] > 0.9 and metrics["height_mae"] < 10
+    assert not (out / ".xgb_cache").exists()
+    assert json.loads((out / "metrics.json").read_text())["out_of_core"] is True
+    models = load_models(str(out))
+    X = synthesize_training_data(10, seed=9)
+    assert set(models["species"].predict(X[FEATURES_SPECIES])) <= {"oak", "pine", "spruce"}
+
+
+def test_train_external_requires_sources(tmp_path):
+    cfg = TrainConfig(out_dir=str(tmp_path), model_type="advanced", data_sources=[str(tmp_path / "nope.csv")])
+    with pytest.raises(FileNotFoundError):
+        train_external(cfg)
+    with pytest.raises(ValueError):
+        train_all(TrainConfig(out_dir=str(tmp_path), out_of_core=True))
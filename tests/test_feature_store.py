@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from openworld_tshm.ml.data_prep import synthesize_training_data
+from openworld_tshm.ml.feature_store import FeatureStore, feature_key
+from openworld_tshm.ml.features import build_feature_matrix
+from openworld_tshm.ml.train import TrainConfig, prepare_matrices, train_all
+
+
+def test_feature_store_roundtrip_mmap(tmp_path):
+    df = synthesize_training_data(50, seed=1)
+    matrices = {t: build_feature_matrix(df, t) for t in ("height", "species")}
+    store = FeatureStore(str(tmp_path / "fs"))
+    key = feature_key([], {"seed": 1})
+    assert store.get(key) is None
+    store.put(key, matrices)
+    cached = store.get(key)
+    for t, (X, y) in matrices.items():
+        Xc, yc = cached[t]
+        pd.testing.assert_frame_equal(Xc, X, check_dtype=True)
+        assert list(yc) == list(y) and yc.name == y.name
+    assert isinstance(np.load(tmp_path / "fs" / key / "height" / "x0.npy", mmap_mode="r"), np.memmap)
+
+
+def test_feature_key_tracks_inputs_and_settings(tmp_path):
+    src = tmp_path / "plots.csv"
+    src.write_text("species,height\npine,20\n")
+    k1 = feature_key([str(src)], {"impute_method": "knn"})
+    assert k1 == feature_key([str(src)], {"impute_method": "knn"})
+    assert k1 != feature_key([str(src)], {"impute_method": "kdtree"})
+    src.write_text("species,height\npine,21\n")
+    assert k1 != feature_key([str(src)], {"impute_method": "knn"})
+
+
+def test_train_all_reuses_cached_matrices(tmp_path, monkeypatch):
+    cfg = TrainConfig(seed=4, out_dir=str(tmp_path / "a"), feature_store=str(tmp_path / "fs"), save_models=False)
+    m1 = train_all(cfg)
+
+    def _boom(*a, **k):
+        raise AssertionError("data prep should be skipped on a cache hit")
+
+    monkeypatch.setattr("openworld_tshm.ml.train.synthesize_training_data", _boom)
+    prepare_matrices(cfg)
+    m2 = train_all(TrainConfig(seed=4, out_dir=str(tmp_path / "b"), feature_store=str(tmp_path / "fs"), save_models=False))
+    assert m1["height_mae"] == m2["height_mae"] and m1["species_acc"] == m2["species_acc"]
+
+
+def test_store_prunes_least_recently_used(tmp_path):
+    df = synthesize_training_data(20, seed=2)
+    matrices = {"height": build_feature_matrix(df, "height")}
+    store = FeatureStore(str(tmp_path / "fs"), max_entries=2)
+    keys = [feature_key([], {"i": i}) for i in range(3)]
+    for k in keys:
+        store.put(k, matrices)
+    assert sum(store.has(k) for k in keys) == 2
@@ -0,0 +1,127 @@
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from typer.testing import CliRunner
+
+from openworld_tshm.cli import app
+from openworld_tshm.gis.geoparquet import read_geoparquet, write_geoparquet
+
+
+def _trees(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "label": np.arange(n),
+        "species": rng.choice(["pine", "oak", "spruce"], size=n),
+        "height": rng.uniform(5, 40, n),
+        "centroid_x": rng.uniform(0, 1000, n),
+        "centroid_y": rng.uniform(0, 1000, n),
+    })
+
+
+def test_write_tiles_with_geo_metadata_and_wkb(tmp_path):
+    trees = _trees()
+    index = write_geoparquet(iter([trees.iloc[:2000], trees.iloc[2000:]]), str(tmp_path / "gp"),
+                             tile_size=250.0, row_group_size=100, buffer_row_groups=4)
+    assert index["rows"] == len(trees) and len(index["tiles"]) == 16
+    assert json.loads((tmp_path / "gp" / "_tiles.json").read_text()) == index
+    tile = index["tiles"][5]
+    assert len(tile["paths"]) == 1
+    f = pq.ParquetFile(tmp_path / "gp" / tile["paths"][0])
+    geo = json.loads(f.schema_arrow.metadata[b"geo"])
+    assert geo["primary_column"] == "geometry" and geo["columns"]["geometry"]["encoding"] == "WKB"
+    assert geo["columns"]["geometry"]["covering"]["bbox"]["xmin"] == ["bbox", "xmin"]
+    assert f.metadata.num_row_groups > 1
+    # Z-ordered row groups each cover part of the tile only
+    ix = f.schema_arrow.get_field_index("centroid_x")
+    spans = [f.metadata.row_group(g).column(ix).statistics for g in range(f.metadata.num_row_groups)]
+    assert min(s.max - s.min for s in spans) < 250.0 / 2
+    table = f.read(columns=["centroid_x", "centroid_y", "geometry"])
+    order, kind, x, y = struct.unpack("<BIdd", table["geometry"][0].as_py())
+    assert (order, kind) == (1, 1)
+    assert (x, y) == (table["centroid_x"][0].as_py(), table["centroid_y"][0].as_py())
+
+
+def test_read_bbox_returns_exactly_the_trees_inside(tmp_path):
+    trees = _trees()
+    write_geoparquet(trees, str(tmp_path / "gp"), tile_size=250.0, row_group_size=200)
+    box = (100.0, 420.0, 380.0, 610.0)
+    got = read_geoparquet(str(tmp_path / "gp"), bbox=box)
+    inside = trees[
+        trees["centroid_x"].between(box[0], box[2]) & trees["centroid_y"].between(box[1], box[3])
+    ]
+    assert sorted(got["label"]) == sorted(inside["label"])
+    # Without geopandas the WKB column is dropped; the frame matches trees_geodataframe's fallback
+    assert "geometry" not in got.columns and "bbox" not in got.columns
+    assert len(read_geoparquet(str(tmp_path / "gp"))) == len(trees)
+    empty = read_geoparquet(str(tmp_path / "gp"), bbox=(-50.0, -50.0, -10.0, -10.0))
+    assert len(empty) == 0 and "height" in empty.columns
+    subset = read_geoparquet(str(tmp_path / "gp"), bbox=box, columns=["label"])
+    assert list(subset.columns) == ["label"]
+
+
+def test_cli_export_geoparquet(tmp_path):
+    src = tmp_path / "trees.parquet"
+    _trees(500).to_parquet(src, index=False)
+    res = CliRunner().invoke(app, ["export-geoparquet", str(tmp_path / "gp"), "--source", str(src), "--tile-size", "500"])
+    assert res.exit_code == 0, res.output
+    assert "4 tiles" in res.output
+    assert len(read_geoparquet(str(tmp_path / "gp"))) == 500
+
+
+def test_trees_geodataframe_leaves_input_unchanged(tmp_path):
+    from openworld_tshm.gis.layers import trees_geodataframe
+
+    write_geoparquet(_trees(50), str(tmp_path / "gp"), tile_size=2000.0)
+    raw = pq.read_table(next((tmp_path / "gp").rglob("*.parquet"))).to_pandas()
+    before = list(raw.columns)
+    out = trees_geodataframe(raw)
+    assert list(raw.columns) == before and "geometry" in raw.columns
+    assert len(out) == 50
+
+
+def test_write_replaces_only_earlier_exports(tmp_path):
+    import pytest
+
+    out = tmp_path / "gp"
+    write_geoparquet(_trees(200), str(out), tile_size=250.0)
+    write_geoparquet(_trees(100, seed=1), str(out), tile_size=500.0)
+    assert len(read_geoparquet(str(out))) == 100
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["gp"]
+    other = tmp_path / "notes"
+    other.mkdir()
+    (other / "keep.txt").write_text("x")
+    with pytest.raises(FileExistsError):
+        write_geoparquet(_trees(10), str(other))
+    assert (other / "keep.txt").read_text() == "x"
+
+
+def test_write_bounds_open_files_and_buffered_rows(tmp_path, monkeypatch):
+    import openworld_tshm.gis.geoparquet as gp
+
+    opened = {"now": 0, "max": 0}
+
+    class CountingWriter(pq.ParquetWriter):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            opened["now"] += 1
+            opened["max"] = max(opened["max"], opened["now"])
+
+        def close(self):
+            opened["now"] -= 1
+            super().close()
+
+    monkeypatch.setattr(gp.pq, "ParquetWriter", CountingWriter)
+    trees = _trees()
+    chunks = [trees.iloc[i:i + 500] for i in range(0, len(trees), 500)]
+    index = write_geoparquet(iter(chunks), str(tmp_path / "gp"), tile_size=250.0, row_group_size=100,
+                             max_open_files=3, max_buffered_rows=400)
+    assert opened["max"] <= 3 and opened["now"] == 0
+    assert index["rows"] == len(trees) and len(index["tiles"]) == 16
+    assert any(len(t["paths"]) > 1 for t in index["tiles"])
+    assert sum(pq.ParquetFile(tmp_path / "gp" / p).metadata.num_rows for t in index["tiles"] for p in t["paths"]) == len(trees)
+    got = read_geoparquet(str(tmp_path / "gp"), bbox=(100.0, 420.0, 380.0, 610.0))
+    inside = trees[trees["centroid_x"].between(100.0, 380.0) & trees["centroid_y"].between(420.0, 610.0)]
+    assert sorted(got["label"]) == sorted(inside["label"])
@@ -1,6 +1,7 @@
 from openworld_tshm.gis.layers import trees_geodataframe, to_geojson
 from openworld_tshm.gis.export import export_trees_sqlite
 import pandas as pd
+import pytest
 
 
 def test_gis_fallbacks():
@@ -19,3 +20,130 @@ def test_export_sqlite_and_csv(tmp_path):
     assert db.exists() or (tmp_path / "forest.db.csv").exists()
 
 
+
+
+def test_bulk_export_rtree_bbox_matches_scan(tmp_path):
+    import numpy as np
+
+    from openworld_tshm.gis.export import bulk_export_trees_sqlite, query_bbox
+
+    rng = np.random.default_rng(0)
+    n = 2000
+    df = pd.DataFrame({
+        "label": np.arange(n),
+        "species": rng.choice(["pine", "oak", None], size=n),
+        "height": rng.uniform(5, 30, n),
+        "footprint": rng.uniform(8, 120, n),
+        "centroid_x": rng.uniform(0, 500, n),
+        "centroid_y": rng.uniform(0, 500, n),
+    })
+    df.loc[3, "height"] = np.nan
+    src = tmp_path / "trees.parquet"
+    df.to_parquet(src, index=False)
+    db = str(tmp_path / "forest.db")
+    assert bulk_export_trees_sqlite(str(src), db_path=db, batch_size=300) == n
+    # Re-export replaces rows by label instead of duplicating them
+    assert bulk_export_trees_sqlite(df.iloc[:500], db_path=db, batch_size=128) == 500
+    box = (100.0, 150.0, 180.0, 260.0)
+    got = query_bbox(db, box)
+    r = np.sqrt(df["footprint"] / np.pi)
+    hit = (
+        (df["centroid_x"] + r >= box[0]) & (df["centroid_x"] - r <= box[2])
+        & (df["centroid_y"] + r >= box[1]) & (df["centroid_y"] - r <= box[3])
+    )
+    # The R*Tree stores float32 bounds rounded outwards, so it may include boundary neighbours
+    assert set(df.loc[hit, "label"]) <= set(got["label"])
+    assert len(got) - hit.sum() <= 2
+    import sqlite3
+
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT count(*) FROM trees").fetchone()[0] == n
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("SELECT height, species FROM trees WHERE label = 3").fetchone()[0] is None
+
+
+@pytest.mark.parametrize("labels", ["int", "str", None])
+def test_bulk_export_updates_rtree_per_batch(tmp_path, labels):
+    import sqlite3
+
+    import numpy as np
+
+    from openworld_tshm.gis.export import bulk_export_trees_sqlite
+
+    rng = np.random.default_rng(1)
+
+    def trees(ids):
+        df = pd.DataFrame({
+            "footprint": rng.uniform(8, 120, len(ids)),
+            "centroid_x": rng.uniform(0, 500, len(ids)),
+            "centroid_y": rng.uniform(0, 500, len(ids)),
+        })
+        if labels is not None:
+            df.insert(0, "label", ids if labels == "int" else [f"t{i}" for i in ids])
+        return df
+
+    def index(path):
+        with sqlite3.connect(path) as conn:
+            return conn.execute(
+                "SELECT t.rowid, r.min_x, r.max_x, r.min_y, r.max_y FROM trees_rtree r "
+                "LEFT JOIN trees t ON t.rowid = r.id ORDER BY r.id"
+            ).fetchall()
+
+    first, update = trees(np.arange(1000)), trees(np.arange(800, 1300))
+    db = str(tmp_path / "forest.db")
+    bulk_export_trees_sqlite(first, db_path=db, batch_size=256, summaries=False)
+    with sqlite3.connect(db) as conn:
+        conn.execute("INSERT INTO trees_rtree VALUES (-1, 0, 0, 0, 0)")  # only a full rebuild drops this
+    # Moves trees 800-999 and appends 1000-1299; only their entries change
+    bulk_export_trees_sqlite(update, db_path=db, batch_size=256, summaries=False)
+    got = index(db)
+    assert got[0][0] is None and len(got) == (1301 if labels is not None else 1501)
+    # Same entries as a single load of the final table
+    ref = str(tmp_path / "ref.db")
+    with sqlite3.connect(db) as conn:
+        final = pd.read_sql_query("SELECT * FROM trees ORDER BY rowid", conn)
+    bulk_export_trees_sqlite(final, db_path=ref, summaries=False)
+    assert [r[1:] for r in got[1:]] == [r[1:] for r in index(ref)]
+
+
+def test_streaming_geojson_matches_to_geojson(tmp_path):
+    import io
+    import json
+
+    import numpy as np
+
+    from openworld_tshm.gis.layers import iter_geojson, write_geojson
+
+    df = pd.DataFrame({
+        "label": np.arange(7),
+        "species": ["pine", None, "oak", "pine", "oak", "spruce", "pine"],
+        "height": [10.0, np.nan, 12.5, 8.0, 20.0, 15.0, 9.5],
+        "centroid_x": np.linspace(0, 6, 7),
+        "centroid_y": np.linspace(10, 16, 7),
+    })
+    gj = to_geojson(df)
+    assert gj["features"][1]["properties"] == {
+        "label": 1, "species": None, "height": None, "centroid_x": 1.0, "centroid_y": 11.0
+    }
+    blocks = list(iter_geojson(df, chunk_size=3))
+    assert len(blocks) == 5  # header, three chunks, footer
+    assert json.loads(b"".join(blocks)) == gj
+    buf = io.BytesIO()
+    assert write_geojson(iter([df.iloc[:4], df.iloc[4:]]), buf, ndjson=True) == len(buf.getvalue())
+    lines = buf.getvalue().decode().splitlines()
+    assert [json.loads(ln) for ln in lines] == gj["features"]
+    out = tmp_path / "trees.geojsonl"
+    write_geojson(df, str(out))
+    assert len(out.read_text().splitlines()) == 7
+    assert json.loads(b"".join(iter_geojson(df.iloc[:0]))) == {"type": "FeatureCollection", "features": []}
+
+
+def test_streaming_geojson_without_orjson(monkeypatch):
+    import json
+
+    from openworld_tshm.gis import layers
+
+    df = pd.DataFrame({"label": [1, 2], "height": [3.0, float("nan")], "centroid_x": [0.0, 1.0], "centroid_y": [2.0, 3.0]})
+    fast = b"".join(layers.iter_geojson(df))
+    monkeypatch.setattr(layers, "orjson", None)
+    assert json.loads(b"".join(layers.iter_geojson(df))) == json.loads(fast)
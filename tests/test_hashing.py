@@ -0,0 +1,83 @@
+import os
+import time
+
+from openworld_tshm.provenance import ProvenanceStore
+from openworld_tshm.utils import hashing
+from openworld_tshm.utils.hashing import HashCache, sha256_file
+
+
+def _old(path, mtime_age=10.0):
+    # Backdate the file so it is not considered racy
+    t = time.time() - mtime_age
+    os.utime(path, (t, t))
+
+
+def test_sha256_file_mmap_matches_small_reads(tmp_path, monkeypatch):
+    p = tmp_path / "big.bin"
+    p.write_bytes(os.urandom(3 << 20))
+    small = sha256_file(p)
+    monkeypatch.setattr(hashing, "MMAP_MIN_BYTES", 1)
+    assert sha256_file(p) == small
+    (tmp_path / "empty").write_bytes(b"")
+    assert sha256_file(tmp_path / "empty") == sha256_file(str(tmp_path / "empty"))
+
+
+def test_hash_cache_hits_and_invalidates(tmp_path, monkeypatch):
+    files = []
+    for i in range(3):
+        p = tmp_path / f"tile{i}.laz"
+        p.write_bytes(os.urandom(1000))
+        _old(p)
+        files.append(str(p))
+    cache = HashCache(str(tmp_path / "cache.sqlite"))
+    first = cache.hash_many(files + [str(tmp_path / "missing")])
+    assert first == {p: sha256_file(p) for p in files}
+    calls = []
+    monkeypatch.setattr(hashing, "sha256_file", lambda p: calls.append(p) or sha256_file(p))
+    assert cache.hash_many(files) == first and calls == []
+    # Same size, new content and mtime -> re-hashed
+    with open(files[1], "r+b") as f:
+        f.write(b"x" * 10)
+    _old(files[1], 5.0)
+    assert cache.hash_many(files)[files[1]] == sha256_file(files[1])
+    assert calls == [files[1]]
+    # Replaced by another inode with the same size and mtime -> re-hashed
+    st = os.stat(files[2])
+    tmp = tmp_path / "new.laz"
+    with open(files[2], "rb") as f:
+        tmp.write_bytes(f.read())
+    os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+    os.replace(tmp, files[2])
+    cache.hash_many([files[2]])
+    assert calls[-1] == files[2]
+
+
+def test_racy_entries_are_rechecked(tmp_path):
+    p = tmp_path / "fresh.bin"
+    p.write_bytes(b"abc")
+    cache = HashCache(str(tmp_path / "cache.sqlite"))
+    cache.hash_many([str(p)])
+    assert cache.get(str(p)) is None  # hashed within the mtime tolerance
+    _old(p)
+    cache.hash_many([str(p)])
+    assert cache.get(str(p)) == sha256_file(p)
+
+
+def test_provenance_reuses_cached_hashes(tmp_path, monkeypatch):
+    src = tmp_path / "tile.laz"
+    src.write_bytes(os.urandom(2048))
+    _old(src)
+    store = ProvenanceStore(str(tmp_path / "prov" / "ledger.jsonl"))
+    store.log("ingest", {}, [str(src)], [])
+    assert os.path.exists(tmp_path / "prov" / "hash_cache.sqlite")
+    monkeypatch.setattr(hashing, "sha256_file", lambda p: (_ for _ in ()).throw(AssertionError("re-hashed")))
+    rec = store.log("train", {}, [str(src)], [])
+    assert store.records()[-1]["env"]["input_hashes"][str(src)] == store.records()[0]["env"]["input_hashes"][str(src)]
+    assert rec.step == "train"
+
+
+def test_hash_many_skips_directories(tmp_path):
+    p = tmp_path / "a.bin"
+    p.write_bytes(b"abc")
+    out = HashCache(str(tmp_path / "h.sqlite")).hash_many([str(p), str(tmp_path)])
+    assert out == {str(p): sha256_file(p)}
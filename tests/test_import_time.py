@@ -0,0 +1,38 @@
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+HEAVY = ("numpy", "pandas", "sklearn", "scipy", "xgboost", "mlflow", "matplotlib", "pydantic", "openai")
+# Optional cap on the cumulative import time of the CLI module (e.g. 200); wall
+# clock depends on machine load, so it is only checked when set
+BUDGET_MS = os.environ.get("OW_TSHM_IMPORT_BUDGET_MS")
+
+
+def _importtime(module: str) -> dict[str, int]:
+    res = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True, env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    )
+    times = {}
+    for line in res.stderr.splitlines():
+        m = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)", line)
+        if m:
+            times[m.group(2)] = int(m.group(1))
+    return times
+
+
+def test_cli_import_is_light():
+    times = _importtime("openworld_tshm.cli")
+    loaded = {name.split(".")[0] for name in times}
+    assert not loaded & set(HEAVY), sorted(loaded & set(HEAVY))
+    if BUDGET_MS:
+        assert times["openworld_tshm.cli"] / 1000 < float(BUDGET_MS)
+
+
+def test_dashboard_import_skips_ml_stack():
+    pytest.importorskip("fastapi")
+    loaded = {name.split(".")[0] for name in _importtime("openworld_tshm.dashboard.server")}
+    assert not loaded & {"sklearn", "scipy", "xgboost", "mlflow", "matplotlib", "pandas"}
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from sklearn.impute import KNNImputer
+
+from openworld_tshm.ml.data_prep import synthesize_training_data, validate_and_impute
+from openworld_tshm.ml.impute import impute_nearest
+
+
+def _with_missing(seed: int = 0, frac: float = 0.05):
+    df = synthesize_training_data(n=400, seed=seed)
+    num = df.select_dtypes(include=[np.number]).drop(columns=["label"]).to_numpy(dtype=float)
+    rng = np.random.default_rng(seed)
+    X = num.copy()
+    X[rng.random(X.shape) < frac] = np.nan
+    return num, X
+
+
+def test_impute_nearest_close_to_knn_imputer():
+    truth, X = _with_missing()
+    ours = impute_nearest(X, n_neighbors=5, chunk_size=7)
+    ref = KNNImputer(n_neighbors=5).fit_transform(X)
+    assert not np.isnan(ours).any()
+    missing = np.isnan(X)
+    # Neighbour averaging over complete rows is at least as accurate as KNNImputer
+    scale = np.broadcast_to(np.nanstd(truth, axis=0), X.shape)[missing]
+    err_ours = (np.abs(ours - truth)[missing] / scale).mean()
+    err_ref = (np.abs(ref - truth)[missing] / scale).mean()
+    assert err_ours < 1.1 * err_ref
+    # Observed values are never touched
+    assert np.array_equal(ours[~missing], X[~missing])
+
+
+def test_impute_nearest_chunking_and_pool_match():
+    _, X = _with_missing(seed=1)
+    a = impute_nearest(X, chunk_size=10_000)
+    b = impute_nearest(X, chunk_size=3)
+    c = impute_nearest(X, chunk_size=50, n_jobs=2)
+    assert np.allclose(a, b) and np.allclose(a, c)
+
+
+def test_impute_nearest_without_donors_uses_column_mean():
+    X = np.array([[1.0, np.nan], [np.nan, 4.0], [3.0, np.nan]])
+    out = impute_nearest(X)
+    assert out[1, 0] == pytest.approx(2.0)
+    assert out[0, 1] == pytest.approx(4.0)
+
+
+def test_impute_nearest_single_neighbour_and_single_donor():
+    _, X = _with_missing(seed=2)
+    one = impute_nearest(X, n_neighbors=1, chunk_size=9)
+    assert one.shape == X.shape and not np.isnan(one).any()
+    # Every filled row copies its gaps from a single complete row
+    complete = ~np.isnan(X).any(axis=1)
+    for row in np.flatnonzero(~complete):
+        gaps = np.isnan(X[row])
+        assert (X[complete][:, gaps] == one[row, gaps]).all(axis=1).any()
+    X = np.array([[1.0, 2.0, 3.0], [np.nan, 5.0, 6.0], [7.0, np.nan, np.nan]])
+    out = impute_nearest(X, n_neighbors=5)
+    assert np.array_equal(out, [[1.0, 2.0, 3.0], [1.0, 5.0, 6.0], [7.0, 2.0, 3.0]])
+
+
+def test_validate_and_impute_kdtree_method():
+    df = synthesize_training_data(n=200, seed=3)
+    df.loc[::7, "ndvi"] = np.nan
+    df.loc[::11, "age"] = np.nan
+    out = validate_and_impute(df.copy(), method="kdtree", chunk_size=16)
+    assert out.isnull().sum().sum() == 0
+    with pytest.raises(ValueError):
+        validate_and_impute(df.copy(), method="bogus")
@@ -0,0 +1,58 @@
+import joblib
+import pytest
+
+from openworld_tshm.ml.data_prep import synthesize_training_data
+from openworld_tshm.ml.incremental import update_models, used_inputs
+from openworld_tshm.ml.train import TrainConfig, train_all
+from openworld_tshm.provenance import ProvenanceStore
+
+
+@pytest.fixture()
+def trained(tmp_path):
+    base = tmp_path / "plots_2024.csv"
+    synthesize_training_data(400, seed=1).to_csv(base, index=False)
+    ledger = str(tmp_path / "prov" / "ledger.jsonl")
+    cfg = TrainConfig(out_dir=str(tmp_path / "run"), data_sources=[str(base)])
+    metrics = train_all(cfg)
+    assert metrics["data_sources"] == [str(base)]
+    ProvenanceStore(ledger).log("train", {"out_dir": cfg.out_dir}, metrics["data_sources"], [])
+    return tmp_path, cfg, ledger
+
+
+def test_incremental_update_adds_trees_then_noops(trained):
+    tmp_path, cfg, ledger = trained
+    batch = tmp_path / "plots_2025.csv"
+    synthesize_training_data(40, seed=2).assign(label=lambda d: d["label"] + 400).to_csv(batch, index=False)
+    before = len(joblib.load(tmp_path / "run" / "species_model.pkl").estimators_)
+    sources = cfg.data_sources + [str(batch)]
+    res = update_models(cfg, sources, ledger)
+    assert res["mode"] == "incremental" and res["new_sources"] == [str(batch)]
+    assert not res["drift"]["drifted"]
+    after = len(joblib.load(tmp_path / "run" / "species_model.pkl").estimators_)
+    # 40 new rows on 320 training rows: about an eighth more trees
+    assert after - before == res["added"]["species"] == 38
+    assert str(batch) in used_inputs(ProvenanceStore(ledger), cfg.out_dir).values()
+    assert update_models(cfg, sources, ledger)["mode"] == "noop"
+
+
+def test_drifted_batch_forces_full_retrain(trained):
+    tmp_path, cfg, ledger = trained
+    batch = tmp_path / "plots_drift.csv"
+    df = synthesize_training_data(200, seed=3)
+    df["ndvi"] = df["ndvi"] - 0.3
+    df.to_csv(batch, index=False)
+    res = update_models(cfg, cfg.data_sources + [str(batch)], ledger)
+    assert res["mode"] == "full" and res["reason"] == "drift"
+    assert "ndvi" in res["drift"]["drifted_features"]
+    assert res["metrics"]["data_sources"] == cfg.data_sources + [str(batch)]
+
+
+def test_full_retrain_refuses_synthetic_fallback(trained):
+    tmp_path, cfg, ledger = trained
+    broken = tmp_path / "plots_broken.csv"
+    broken.write_text("label,height\n1,oops\n")
+    model = tmp_path / "run" / "species_model.pkl"
+    before = model.read_bytes()
+    with pytest.raises((KeyError, ValueError)):
+        update_models(cfg, cfg.data_sources + [str(broken)], ledger, force_full=True)
+    assert model.read_bytes() == before
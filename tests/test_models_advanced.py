@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from openworld_tshm.ml.data_prep import synthesize_training_data
+from openworld_tshm.ml.features import build_feature_matrix
+
+xgboost = pytest.importorskip("xgboost")
+from openworld_tshm.ml.models_advanced import XGBoostHeightRegressor
+
+
+@pytest.fixture(scope="module")
+def height_model():
+    df = synthesize_training_data(300, seed=6)
+    X, y = build_feature_matrix(df, "height")
+    hr = XGBoostHeightRegressor.create(seed=1)
+    hr.model.set_params(n_estimators=40)
+    hr.fit(X, y)
+    return hr, X, y
+
+
+def test_staged_uncertainty_matches_per_iteration_predictions(height_model):
+    hr, X, _ = height_model
+    booster = hr.model.get_booster()
+    dmat = xgboost.DMatrix(X)
+    preds = np.array([booster.predict(dmat, iteration_range=(0, i)) for i in range(1, 41)])
+    staged = hr.staged_predict(X, chunk_size=64)
+    assert np.array_equal(staged, preds)
+    assert np.array_equal(hr.uncertainty(X), np.std(preds, axis=0))
+    assert np.array_equal(hr.uncertainty(X, method="staged"), np.std(preds, axis=0))
+
+
+def test_sampled_and_quantile_uncertainty(height_model):
+    hr, X, y = height_model
+    sampled = hr.uncertainty(X, n_samples=10, method="sampled")
+    assert sampled.shape == (len(X),) and np.all(sampled >= 0)
+    with pytest.raises(RuntimeError):
+        hr.uncertainty(X, method="quantile")
+    hr.fit_quantiles(X, y)
+    q = hr.uncertainty(X, method="quantile")
+    assert q.shape == (len(X),) and np.mean(q) > 0
+    with pytest.raises(ValueError):
+        hr.uncertainty(X, method="nope")
+
+
+@pytest.fixture(scope="module")
+def species_model():
+    from openworld_tshm.ml.models_advanced import XGBoostSpeciesClassifier
+
+    df = synthesize_training_data(600, seed=7)
+    X, y = build_feature_matrix(df, "species")
+    sc = XGBoostSpeciesClassifier.create(seed=1)
+    sc.model.set_params(n_estimators=30)
+    sc.fit(X[:300], y[:300])
+    sc.calibrate(X[300:450], y[300:450], alpha=0.1)
+    return sc, X[450:], y[450:]
+
+
+def test_species_classifier_handles_string_labels(species_model):
+    sc, X, _ = species_model
+    pred = sc.predict(X)
+    assert set(pred) <= set(sc.classes_) and pred.dtype == sc.classes_.dtype
+    assert np.allclose(sc.predict_proba(X, chunk_size=17), sc.model.predict_proba(X), atol=1e-6)
+
+
+def test_species_conformal_report(species_model):
+    sc, X, y = species_model
+    report = sc.uncertainty_report(X, chunk_size=32)
+    assert np.all((report["entropy"] >= 0) & (report["entropy"] <= 1 + 1e-6))
+    assert np.all((report["margin"] >= 0) & (report["margin"] <= 1 + 1e-6))
+    codes = np.searchsorted(sc.classes_, np.asarray(y))
+    coverage = report["prediction_set"][np.arange(len(codes)), codes].mean()
+    assert coverage >= 0.8
+    assert np.all(report["set_size"] <= len(sc.classes_))
+    # A looser alpha never grows the sets
+    assert np.all(sc.uncertainty_report(X, alpha=0.3)["set_size"] <= report["set_size"])
+    assert np.array_equal(sc.uncertainty(X), report["entropy"])
+
+
+def test_species_calibrate_cv_and_label_checks():
+    from openworld_tshm.ml.models_advanced import XGBoostSpeciesClassifier
+
+    df = synthesize_training_data(600, seed=7)
+    X, y = build_feature_matrix(df, "species")
+    sc = XGBoostSpeciesClassifier.create(seed=1)
+    sc.model.set_params(n_estimators=30)
+    sc.fit(X[:450], y[:450])
+    booster = sc.model.get_booster().save_raw()
+    sc.calibrate_cv(X[:450], y[:450], alpha=0.1, cv=3)
+    # Out-of-fold calibration leaves the model fit on all rows untouched
+    assert sc.model.get_booster().save_raw() == booster
+    assert len(sc.calibration_scores) == 450
+    report = sc.uncertainty_report(X[450:])
+    codes = np.searchsorted(sc.classes_, np.asarray(y[450:]))
+    assert report["prediction_set"][np.arange(len(codes)), codes].mean() >= 0.8
+    with pytest.raises(ValueError):
+        sc.calibrate(X[450:452], np.array(["not-a-species"] * 2))
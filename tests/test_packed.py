@@ -0,0 +1,78 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from openworld_tshm.ml.data_prep import synthesize_training_data
+from openworld_tshm.ml.features import build_feature_matrix
+from openworld_tshm.ml.models import HeightRegressor, SpeciesClassifier
+from openworld_tshm.ml.packed import LazyModel, pack_model
+from openworld_tshm.ml.predict import load_models
+from openworld_tshm.ml.train import TrainConfig, train_all
+
+
+def _fitted():
+    df = synthesize_training_data(300, seed=8)
+    Xh, yh = build_feature_matrix(df, "height")
+    Xs, ys = build_feature_matrix(df, "species")
+    hr = HeightRegressor.create(seed=1)
+    hr.fit(Xh, yh)
+    sc = SpeciesClassifier.create(seed=1)
+    sc.model.set_params(n_estimators=40)
+    sc.fit(Xs, ys)
+    return hr, sc, Xh, Xs
+
+
+def test_packed_forest_matches_sklearn_exactly(tmp_path):
+    hr, sc, Xh, Xs = _fitted()
+    hr.save_packed(str(tmp_path / "h"))
+    sc.save_packed(str(tmp_path / "s"))
+    ph = HeightRegressor.load(str(tmp_path / "h"))
+    ps = SpeciesClassifier.load(str(tmp_path / "s"))
+    assert isinstance(ph.model.threshold, np.memmap)
+    assert np.array_equal(ph.predict(Xh), hr.predict(Xh))
+    assert np.array_equal(ps.model.predict_proba(Xs), sc.model.predict_proba(Xs))
+    assert np.array_equal(ps.predict(Xs), sc.predict(Xs))
+    # Column order follows the training feature names
+    assert np.array_equal(ps.predict(Xs[Xs.columns[::-1]]), sc.predict(Xs))
+
+
+def test_lazy_model_defers_loading_and_pickles_as_path(tmp_path):
+    _, sc, _, Xs = _fitted()
+    sc.save_packed(str(tmp_path / "s"))
+    lazy = SpeciesClassifier.load(str(tmp_path / "s"), lazy=True)
+    assert isinstance(lazy.model, LazyModel) and not lazy.model.loaded
+    restored = pickle.loads(pickle.dumps(lazy.model))
+    assert not restored.loaded
+    assert np.array_equal(lazy.predict(Xs), sc.predict(Xs))
+    assert lazy.model.loaded
+
+
+def test_train_writes_packed_models_used_by_predict(tmp_path):
+    train_all(TrainConfig(seed=2, out_dir=str(tmp_path), packed_models=True))
+    assert (tmp_path / "species_model.packed" / "meta.json").exists()
+    models = load_models(str(tmp_path))
+    assert all(hasattr(m.model, "roots") for m in models.values())
+    # A later retrain without packing leaves the old artifacts stale; predict uses the pickles
+    train_all(TrainConfig(seed=3, out_dir=str(tmp_path)))
+    assert (tmp_path / "species_model.packed" / "meta.json").exists()
+    models = load_models(str(tmp_path))
+    assert not any(hasattr(m.model, "roots") for m in models.values())
+
+
+def test_pack_xgboost_matches_booster():
+    xgb = pytest.importorskip("xgboost")
+    df = synthesize_training_data(300, seed=4)
+    Xh, yh = build_feature_matrix(df, "height")
+    reg = xgb.XGBRegressor(n_estimators=30, max_depth=4, random_state=0).fit(Xh, yh)
+    Xn = Xh.astype(float)
+    Xn.iloc[::7, 1] = np.nan
+    packed = pack_model(reg)
+    assert np.array_equal(packed.predict(Xn), reg.predict(Xn))
+    Xs, ys = build_feature_matrix(df, "species")
+    codes = pd.Series(pd.Categorical(ys).codes)
+    clf = xgb.XGBClassifier(n_estimators=20, max_depth=4, random_state=0).fit(Xs, codes)
+    pc = pack_model(clf)
+    assert np.array_equal(pc.predict(Xs), clf.predict(Xs))
+    assert np.allclose(pc.predict_proba(Xs), clf.predict_proba(Xs), rtol=0, atol=1e-6)
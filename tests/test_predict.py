@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+from typer.testing import CliRunner
+
+from openworld_tshm.cli import app
+from openworld_tshm.ml.data_prep import synthesize_training_data
+from openworld_tshm.ml.predict import load_models, predict_frame, predict_table
+from openworld_tshm.ml.train import TrainConfig, train_all
+
+
+@pytest.fixture(scope="module")
+def model_dir(tmp_path_factory):
+    out = tmp_path_factory.mktemp("run")
+    train_all(TrainConfig(seed=3, out_dir=str(out)))
+    return out
+
+
+def test_predict_table_chunks_match_single_pass(tmp_path, model_dir):
+    inv = synthesize_training_data(230, seed=9)
+    src = tmp_path / "inv.csv"
+    inv.to_csv(src, index=False)
+    stats = predict_table(str(src), str(tmp_path / "out.csv"), str(model_dir), chunk_size=50, n_jobs=2)
+    assert stats["rows"] == 230 and stats["trees_per_sec"] > 0
+    out = pd.read_csv(tmp_path / "out.csv")
+    ref = predict_frame(inv, load_models(str(model_dir)))
+    assert out["label"].tolist() == inv["label"].tolist()
+    assert (out["species_pred"] == ref["species_pred"]).all()
+    assert out["height_pred"].round(6).tolist() == ref["height_pred"].round(6).tolist()
+
+
+def test_predict_frame_uses_predicted_height_and_reports_missing(model_dir):
+    models = load_models(str(model_dir))
+    inv = synthesize_training_data(10, seed=1).drop(columns=["height"])
+    out = predict_frame(inv, models)
+    assert {"height_pred", "species_pred"} <= set(out.columns)
+    with pytest.raises(ValueError):
+        predict_frame(inv.drop(columns=["ndvi"]), models)
+
+
+def test_cli_predict(tmp_path, model_dir):
+    src = tmp_path / "inv.csv"
+    synthesize_training_data(20, seed=2).to_csv(src, index=False)
+    res = CliRunner().invoke(app, ["predict", str(src), str(tmp_path / "p.csv"), "--model-dir", str(model_dir)])
+    assert res.exit_code == 0
+    assert "trees/s" in res.stdout
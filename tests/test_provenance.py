@@ -1,4 +1,5 @@
 import os
+
 from openworld_tshm.provenance import ProvenanceStore
 
 
@@ -13,3 +14,227 @@ def test_provenance_log(tmp_path):
         assert '"digest":' in line
         assert '"env":' in line
 
+
+
+def test_provenance_batches_and_flushes(tmp_path):
+    ledger = tmp_path / "prov/ledger.jsonl"
+    ps = ProvenanceStore(str(ledger), batch_size=3, flush_interval=60)
+    ps.log("tile", {"i": 0}, [], [])
+    ps.log("tile", {"i": 1}, [], [])
+    assert not ledger.exists()  # still queued
+    ps.log("tile", {"i": 2}, [], [])
+    assert len(ledger.read_text().splitlines()) == 3
+    ps.log("tile", {"i": 3}, [], [])
+    ps.log("critical", {}, [], [], sync=True)
+    assert [r["step"] for r in ps.records()][-2:] == ["tile", "critical"]
+    ps.log("tile", {"i": 4}, [], [])
+    ps.close()
+    assert len(ledger.read_text().splitlines()) == 6
+
+
+def test_provenance_interval_flush(tmp_path):
+    import time
+
+    ledger = tmp_path / "ledger.jsonl"
+    ps = ProvenanceStore(str(ledger), batch_size=100, flush_interval=0.05)
+    ps.log("tile", {}, [], [])
+    deadline = time.time() + 5
+    while not ledger.exists() and time.time() < deadline:
+        time.sleep(0.01)
+    assert len(ledger.read_text().splitlines()) == 1
+
+
+def test_provenance_flushes_at_exit(tmp_path):
+    import subprocess
+    import sys
+
+    ledger = tmp_path / "ledger.jsonl"
+    code = (
+        "from openworld_tshm.provenance import ProvenanceStore\n"
+        f"ps = ProvenanceStore({str(ledger)!r}, batch_size=1000, flush_interval=3600)\n"
+        "for i in range(10): ps.log('tile', {'i': i}, [], [])\n"
+    )
+    env = {**os.environ, "PYTHONPATH": os.path.dirname(os.path.dirname(os.path.abspath(__file__)))}
+    subprocess.run([sys.executable, "-c", code], check=True, env=env)
+    assert len(ledger.read_text().splitlines()) == 10
+
+
+def _chain(tmp_path, store):
+    # raw -> clean -> model -> pred, and pred also reads raw
+    paths = {n: str(tmp_path / n) for n in ("raw.csv", "clean.csv", "model.pkl", "pred.csv")}
+    steps = [("clean", ["raw.csv"], ["clean.csv"]), ("train", ["clean.csv"], ["model.pkl"]),
+             ("predict", ["model.pkl", "raw.csv"], ["pred.csv"])]
+    with open(paths["raw.csv"], "w") as f:
+        f.write("raw")
+    for step, ins, outs in steps:
+        for o in outs:
+            with open(paths[o], "w") as f:
+                f.write(step)
+        store.log(step, {}, [paths[i] for i in ins], [paths[o] for o in outs])
+    return paths
+
+
+def test_sqlite_store_lineage(tmp_path):
+    from openworld_tshm.provenance import SQLiteProvenanceStore, open_store
+
+    store = open_store(str(tmp_path / "ledger.db"))
+    assert isinstance(store, SQLiteProvenanceStore)
+    paths = _chain(tmp_path, store)
+    up = store.lineage(paths["pred.csv"])
+    assert [(r["step"], r["depth"]) for r in up["records"]] == [("clean", 3), ("train", 2), ("predict", 1)]
+    assert (paths["raw.csv"], "record:1") in up["edges"]
+    down = store.lineage(paths["raw.csv"], direction="downstream")
+    assert sorted((r["step"], r["depth"]) for r in down["records"]) == [("clean", 1), ("predict", 1), ("train", 2)]
+    digest = store.records("train")[0]["env"]["output_hashes"][paths["model.pkl"]]
+    assert [r["step"] for r in store.produced_by(digest)] == ["train"]
+    assert [r["step"] for r in store.used_by(paths["raw.csv"])] == ["clean", "predict"]
+    store.close()
+
+
+def test_sqlite_import_matches_jsonl(tmp_path):
+    from openworld_tshm.provenance import SQLiteProvenanceStore
+
+    jsonl = ProvenanceStore(str(tmp_path / "ledger.jsonl"))
+    _chain(tmp_path, jsonl)
+    db = SQLiteProvenanceStore(str(tmp_path / "ledger.db"))
+    assert db.import_jsonl(jsonl.ledger_path) == 3
+    strip = lambda recs: [{k: v for k, v in r.items() if k != "id"} for r in recs]
+    assert strip(db.records()) == jsonl.records()
+    ts = jsonl.records()[1]["timestamp"]
+    assert [r["step"] for r in db.records_between(ts, ts + 1e-6)] == ["train"]
+
+
+def test_cli_provenance_import_and_lineage(tmp_path):
+    import json
+
+    from typer.testing import CliRunner
+
+    from openworld_tshm.cli import app
+
+    jsonl = ProvenanceStore(str(tmp_path / "ledger.jsonl"))
+    paths = _chain(tmp_path, jsonl)
+    db = str(tmp_path / "ledger.db")
+    runner = CliRunner()
+    res = runner.invoke(app, ["provenance", "import", jsonl.ledger_path, db])
+    assert res.exit_code == 0 and "Imported 3 records" in res.output
+    res = runner.invoke(app, ["provenance", "lineage", paths["model.pkl"], "--ledger", db, "--json"])
+    assert res.exit_code == 0
+    assert [r["step"] for r in json.loads(res.output)["records"]] == ["clean", "train"]
+    res = runner.invoke(app, ["provenance", "lineage", paths["model.pkl"], "--ledger", jsonl.ledger_path])
+    assert res.exit_code == 2
+
+
+def test_chain_verify_resumes_and_detects_tampering(tmp_path):
+    import json
+
+    ledger = tmp_path / "ledger.jsonl"
+    ps = ProvenanceStore(str(ledger))
+    for i in range(5):
+        ps.log("tile", {"i": i}, [], [])
+    recs = ps.records()
+    assert recs[0]["prev_digest"] is None
+    assert all(b["prev_digest"] == a["digest"] for a, b in zip(recs, recs[1:]))
+    first = ps.verify()
+    assert first["ok"] and first["checked"] == 5 and not first["resumed"]
+    # A new store continues the chain from the ledger's last record
+    ProvenanceStore(str(ledger)).log("tile", {"i": 5}, [], [])
+    again = ps.verify()
+    assert again["ok"] and again["resumed"] and (again["checked"], again["total"]) == (1, 6)
+    lines = ledger.read_text().splitlines()
+    # Removing a record breaks the chain for the full check ...
+    ledger.write_text("\n".join(lines[:2] + lines[3:]) + "\n")
+    broken = ps.verify(full=True)
+    assert not broken["ok"] and broken["error"]["index"] == 2
+    # ... and the checkpointed record is no longer where the checkpoint says
+    assert not ps.verify()["ok"]
+    # Editing a record's content changes its digest
+    rec = json.loads(lines[1])
+    rec["params"]["i"] = 99
+    ledger.write_text("\n".join([lines[0], json.dumps(rec)] + lines[2:]) + "\n")
+    assert ps.verify(full=True)["error"]["reason"].startswith("digest mismatch")
+
+
+def test_chain_accepts_legacy_prefix(tmp_path):
+    import json
+
+    ledger = tmp_path / "ledger.jsonl"
+    legacy = {"timestamp": 1.0, "actor": "a", "host": "h", "step": "old", "params": {}, "inputs": [], "outputs": [],
+              "code_version": None}
+    from openworld_tshm.provenance import record_digest
+
+    legacy["digest"] = record_digest(legacy)
+    ledger.write_text(json.dumps(legacy) + "\n")
+    ps = ProvenanceStore(str(ledger))
+    ps.log("new", {}, [], [])
+    assert ps.records()[1]["prev_digest"] == legacy["digest"]
+    assert ps.verify()["ok"]
+    with open(ledger, "a") as f:
+        f.write(json.dumps(legacy) + "\n")
+    assert ps.verify()["error"]["reason"] == "unchained record after chained records"
+
+
+def test_sqlite_chain_verify(tmp_path):
+    import sqlite3
+
+    from typer.testing import CliRunner
+
+    from openworld_tshm.cli import app
+    from openworld_tshm.provenance import SQLiteProvenanceStore
+
+    db = str(tmp_path / "ledger.db")
+    store = SQLiteProvenanceStore(db, batch_size=10)
+    _chain(tmp_path, store)
+    store.log("tile", {"i": 1}, [], [])
+    store.close()
+    runner = CliRunner()
+    res = runner.invoke(app, ["provenance", "verify", "--ledger", db])
+    assert res.exit_code == 0 and "checked=4" in res.output
+    res = runner.invoke(app, ["provenance", "verify", "--ledger", db])
+    assert res.exit_code == 0 and "checked=0 total=4" in res.output
+    with sqlite3.connect(db) as conn:
+        conn.execute("DELETE FROM records WHERE id = 2")
+    res = runner.invoke(app, ["provenance", "verify", "--ledger", db, "--full"])
+    assert res.exit_code == 1 and "chain broken" in res.output
+
+
+def test_chain_spans_stores_sharing_a_ledger(tmp_path):
+    from openworld_tshm.provenance import open_store
+
+    for name in ("ledger.jsonl", "ledger.db"):
+        path = str(tmp_path / name)
+        a, b = open_store(path, batch_size=3, flush_interval=60), open_store(path)
+        for i in range(7):
+            a.log("a", {"i": i}, [], [])
+            rec = b.log("b", {"i": i}, [], [])
+            assert rec.digest is not None
+        a.close()
+        recs = b.records()
+        assert len(recs) == 14
+        assert all(r["prev_digest"] == p["digest"] for p, r in zip(recs, recs[1:]))
+        result = b.verify(full=True)
+        assert result["ok"] and result["checked"] == 14
+        b.close()
+
+
+def test_chain_spans_processes_sharing_a_ledger(tmp_path):
+    import subprocess
+    import sys
+
+    from openworld_tshm.provenance import open_store
+
+    env = {**os.environ, "PYTHONPATH": os.path.dirname(os.path.dirname(os.path.abspath(__file__)))}
+    for name in ("ledger.jsonl", "ledger.db"):
+        path = str(tmp_path / name)
+        code = (
+            "import sys\n"
+            "from openworld_tshm.provenance import open_store\n"
+            f"ps = open_store({path!r}, batch_size=int(sys.argv[1]), flush_interval=3600)\n"
+            "for i in range(40): ps.log('tile', {'i': i}, [], [])\n"
+            "ps.close()\n"
+        )
+        procs = [subprocess.Popen([sys.executable, "-c", code, str(n)], env=env) for n in (1, 4)]
+        assert [p.wait() for p in procs] == [0, 0]
+        store = open_store(path)
+        result = store.verify(full=True)
+        assert result["ok"] and result["total"] == 80
+        store.close()
@@ -0,0 +1,57 @@
+import json
+
+from openworld_tshm.ml import search
+from openworld_tshm.ml.data_prep import synthesize_training_data
+from openworld_tshm.ml.features import build_feature_matrix
+from openworld_tshm.ml.train import TrainConfig, train_all
+
+
+def _matrices():
+    df = synthesize_training_data(150, seed=2)
+    return {t: build_feature_matrix(df, t) for t in ("height", "species")}
+
+
+def test_sample_candidates_are_distinct_and_seeded():
+    space = search.SPACES[("basic", "height")]
+    a = search.sample_candidates(space, 10, seed=1)
+    assert a == search.sample_candidates(space, 10, seed=1)
+    assert len({json.dumps(c, sort_keys=True) for c in a}) == 10
+    # Never more candidates than the grid holds
+    assert len(search.sample_candidates({"x": [1, 2]}, 10, seed=0)) == 2
+
+
+def test_successive_halving_prunes_and_pool_matches(monkeypatch):
+    monkeypatch.setitem(search.MAX_TREES, "basic", 18)
+    serial = search.successive_halving(_matrices(), n_candidates=9, n_splits=3, seed=0)
+    pooled = search.successive_halving(_matrices(), n_candidates=9, n_splits=3, seed=0, n_jobs=2)
+    assert serial == pooled
+    assert serial["budgets"] == [2, 6, 18]
+    rungs = [sum(1 for r in serial["leaderboard"] if r["target"] == "height" and r["rung"] == k) for k in range(3)]
+    assert rungs == [9, 3, 1]
+    assert set(serial["best"]) == {"height", "species"}
+
+
+def test_budgets_count_rungs_exactly():
+    assert search._budgets(243, 1000, 3) == [4, 12, 37, 111, 333, 1000]
+    assert search._budgets(242, 1000, 3)[0] == 12
+    assert search._budgets(1, 300, 3) == [300]
+
+
+def test_early_stopping_split_stays_inside_training_fold():
+    import numpy as np
+
+    X, y = _matrices()["species"]
+    for tr, va in search.shared_folds(X, y, "species", n_splits=3):
+        fit, stop = search.early_stopping_split(tr, y, "species")
+        assert len(np.intersect1d(fit, stop)) == 0 and len(fit) + len(stop) == len(tr)
+        assert set(np.union1d(fit, stop)) == set(tr) and len(np.intersect1d(stop, va)) == 0
+
+
+def test_train_search_writes_leaderboard(tmp_path, monkeypatch):
+    monkeypatch.setitem(search.MAX_TREES, "advanced", 30)
+    cfg = TrainConfig(out_dir=str(tmp_path), model_type="advanced", search=True, search_candidates=3, save_models=False)
+    metrics = train_all(cfg)
+    board = json.loads((tmp_path / "leaderboard.json").read_text())
+    assert metrics["leaderboard_path"] == str(tmp_path / "leaderboard.json")
+    assert (tmp_path / "metrics.json").exists()
+    assert board["best"]["height"]["n_estimators"] <= 30
@@ -0,0 +1,62 @@
+import os
+import time
+
+import numpy as np
+
+from openworld_tshm.provenance import ProvenanceStore
+from openworld_tshm.step_cache import StepCache, step_key
+
+
+def _segment(calls, pts):
+    def fn():
+        calls.append(1)
+        return {"labels": np.arange(len(pts), dtype=np.int64), "feats": [{"label": 0, "height": 12.5}]}
+    return fn
+
+
+def test_memoize_hits_with_mmap_and_logs_provenance(tmp_path):
+    cache = StepCache(str(tmp_path / "cache"))
+    store = ProvenanceStore(str(tmp_path / "ledger.jsonl"))
+    pts = np.random.default_rng(0).random((100, 3))
+    calls = []
+    first, hit = cache.memoize("segment", _segment(calls, pts), {"eps": 2.0}, arrays={"points": pts}, store=store)
+    assert not hit and len(calls) == 1
+    second, hit = cache.memoize("segment", _segment(calls, pts), {"eps": 2.0}, arrays={"points": pts}, store=store)
+    assert hit and len(calls) == 1
+    assert isinstance(second["labels"], np.memmap)
+    np.testing.assert_array_equal(second["labels"], first["labels"])
+    assert second["feats"] == first["feats"]
+    hits = store.records("cache_hit")
+    assert len(hits) == 1 and hits[0]["params"]["step"] == "segment" and hits[0]["params"]["eps"] == 2.0
+    # Different parameters or input content miss
+    cache.memoize("segment", _segment(calls, pts), {"eps": 3.0}, arrays={"points": pts}, store=store)
+    cache.memoize("segment", _segment(calls, pts), {"eps": 2.0}, arrays={"points": pts + 1}, store=store)
+    assert len(calls) == 3
+
+
+def test_step_key_tracks_input_file_content(tmp_path):
+    from openworld_tshm.utils.hashing import HashCache
+
+    src = tmp_path / "tile.laz"
+    src.write_bytes(b"a" * 100)
+    hashes = HashCache(str(tmp_path / "hashes.sqlite"))
+    k1 = step_key("chm", {"cell_size": 1.0}, inputs=[str(src)], hashes=hashes)
+    assert k1 == step_key("chm", {"cell_size": 1.0}, inputs=[str(src)], hashes=hashes)
+    assert k1 != step_key("chm", {"cell_size": 0.5}, inputs=[str(src)], hashes=hashes)
+    src.write_bytes(b"b" * 100)
+    t = time.time() + 5
+    os.utime(src, (t, t))
+    assert k1 != step_key("chm", {"cell_size": 1.0}, inputs=[str(src)], hashes=hashes)
+
+
+def test_prune_evicts_least_recently_used_by_size(tmp_path):
+    arr = np.zeros(10_000, dtype=np.float64)  # ~80 KB per entry
+    cache = StepCache(str(tmp_path / "cache"), max_bytes=200_000)
+    for i, key in enumerate(["a", "b"]):
+        cache.put(key, {"x": arr})
+        t = time.time() - 100 + i
+        os.utime(os.path.join(cache.root, key, "meta.json"), (t, t))
+    assert cache.get("a") is not None  # "a" becomes the most recently used
+    cache.put("c", {"x": arr})
+    assert cache.has("a") and cache.has("c") and not cache.has("b")
+    assert cache.size_bytes() <= 200_000
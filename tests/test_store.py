@@ -0,0 +1,32 @@
+import os
+import time
+
+from openworld_tshm.utils.store import EntryStore
+
+
+def _put(store, key, payload=b""):
+    tmp = store.staging(key)
+    with open(os.path.join(tmp, "data.bin"), "wb") as f:
+        f.write(payload)
+    assert not store.has(key)  # staged files are not visible yet
+    return store.publish(key, tmp, {"n": len(payload)})
+
+
+def test_entry_store_publishes_and_evicts_least_recently_used(tmp_path):
+    store = EntryStore(str(tmp_path / "store"), max_entries=2)
+    for i, key in enumerate(["a", "b"]):
+        _put(store, key)
+        t = time.time() - 100 + i
+        os.utime(os.path.join(store.root, key, "meta.json"), (t, t))
+    assert store.meta("a")["n"] == 0  # "a" becomes the most recently used
+    _put(store, "c")
+    assert store.has("a") and not store.has("b") and store.has("c")
+    assert sorted(os.listdir(store.root)) == ["a", "c"]
+    assert store.meta("b") is None
+
+
+def test_entry_store_byte_budget_keeps_newest_entry(tmp_path):
+    store = EntryStore(str(tmp_path / "store"), max_bytes=100)
+    _put(store, "a", b"x" * 80)
+    _put(store, "b", b"x" * 500)
+    assert not store.has("a") and store.has("b")
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from openworld_tshm.gis.export import bulk_export_trees_sqlite
+from openworld_tshm.gis.summary import (
+    read_grid,
+    read_summary,
+    rebuild_summaries,
+    summary_from_frame,
+)
+
+
+def _trees(n, seed, label_offset=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "label": np.arange(label_offset, label_offset + n),
+        "species": rng.choice(["pine", "oak", "spruce"], size=n),
+        "height": rng.uniform(5, 40, n),
+        "health_idx": rng.uniform(0.4, 1.0, n),
+        "footprint": rng.uniform(8, 120, n),
+        "centroid_x": rng.uniform(0, 450, n),
+        "centroid_y": rng.uniform(0, 450, n),
+    })
+
+
+def _assert_same(got, want):
+    assert got["num_trees"] == want["num_trees"]
+    assert got["height_histogram"] == want["height_histogram"]
+    assert got["avg_height"] == pytest.approx(want["avg_height"])
+    assert got["health_index_avg"] == pytest.approx(want["health_index_avg"])
+    assert got["species_breakdown"] == pytest.approx(want["species_breakdown"])
+
+
+def test_summaries_follow_incremental_exports(tmp_path):
+    db = str(tmp_path / "forest.db")
+    a = _trees(3000, 0)
+    bulk_export_trees_sqlite(a, db_path=db, batch_size=700, rtree=False, stand="north")
+    _assert_same(read_summary(db), summary_from_frame(a))
+    # Overlapping labels replace trees (and may move them to another stand)
+    b = _trees(1000, 1, label_offset=2500)
+    bulk_export_trees_sqlite(b, db_path=db, batch_size=400, rtree=False, stand="south")
+    north = a[a["label"] < 2500]
+    _assert_same(read_summary(db, stand="north"), summary_from_frame(north))
+    _assert_same(read_summary(db, stand="south"), summary_from_frame(b))
+    _assert_same(read_summary(db), summary_from_frame(pd.concat([north, b])))
+    grid = read_grid(db)
+    assert grid["num_trees"].sum() == 3500
+    assert len(read_grid(db, stand="north", bbox=(0, 0, 150, 150))) == 4
+    # A rebuild from the tree table gives the same result as the incremental updates
+    before = read_summary(db)
+    rebuild_summaries(db, cell_size=50.0)
+    _assert_same(read_summary(db), before)
+    assert len(read_grid(db, stand="north")) == 81
+    with pytest.raises(ValueError):
+        bulk_export_trees_sqlite(b, db_path=db, rtree=False)
+
+
+def test_reexport_with_string_labels(tmp_path):
+    db = str(tmp_path / "forest.db")
+    a = _trees(4, 0).assign(label=["a1", "a2", "a3", "a4"])
+    bulk_export_trees_sqlite(a, db_path=db, rtree=False)
+    b = _trees(2, 1).assign(label=["a2", "b1"])
+    bulk_export_trees_sqlite(b, db_path=db, rtree=False)
+    bulk_export_trees_sqlite(b, db_path=db, rtree=False)
+    kept = pd.concat([a[a["label"] != "a2"], b])
+    _assert_same(read_summary(db), summary_from_frame(kept))
+
+
+def test_summary_from_frame_without_species_or_health():
+    m = summary_from_frame(pd.DataFrame({"label": [1, 2], "height": [3.0, 5.0]}))
+    assert m["num_trees"] == 2 and m["avg_height"] == 4.0
+    assert m["species_breakdown"] == {} and m["health_index_avg"] == 0.0
+    assert m["height_histogram"] == {"2-4": 1, "4-6": 1}
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+from typer.testing import CliRunner
+
+from openworld_tshm.cli import app
+from openworld_tshm.synthetic import iter_stand, terrain_z, write_points, write_trees
+
+
+def test_iter_stand_is_reproducible_per_chunk():
+    a = list(iter_stand(250, seed=3, chunk_size=100))
+    b = list(iter_stand(250, seed=3, chunk_size=100))
+    assert [len(t) for t, _ in a] == [100, 100, 50]
+    for (ta, pa), (tb, pb) in zip(a, b):
+        pd.testing.assert_frame_equal(ta, tb)
+        assert np.array_equal(pa, pb)
+    trees = pd.concat([t for t, _ in a])
+    assert trees["label"].tolist() == list(range(250))
+    assert set(trees["species"]) == {"pine", "oak", "spruce"}
+
+
+def test_crown_points_sit_above_terrain():
+    trees, pts = next(iter_stand(20, seed=1, chunk_size=20, ground_fraction=0.0))
+    assert len(pts) == trees["point_count"].sum()
+    ground = terrain_z(pts[:, 0], pts[:, 1], seed=1)
+    # Crowns hang from tree tops; allow for crown radius when terrain varies
+    assert np.mean(pts[:, 2] > ground) > 0.95
+
+
+def test_write_trees_and_points(tmp_path):
+    n = write_trees(str(tmp_path / "trees.csv"), 120, seed=5, chunk_size=50)
+    assert n == 120 and len(pd.read_csv(tmp_path / "trees.csv")) == 120
+    n_pts = write_points(str(tmp_path / "pts.npy"), 120, seed=5, chunk_size=50)
+    arr = np.load(tmp_path / "pts.npy", mmap_mode="r")
+    assert arr.shape == (n_pts, 3)
+    streamed = np.concatenate([p for _, p in iter_stand(120, seed=5, chunk_size=50)])
+    assert np.array_equal(arr, streamed)
+
+
+def test_cli_synthesize(tmp_path):
+    res = CliRunner().invoke(app, ["synthesize", str(tmp_path / "t.csv"), "--trees", "30", "--points", str(tmp_path / "p.npy")])
+    assert res.exit_code == 0
+    assert (tmp_path / "p.npy").exists()
+
+
+def test_point_batches_bound_memory(tmp_path):
+    batches = list(iter_stand(120, seed=5, chunk_size=50, max_points=3000))
+    assert all(len(p) <= 3000 for t, p in batches if len(t) > 1)
+    assert pd.concat([t for t, _ in batches])["label"].tolist() == list(range(120))
+    # A tree larger than the bound still gets its own batch
+    assert [len(t) for t, _ in iter_stand(3, seed=5, chunk_size=3, max_points=1)] == [1, 1, 1]
+    n_pts = write_points(str(tmp_path / "pts.npy"), 120, seed=5, chunk_size=50, max_points=3000)
+    arr = np.load(tmp_path / "pts.npy", mmap_mode="r")
+    assert arr.shape == (n_pts, 3)
+    assert np.array_equal(arr, np.concatenate([p for _, p in batches]))
@@ -0,0 +1,125 @@
+import json
+import os
+import time
+
+from openworld_tshm.ml.tracking import RunTracker
+from openworld_tshm.ml.train import TrainConfig, train_all
+
+
+class SlowClient:
+    """Stand-in MLflow client that records calls and takes its time."""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay, self.fail = delay, fail
+        self.batches, self.artifacts, self.status = [], [], None
+
+    def get_experiment_by_name(self, name):
+        return None
+
+    def create_experiment(self, name):
+        if self.fail:
+            raise ConnectionError("tracking server unreachable")
+        return "1"
+
+    def create_run(self, exp_id, run_name=None):
+        return type("Run", (), {"info": type("Info", (), {"run_id": "r1"})()})()
+
+    def log_batch(self, run_id, metrics=(), params=()):
+        time.sleep(self.delay)
+        self.batches.append((list(metrics), list(params)))
+
+    def log_artifact(self, run_id, path):
+        self.artifacts.append(path)
+
+    def set_terminated(self, run_id, status="FINISHED"):
+        self.status = status
+
+
+def test_tracker_batches_without_blocking(tmp_path):
+    client = SlowClient(delay=0.2)
+    tracker = RunTracker("exp", client=client, flush_interval=10.0)
+    start = time.perf_counter()
+    tracker.log_params({f"p{i}": i for i in range(150)})
+    for i in range(2500):
+        tracker.log_metric("loss", 1.0 / (i + 1), step=i)
+    tracker.log_artifact(__file__)
+    assert time.perf_counter() - start < 0.2
+    tracker.close()
+    n_metrics = sum(len(m) for m, _ in client.batches)
+    n_params = sum(len(p) for _, p in client.batches)
+    assert (n_metrics, n_params) == (2500, 150)
+    assert all(len(m) <= 1000 and len(p) <= 100 for m, p in client.batches)
+    assert len(client.batches) == 5
+    assert client.artifacts == [__file__] and client.status == "FINISHED"
+
+
+def test_tracker_flush_waits_for_items_logged_before_it():
+    # A short interval keeps the worker waking up on an empty queue, racing each log()
+    client = SlowClient()
+    tracker = RunTracker("exp", client=client, flush_interval=0.0001)
+    for i in range(300):
+        tracker.log_metric("loss", float(i), step=i)
+        assert tracker.flush(timeout=5)
+        assert sum(len(m) for m, _ in client.batches) == i + 1
+    tracker.close()
+    assert tracker.flush(timeout=5)
+
+
+def test_tracker_falls_back_to_json(tmp_path):
+    path = str(tmp_path / "run.json")
+    tracker = RunTracker("exp", client=SlowClient(fail=True), fallback_path=path)
+    tracker.log_params({"seed": 1})
+    tracker.log_metrics({"mae": 0.5, "model_type": "basic"})
+    tracker.close()
+    with open(path) as f:
+        rec = json.load(f)
+    assert rec["error"].startswith("ConnectionError")
+    assert rec["params"] == {"seed": "1"}
+    assert [m["key"] for m in rec["metrics"]] == ["mae"]
+
+
+class BrokenClient(SlowClient):
+    def log_batch(self, run_id, metrics=(), params=()):
+        raise RuntimeError("bug in the tracking client")
+
+
+def test_tracker_flush_survives_dead_worker(tmp_path):
+    path = str(tmp_path / "run.json")
+    tracker = RunTracker("exp", client=BrokenClient(), fallback_path=path, flush_interval=0.01)
+    tracker.log_metric("loss", 1.0)
+    tracker._thread.join(timeout=5)  # the first send kills the worker
+    assert not tracker._thread.is_alive()
+    tracker.log_metric("loss", 0.5, step=1)
+    start = time.perf_counter()
+    assert tracker.flush()
+    assert time.perf_counter() - start < 1.0
+    with open(path) as f:
+        rec = json.load(f)
+    assert rec["status"] == "FAILED" and rec["error"].startswith("RuntimeError")
+    assert [m["value"] for m in rec["metrics"]] == [1.0, 0.5]
+    tracker.close()
+
+
+def test_tracker_disabled_is_noop(tmp_path):
+    tracker = RunTracker(None, fallback_path=str(tmp_path / "run.json"))
+    tracker.log_metric("mae", 1.0)
+    tracker.close()
+    assert not os.path.exists(tmp_path / "run.json")
+
+
+def test_train_logs_run_to_mlflow(tmp_path, monkeypatch):
+    import mlflow
+
+    monkeypatch.setenv("MLFLOW_DISABLE_AGENT_HINT", "1")
+    monkeypatch.chdir(tmp_path)  # the default artifact root is ./mlruns
+    mlflow.set_tracking_uri(f"sqlite:///{tmp_path / 'mlflow.db'}")
+    try:
+        out = str(tmp_path / "run")
+        metrics = train_all(TrainConfig(seed=3, out_dir=out, mlflow_experiment="t"))
+        runs = mlflow.search_runs(experiment_names=["t"], output_format="list")
+    finally:
+        mlflow.set_tracking_uri(None)
+    assert len(runs) == 1 and runs[0].info.status == "FINISHED"
+    assert runs[0].data.metrics["height_mae"] == metrics["height_mae"]
+    assert runs[0].data.params["seed"] == "3"
+    assert not os.path.exists(os.path.join(out, "mlflow_run.json"))
@@ -0,0 +1,26 @@
+import json
+
+import joblib
+import numpy as np
+import pytest
+
+from openworld_tshm.ml.data_prep import synthesize_training_data
+from openworld_tshm.ml.features import build_feature_matrix
+from openworld_tshm.ml.train import TrainConfig, train_all
+
+
+@pytest.mark.parametrize("model_type", ["basic", "advanced"])
+def test_parallel_training_matches_sequential(tmp_path, model_type):
+    runs = {}
+    for parallel in (False, True):
+        out = tmp_path / f"run_{parallel}"
+        train_all(TrainConfig(model_type=model_type, out_dir=str(out), parallel=parallel))
+        runs[parallel] = out
+    strip = lambda p: {k: v for k, v in json.loads((p / "metrics.json").read_text()).items() if not k.endswith("_path")}
+    assert strip(runs[False]) == strip(runs[True])
+    df = synthesize_training_data(50, seed=9)
+    for target in ("height", "species"):
+        X, _ = build_feature_matrix(df, target)
+        a = joblib.load(runs[False] / f"{target}_model.pkl")
+        b = joblib.load(runs[True] / f"{target}_model.pkl")
+        assert np.array_equal(a.predict(X), b.predict(X))